@@ -94,6 +94,17 @@ DATABASES = {
     }
 }
 
+# Planner reads cache rendered JSON here and users.roles caches role sets.
+# LocMemCache is per process: a role change clears the cached set only in the
+# worker that made it, and the others keep the old set until it expires. Use a
+# shared backend (e.g. Redis) whenever more than one worker process is running.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
 # if os.getenv("USE_SQLITE_FOR_TESTS") == "1":
 #     DATABASES = {
 #         "default": {
@@ -170,6 +181,17 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
 }
+# Authenticate from the access token claims and load auth_user lazily. Claims
+# are revoked through the default cache, so this is on by default only when
+# that cache is shared between workers.
+JWT_CLAIMS_USER = os.getenv(
+    "JWT_CLAIMS_USER", "0" if CACHES["default"]["BACKEND"].endswith("LocMemCache") else "1"
+) == "1"
+# Validated access tokens kept per process until expiry; 0 disables the cache.
+JWT_VERIFIED_CACHE_SIZE = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", "1024"))
+# Planner change streams; set planner.events.PostgresNotifyTransport when
+# running several ASGI workers so each of them sees every change.
+PLANNER_EVENTS_TRANSPORT = os.getenv("PLANNER_EVENTS_TRANSPORT", "planner.events.LocalTransport")
 
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -0,0 +1,27 @@
+"""Rendered JSON of unfiltered planner reads, cached by version.
+
+Keys carry the version the body reports (the one its ETag is built from)
+and the id and version of every row the payload is built from. All write
+paths bump those versions (``save()``, ``touch()`` and the bulk desk
+updates), so a write makes the previous entry unreachable and it expires.
+"""
+
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+RENDERED_TTL_SECONDS = 60 * 60
+
+
+def versioned_key(kind, version, *instances):
+    return "planner:rendered:{}:{}:{}".format(
+        kind, version, ",".join(f"{instance.pk}.{instance.version}" for instance in instances)
+    )
+
+
+def rendered_json(key, build):
+    """Return cached JSON bytes for ``key``, rendering ``build()`` on a miss."""
+    content = cache.get(key)
+    if content is None:
+        content = JSONRenderer().render(build())
+        cache.set(key, content, RENDERED_TTL_SECONDS)
+    return content
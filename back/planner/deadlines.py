@@ -0,0 +1,47 @@
+"""Overdue and due-soon subtasks, filtered in the database.
+
+A subtask is open while its status is not the last column of its board: the
+team desk columns when the team has a desk, the workspace columns otherwise.
+The deadline range is served by the ``end_date`` index; the final column is
+read from the desk row through its unique ``team_id``.
+"""
+
+import datetime
+
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from planner.models import PlannerSubtask, TeamPlannerDesk
+
+DUE_SOON_DAYS = 7
+
+
+def done_column():
+    """The last column of a subtask's board, for annotating ``PlannerSubtask`` rows."""
+    desk_done_column = TeamPlannerDesk.objects.filter(team_id=OuterRef("team_id")).values(
+        last=KeyTextTransform(-1, "columns")
+    )[:1]
+    return Coalesce(Subquery(desk_done_column), KeyTextTransform(-1, "workspace__columns"))
+
+
+def open_subtasks(workspaces):
+    return (
+        PlannerSubtask.objects.filter(workspace__in=workspaces, end_date__isnull=False)
+        .annotate(done_column=done_column())
+        .exclude(status=F("done_column"))
+    )
+
+
+def deadlines(workspaces, today=None, days=DUE_SOON_DAYS):
+    """Return ``(overdue, due_soon)`` querysets ordered by deadline.
+
+    Overdue subtasks ended before ``today``; due-soon ones end within the
+    next ``days`` days, today included.
+    """
+    today = today or timezone.localdate()
+    subtasks = open_subtasks(workspaces).order_by("end_date", "id")
+    overdue = subtasks.filter(end_date__lt=today)
+    due_soon = subtasks.filter(end_date__gte=today, end_date__lt=today + datetime.timedelta(days=days))
+    return overdue, due_soon
@@ -0,0 +1,173 @@
+"""Fan-out of planner change events to connected streams.
+
+Writers publish compact events once their transaction commits::
+
+    {"type": "planner.changed", "event_id": 3, "version": 12, "team_ids": [17]}
+    {"type": "desk.changed", "event_id": 3, "version": 4, "team_ids": [17]}
+
+Each subscriber owns an asyncio queue on its own event loop; publishers may
+run in worker threads (sync views under ASGI), so delivery goes through
+``call_soon_threadsafe``.
+
+Events travel between processes through a transport chosen by the
+``PLANNER_EVENTS_TRANSPORT`` setting. ``LocalTransport`` hands them straight
+to this process's subscribers, which is enough for a single ASGI worker and
+for tests; ``PostgresNotifyTransport`` sends them with ``NOTIFY`` so every
+worker listening on the same database receives them.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+PLANNER_CHANGED = "planner.changed"
+DESK_CHANGED = "desk.changed"
+RESYNC = "resync"
+
+logger = logging.getLogger(__name__)
+
+
+class PlannerSubscription:
+    def __init__(self, loop, accepts=None, maxsize=100):
+        self.loop = loop
+        self.accepts = accepts or (lambda event: True)
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event):
+        # A consumer that fell behind gets one resync marker instead of a backlog.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": RESYNC}
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalTransport:
+    """Deliver events to the subscribers of this process only."""
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def send(self, event):
+        self.deliver(event)
+
+
+class PostgresNotifyTransport:
+    """Deliver events to every process through Postgres ``LISTEN/NOTIFY``.
+
+    Each process listens on its own connection in a daemon thread. After a
+    lost connection subscribers get a resync marker, since notifications
+    sent meanwhile are gone.
+    """
+
+    channel = "planner_changes"
+    poll_seconds = 5
+    retry_seconds = 5
+
+    def start(self, deliver):
+        self.deliver = deliver
+        self.listening = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._listen_forever, name="planner-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def send(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, json.dumps(event)])
+
+    def _listen_forever(self):
+        reconnected = False
+        while not self._stopped.is_set():
+            try:
+                self._listen(reconnected)
+            except Exception:
+                logger.exception("Planner event listener lost its connection")
+            reconnected = True
+            self.listening.clear()
+            self._stopped.wait(self.retry_seconds)
+
+    def _listen(self, reconnected):
+        listener = connection.get_new_connection(connection.get_connection_params())
+        try:
+            listener.autocommit = True
+            with listener.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            self.listening.set()
+            if reconnected:
+                self.deliver({"type": RESYNC, "team_ids": []})
+            while not self._stopped.is_set():
+                if select.select([listener], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                listener.poll()
+                while listener.notifies:
+                    self.deliver(json.loads(listener.notifies.pop(0).payload))
+        finally:
+            listener.close()
+
+
+class PlannerChangeBroker:
+    def __init__(self, transport=None):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._transport = transport
+
+    def connect(self):
+        """Return the transport, starting it on first use."""
+
+        with self._lock:
+            if self._transport is None:
+                self._transport = import_string(settings.PLANNER_EVENTS_TRANSPORT)()
+                self._transport.start(self.deliver)
+        return self._transport
+
+    def subscribe(self, accepts=None, maxsize=100):
+        self.connect()
+        subscription = PlannerSubscription(asyncio.get_running_loop(), accepts, maxsize)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """Send ``event`` to the subscribers of every process."""
+
+        self.connect().send(event)
+
+    def deliver(self, event):
+        """Hand ``event`` to the subscribers of this process."""
+
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if not subscription.accepts(event):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's loop is gone; its stream will never read again.
+                self.unsubscribe(subscription)
+
+
+planner_changes = PlannerChangeBroker()
+
+
+def publish_on_commit(event_type, team_ids=(), **fields):
+    event = {"type": event_type, **fields, "team_ids": sorted(team_ids)}
+    transaction.on_commit(partial(planner_changes.publish, event))
@@ -0,0 +1,168 @@
+"""Replay and compaction of the planner change log.
+
+``PlannerChange`` rows hold id-addressed operations in the format of
+``planner.operations`` plus ``/desks/<team_id>`` entries for desk settings.
+``PlannerSnapshot`` rows hold the full state as of a given change, so the
+state at any retained sequence number is one snapshot plus a bounded replay.
+Item order is not logged; replay keeps items in the order they were added.
+"""
+
+import copy
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from planner.models import PlannerSnapshot, TeamPlannerDesk, planner_default_columns
+from planner.operations import COLLECTIONS, WORKSPACE_FIELDS, parse_operations, set_path
+from planner.sync import sync_team_desks_from_workspace
+from planner.utils import item_id, to_int
+
+SNAPSHOT_EVERY = 200
+KEEP_SNAPSHOTS = 3
+DESKS_PREFIX = "/desks/"
+
+
+class PlannerHistoryUnavailable(Exception):
+    """Raised when the changes needed for a replay were compacted away."""
+
+
+def empty_state():
+    return {
+        "enrollment_closed": False,
+        "participants": [],
+        "columns": planner_default_columns(),
+        "teams": [],
+        "parent_tasks": [],
+        "subtasks": [],
+        "desks": {},
+    }
+
+
+def capture_state(workspace):
+    state = {field: copy.deepcopy(getattr(workspace, field)) for field in WORKSPACE_FIELDS}
+    for name in COLLECTIONS:
+        state[name] = copy.deepcopy(getattr(workspace, name))
+    team_ids = [item_id(team) for team in state["teams"]]
+    desks = TeamPlannerDesk.objects.filter(team_id__in=team_ids).values("team_id", *TeamPlannerDesk.logged_fields)
+    state["desks"] = {str(desk.pop("team_id")): desk for desk in desks}
+    return state
+
+
+def apply_to_state(state, operations):
+    """Apply logged operations to a plain state dict in place."""
+    for operation in operations:
+        path = operation.get("path", "")
+        if path.startswith(DESKS_PREFIX):
+            state["desks"][path[len(DESKS_PREFIX):]] = operation["value"]
+            continue
+        for parsed in parse_operations([operation]):
+            _apply_one(state, parsed)
+    return state
+
+
+def _apply_one(state, operation):
+    op, segments, value = operation["op"], operation["segments"], operation["value"]
+    name = segments[0]
+    if name in WORKSPACE_FIELDS:
+        state[name] = value
+        return
+
+    items = state[name]
+    if segments[1] == "-":
+        key, value = item_id(value), value
+    else:
+        key = to_int(segments[1])
+        if op != "remove" and len(segments) == 2 and isinstance(value, dict):
+            value = {"id": key, **value}
+    index = next((index for index, item in enumerate(items) if item_id(item) == key), None)
+
+    field_path = segments[2:]
+    if not field_path:
+        if op == "remove":
+            state[name] = [item for item in items if item_id(item) != key]
+        elif index is None:
+            items.append(value)
+        else:
+            items[index] = value
+        return
+    if index is not None:
+        payload = copy.deepcopy(items[index])
+        set_path(payload, field_path, value, remove=op == "remove")
+        items[index] = payload
+
+
+def state_at(workspace, change_id=None):
+    """Rebuild the workspace state as of ``change_id`` (the latest when omitted)."""
+    snapshots = workspace.snapshots.all()
+    if change_id is not None:
+        snapshots = snapshots.filter(change_id__lte=change_id)
+    snapshot = snapshots.order_by("-change_id").first()
+    if snapshot is None:
+        if workspace.snapshots.exists():
+            raise PlannerHistoryUnavailable(f"Changes before #{change_id} were compacted")
+        state, start = empty_state(), 0
+    else:
+        state, start = copy.deepcopy(snapshot.state), snapshot.change_id
+
+    changes = workspace.changes.filter(id__gt=start)
+    if change_id is not None:
+        changes = changes.filter(id__lte=change_id)
+    for operations in changes.order_by("id").values_list("operations", flat=True).iterator():
+        apply_to_state(state, operations)
+    return state
+
+
+def history_floor(workspaces):
+    """Oldest sequence number the retained log can still be replayed from."""
+    oldest = (
+        PlannerSnapshot.objects.filter(workspace__in=workspaces)
+        .values("workspace")
+        .annotate(oldest=Min("change_id"))
+        .aggregate(floor=Max("oldest"))["floor"]
+    )
+    return oldest or 0
+
+
+def compact(workspace, min_changes=SNAPSHOT_EVERY, keep_snapshots=KEEP_SNAPSHOTS):
+    """Snapshot once ``min_changes`` piled up and drop history older than the kept snapshots.
+
+    Returns the new snapshot or ``None``.
+    """
+    snapshot = None
+    with transaction.atomic():
+        workspace.lock_for_update()
+        last = workspace.snapshots.aggregate(last=Max("change_id"))["last"] or 0
+        pending = workspace.changes.filter(id__gt=last).aggregate(count=Count("id"), latest=Max("id"))
+        if pending["count"] >= min_changes:
+            snapshot = PlannerSnapshot.objects.create(
+                workspace=workspace, change_id=pending["latest"], state=capture_state(workspace)
+            )
+
+        kept = list(workspace.snapshots.order_by("-change_id").values_list("change_id", flat=True)[:keep_snapshots])
+        if len(kept) == keep_snapshots:
+            oldest = kept[-1]
+            workspace.snapshots.filter(change_id__lt=oldest).delete()
+            workspace.changes.filter(id__lte=oldest).delete()
+    return snapshot
+
+
+def restore(workspace, change_id, author=None):
+    """Write the state as of ``change_id`` back; the restore itself is logged as a change."""
+    state = state_at(workspace, change_id)
+    with transaction.atomic():
+        workspace.lock_for_update()
+        for field in WORKSPACE_FIELDS:
+            setattr(workspace, field, state[field])
+        for name in COLLECTIONS:
+            setattr(workspace, name, state[name])
+        workspace.changed_by = author
+        workspace.save()
+        sync_team_desks_from_workspace(workspace, workspace.pop_touched_team_ids())
+
+        desks = TeamPlannerDesk.objects.filter(team_id__in=[int(team_id) for team_id in state["desks"]])
+        for desk in desks:
+            for field, value in state["desks"][str(desk.team_id)].items():
+                setattr(desk, field, value)
+            desk.changed_by = author
+            desk.save()
+    return workspace
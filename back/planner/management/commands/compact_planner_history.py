@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from planner.history import KEEP_SNAPSHOTS, SNAPSHOT_EVERY, compact
+from planner.models import PlannerWorkspaceState
+
+
+class Command(BaseCommand):
+    help = "Snapshot planner workspaces with enough new changes and prune history older than the kept snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-changes", type=int, default=SNAPSHOT_EVERY)
+        parser.add_argument("--keep", type=int, default=KEEP_SNAPSHOTS)
+
+    def handle(self, *args, **options):
+        created = 0
+        for workspace in PlannerWorkspaceState.objects.order_by("id"):
+            if compact(workspace, min_changes=options["min_changes"], keep_snapshots=max(1, options["keep"])):
+                created += 1
+        self.stdout.write(self.style.SUCCESS(f"Snapshots created: {created}"))
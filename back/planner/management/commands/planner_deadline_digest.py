@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from planner.deadlines import DUE_SOON_DAYS, deadlines
+from planner.models import PlannerWorkspaceState, TeamPlannerDesk
+
+
+class Command(BaseCommand):
+    help = "Print overdue and due-soon planner subtasks grouped by team, for curator digests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=DUE_SOON_DAYS)
+        parser.add_argument("--event", type=int, help="Only the workspace of this event")
+
+    def handle(self, *args, **options):
+        if options["event"] is not None:
+            workspaces = PlannerWorkspaceState.objects.filter(event_id=options["event"])
+            if not workspaces.exists():
+                raise CommandError(f"Event #{options['event']} has no planner workspace")
+        else:
+            workspaces = PlannerWorkspaceState.active()
+
+        overdue, due_soon = deadlines(workspaces, days=max(1, options["days"]))
+        teams = {}
+        for label, subtasks in (("просрочено", overdue), ("скоро срок", due_soon)):
+            for team_id, payload, end_date in subtasks.values_list("team_id", "payload", "end_date"):
+                teams.setdefault(team_id, []).append((label, end_date, payload))
+
+        if not teams:
+            self.stdout.write(self.style.SUCCESS("Просроченных задач и задач со скорым сроком нет"))
+            return
+
+        desks = TeamPlannerDesk.objects.in_bulk([team_id for team_id in teams if team_id is not None], field_name="team_id")
+        for team_id in sorted(teams, key=lambda key: (key is None, key or 0)):
+            desk = desks.get(team_id)
+            title = desk.team_name if desk and desk.team_name else f"Команда #{team_id}" if team_id else "Без команды"
+            curator = f", куратор #{desk.curator_id}" if desk and desk.curator_id else ""
+            self.stdout.write(f"{title}{curator}:")
+            for label, end_date, payload in teams[team_id]:
+                assignee = payload.get("assigneeId", payload.get("assignee_id"))
+                who = f" (исполнитель #{assignee})" if assignee else ""
+                self.stdout.write(f"  [{label}] {end_date.isoformat()} #{payload.get('id')} {payload.get('title', '')}{who}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from planner.history import PlannerHistoryUnavailable, restore
+from planner.models import PlannerWorkspaceState
+
+
+class Command(BaseCommand):
+    help = "Restore a planner workspace to its state as of a change sequence number"
+
+    def add_arguments(self, parser):
+        parser.add_argument("workspace_id", type=int)
+        parser.add_argument("seq", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            workspace = PlannerWorkspaceState.objects.get(pk=options["workspace_id"])
+        except PlannerWorkspaceState.DoesNotExist:
+            raise CommandError(f"Workspace {options['workspace_id']} does not exist")
+        try:
+            restore(workspace, options["seq"])
+        except PlannerHistoryUnavailable as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Workspace {workspace.pk} restored to #{options['seq']}"))
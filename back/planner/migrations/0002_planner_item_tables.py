@@ -0,0 +1,103 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlannerTeam",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("position", models.PositiveIntegerField(default=0)),
+                ("payload", models.JSONField(default=dict)),
+                ("team_id", models.BigIntegerField(blank=True, null=True)),
+                ("name", models.CharField(blank=True, max_length=255)),
+                ("curator_id", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="team_items",
+                        to="planner.plannerworkspacestate",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "CRM_PLANNER_TEAM",
+                "indexes": [
+                    models.Index(fields=["workspace", "team_id"], name="planner_team_ws_team_idx"),
+                    models.Index(fields=["curator_id"], name="planner_team_curator_idx"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="PlannerParentTask",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("position", models.PositiveIntegerField(default=0)),
+                ("payload", models.JSONField(default=dict)),
+                ("task_id", models.BigIntegerField(blank=True, null=True)),
+                ("team_id", models.BigIntegerField(blank=True, null=True)),
+                ("start_date", models.DateField(blank=True, null=True)),
+                ("end_date", models.DateField(blank=True, null=True)),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="parent_task_items",
+                        to="planner.plannerworkspacestate",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "CRM_PLANNER_PARENT_TASK",
+                "indexes": [
+                    models.Index(fields=["workspace", "team_id"], name="planner_parent_ws_team_idx"),
+                    models.Index(fields=["workspace", "task_id"], name="planner_parent_ws_task_idx"),
+                    models.Index(fields=["start_date", "end_date"], name="planner_parent_dates_idx"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="PlannerSubtask",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("position", models.PositiveIntegerField(default=0)),
+                ("payload", models.JSONField(default=dict)),
+                ("task_id", models.BigIntegerField(blank=True, null=True)),
+                ("team_id", models.BigIntegerField(blank=True, null=True)),
+                ("parent_task_id", models.BigIntegerField(blank=True, null=True)),
+                ("assignee_id", models.BigIntegerField(blank=True, null=True)),
+                ("status", models.CharField(blank=True, max_length=255)),
+                ("in_sprint", models.BooleanField(default=False)),
+                ("start_date", models.DateField(blank=True, null=True)),
+                ("end_date", models.DateField(blank=True, null=True)),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subtask_items",
+                        to="planner.plannerworkspacestate",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "CRM_PLANNER_SUBTASK",
+                "indexes": [
+                    models.Index(fields=["workspace", "team_id"], name="planner_subtask_ws_team_idx"),
+                    models.Index(fields=["workspace", "task_id"], name="planner_subtask_ws_task_idx"),
+                    models.Index(fields=["assignee_id"], name="planner_subtask_assignee_idx"),
+                    models.Index(fields=["status"], name="planner_subtask_status_idx"),
+                    models.Index(fields=["start_date", "end_date"], name="planner_subtask_dates_idx"),
+                    models.Index(fields=["end_date"], name="planner_subtask_end_idx"),
+                ],
+            },
+        ),
+    ]
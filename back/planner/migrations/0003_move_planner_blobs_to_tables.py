@@ -0,0 +1,144 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:12
+
+from django.db import migrations
+
+from planner.utils import (
+    as_list,
+    assignee_id_from_item,
+    date_from_item,
+    item_id,
+    item_value,
+    parent_task_id_from_item,
+    team_id_from_item,
+    to_int,
+)
+
+
+def _team_row(model, workspace, item, position):
+    return model(
+        workspace=workspace,
+        position=position,
+        payload=item,
+        team_id=item_id(item),
+        name=str(item_value(item, "name", "name", "") or "")[:255],
+        curator_id=to_int(item_value(item, "curatorId", "curator_id")),
+    )
+
+
+def _parent_task_row(model, workspace, item, position, team_id=None):
+    return model(
+        workspace=workspace,
+        position=position,
+        payload=item,
+        task_id=item_id(item),
+        team_id=team_id if team_id is not None else team_id_from_item(item),
+        start_date=date_from_item(item, "startDate", "start_date"),
+        end_date=date_from_item(item, "endDate", "end_date"),
+    )
+
+
+def _subtask_row(model, workspace, item, position, team_id=None):
+    return model(
+        workspace=workspace,
+        position=position,
+        payload=item,
+        task_id=item_id(item),
+        team_id=team_id if team_id is not None else team_id_from_item(item),
+        parent_task_id=parent_task_id_from_item(item),
+        assignee_id=assignee_id_from_item(item),
+        status=str(item_value(item, "status", "status", "") or "")[:255],
+        in_sprint=bool(item_value(item, "inSprint", "in_sprint", False)),
+        start_date=date_from_item(item, "startDate", "start_date"),
+        end_date=date_from_item(item, "endDate", "end_date"),
+    )
+
+
+def move_blobs_to_tables(apps, schema_editor):
+    PlannerWorkspaceState = apps.get_model("planner", "PlannerWorkspaceState")
+    TeamPlannerDesk = apps.get_model("planner", "TeamPlannerDesk")
+    PlannerTeam = apps.get_model("planner", "PlannerTeam")
+    PlannerParentTask = apps.get_model("planner", "PlannerParentTask")
+    PlannerSubtask = apps.get_model("planner", "PlannerSubtask")
+
+    workspaces = list(PlannerWorkspaceState.objects.order_by("id"))
+    for workspace in workspaces:
+        PlannerTeam.objects.bulk_create(
+            [_team_row(PlannerTeam, workspace, item, index) for index, item in enumerate(as_list(workspace.teams))]
+        )
+        PlannerParentTask.objects.bulk_create(
+            [
+                _parent_task_row(PlannerParentTask, workspace, item, index)
+                for index, item in enumerate(as_list(workspace.parent_tasks))
+            ]
+        )
+        PlannerSubtask.objects.bulk_create(
+            [
+                _subtask_row(PlannerSubtask, workspace, item, index)
+                for index, item in enumerate(as_list(workspace.subtasks))
+            ]
+        )
+
+    desks = list(TeamPlannerDesk.objects.order_by("team_id"))
+    if not desks:
+        return
+
+    # Desks were copies of the first workspace; only boards edited on their own
+    # (no rows for the team yet) carry data that still has to be moved.
+    current = workspaces[0] if workspaces else PlannerWorkspaceState.objects.create()
+    for model, attr, build in (
+        (PlannerParentTask, "parent_tasks", _parent_task_row),
+        (PlannerSubtask, "subtasks", _subtask_row),
+    ):
+        known_team_ids = set(
+            model.objects.filter(workspace=current).values_list("team_id", flat=True).distinct()
+        )
+        known_task_ids = set(
+            model.objects.filter(workspace=current, task_id__isnull=False).values_list("task_id", flat=True)
+        )
+        position = model.objects.filter(workspace=current).count()
+        rows = []
+        for desk in desks:
+            if desk.team_id in known_team_ids:
+                continue
+            for item in as_list(getattr(desk, attr)):
+                if item_id(item) is not None and item_id(item) in known_task_ids:
+                    continue
+                rows.append(build(model, current, item, position, team_id=desk.team_id))
+                position += 1
+        model.objects.bulk_create(rows)
+
+
+def move_tables_to_blobs(apps, schema_editor):
+    PlannerWorkspaceState = apps.get_model("planner", "PlannerWorkspaceState")
+    TeamPlannerDesk = apps.get_model("planner", "TeamPlannerDesk")
+    PlannerTeam = apps.get_model("planner", "PlannerTeam")
+    PlannerParentTask = apps.get_model("planner", "PlannerParentTask")
+    PlannerSubtask = apps.get_model("planner", "PlannerSubtask")
+
+    def payloads(model, **filters):
+        return list(model.objects.filter(**filters).order_by("position", "id").values_list("payload", flat=True))
+
+    workspaces = list(PlannerWorkspaceState.objects.order_by("id"))
+    for workspace in workspaces:
+        workspace.teams = payloads(PlannerTeam, workspace=workspace)
+        workspace.parent_tasks = payloads(PlannerParentTask, workspace=workspace)
+        workspace.subtasks = payloads(PlannerSubtask, workspace=workspace)
+        workspace.save(update_fields=["teams", "parent_tasks", "subtasks"])
+
+    if not workspaces:
+        return
+    for desk in TeamPlannerDesk.objects.all():
+        desk.parent_tasks = payloads(PlannerParentTask, workspace=workspaces[0], team_id=desk.team_id)
+        desk.subtasks = payloads(PlannerSubtask, workspace=workspaces[0], team_id=desk.team_id)
+        desk.save(update_fields=["parent_tasks", "subtasks"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0002_planner_item_tables"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_blobs_to_tables, move_tables_to_blobs),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-18 07:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0003_move_planner_blobs_to_tables"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="plannerworkspacestate",
+            name="teams",
+        ),
+        migrations.RemoveField(
+            model_name="plannerworkspacestate",
+            name="parent_tasks",
+        ),
+        migrations.RemoveField(
+            model_name="plannerworkspacestate",
+            name="subtasks",
+        ),
+        migrations.RemoveField(
+            model_name="teamplannerdesk",
+            name="parent_tasks",
+        ),
+        migrations.RemoveField(
+            model_name="teamplannerdesk",
+            name="subtasks",
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0004_remove_planner_blob_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plannerworkspacestate",
+            name="version",
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="teamplannerdesk",
+            name="version",
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+    ]
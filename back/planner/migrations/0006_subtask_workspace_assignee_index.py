@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0005_planner_versions"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="plannersubtask",
+            name="planner_subtask_assignee_idx",
+        ),
+        migrations.AddIndex(
+            model_name="plannersubtask",
+            index=models.Index(fields=["workspace", "assignee_id"], name="planner_sub_ws_assignee_idx"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0006_subtask_workspace_assignee_index"),
+        ("users", "0003_alter_eventspecialization_unique_together_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plannerworkspacestate",
+            name="archived",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="plannerworkspacestate",
+            name="event",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="planner_workspace",
+                to="users.event",
+            ),
+        ),
+    ]
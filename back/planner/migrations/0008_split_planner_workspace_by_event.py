@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+def split_by_event(apps, schema_editor):
+    PlannerWorkspaceState = apps.get_model("planner", "PlannerWorkspaceState")
+    PlannerTeam = apps.get_model("planner", "PlannerTeam")
+    PlannerParentTask = apps.get_model("planner", "PlannerParentTask")
+    PlannerSubtask = apps.get_model("planner", "PlannerSubtask")
+    Event = apps.get_model("users", "Event")
+
+    shared = PlannerWorkspaceState.objects.filter(event__isnull=True).order_by("id").first()
+    if shared is None:
+        return
+
+    team_ids_by_event = {}
+    for team_id, payload in PlannerTeam.objects.filter(workspace=shared).values_list("team_id", "payload"):
+        if not isinstance(payload, dict) or team_id is None:
+            continue
+        try:
+            event_id = int(payload.get("eventId", payload.get("event_id")))
+        except (TypeError, ValueError):
+            continue
+        team_ids_by_event.setdefault(event_id, set()).add(team_id)
+
+    existing_events = set(Event.objects.filter(pk__in=team_ids_by_event).values_list("pk", flat=True))
+    for event_id, team_ids in team_ids_by_event.items():
+        if event_id not in existing_events:
+            continue
+        workspace, _ = PlannerWorkspaceState.objects.get_or_create(
+            event_id=event_id,
+            defaults={"columns": shared.columns, "enrollment_closed": shared.enrollment_closed},
+        )
+        for model in (PlannerTeam, PlannerParentTask, PlannerSubtask):
+            model.objects.filter(workspace=shared, team_id__in=team_ids).update(workspace=workspace)
+
+
+def merge_into_shared(apps, schema_editor):
+    PlannerWorkspaceState = apps.get_model("planner", "PlannerWorkspaceState")
+    PlannerTeam = apps.get_model("planner", "PlannerTeam")
+    PlannerParentTask = apps.get_model("planner", "PlannerParentTask")
+    PlannerSubtask = apps.get_model("planner", "PlannerSubtask")
+
+    event_workspaces = PlannerWorkspaceState.objects.filter(event__isnull=False)
+    if not event_workspaces.exists():
+        return
+    shared = PlannerWorkspaceState.objects.filter(event__isnull=True).order_by("id").first()
+    if shared is None:
+        shared = PlannerWorkspaceState.objects.create()
+    for model in (PlannerTeam, PlannerParentTask, PlannerSubtask):
+        model.objects.filter(workspace__in=event_workspaces).update(workspace=shared)
+    event_workspaces.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0007_planner_event_workspaces"),
+    ]
+
+    operations = [
+        migrations.RunPython(split_by_event, merge_into_shared),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0008_split_planner_workspace_by_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlannerSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('change_id', models.BigIntegerField(default=0)),
+                ('state', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='planner.plannerworkspacestate')),
+            ],
+            options={
+                'db_table': 'CRM_PLANNER_SNAPSHOT',
+                'ordering': ('change_id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='PlannerChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operations', models.JSONField(default=list)),
+                ('team_ids', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='planner.plannerworkspacestate')),
+            ],
+            options={
+                'db_table': 'CRM_PLANNER_CHANGE',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['workspace', 'id'], name='planner_change_ws_seq_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='plannersnapshot',
+            constraint=models.UniqueConstraint(fields=('workspace', 'change_id'), name='planner_snapshot_ws_change_uniq'),
+        ),
+    ]
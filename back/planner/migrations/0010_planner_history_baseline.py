@@ -0,0 +1,50 @@
+from django.db import migrations
+
+COLLECTIONS = {
+    "teams": "PlannerTeam",
+    "parent_tasks": "PlannerParentTask",
+    "subtasks": "PlannerSubtask",
+}
+DESK_FIELDS = ("team_name", "curator_id", "member_ids", "columns")
+
+
+def snapshot_existing_workspaces(apps, schema_editor):
+    PlannerWorkspaceState = apps.get_model("planner", "PlannerWorkspaceState")
+    PlannerSnapshot = apps.get_model("planner", "PlannerSnapshot")
+    PlannerTeam = apps.get_model("planner", "PlannerTeam")
+    TeamPlannerDesk = apps.get_model("planner", "TeamPlannerDesk")
+
+    for workspace in PlannerWorkspaceState.objects.all():
+        state = {
+            "enrollment_closed": workspace.enrollment_closed,
+            "participants": workspace.participants,
+            "columns": workspace.columns,
+        }
+        for name, model_name in COLLECTIONS.items():
+            model = apps.get_model("planner", model_name)
+            state[name] = list(
+                model.objects.filter(workspace=workspace).order_by("position", "id").values_list("payload", flat=True)
+            )
+        team_ids = PlannerTeam.objects.filter(workspace=workspace, team_id__isnull=False).values_list(
+            "team_id", flat=True
+        )
+        state["desks"] = {
+            str(desk.pop("team_id")): desk
+            for desk in TeamPlannerDesk.objects.filter(team_id__in=team_ids).values("team_id", *DESK_FIELDS)
+        }
+        PlannerSnapshot.objects.create(workspace=workspace, change_id=0, state=state)
+
+
+def drop_baseline(apps, schema_editor):
+    apps.get_model("planner", "PlannerSnapshot").objects.filter(change_id=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0009_planner_change_log"),
+    ]
+
+    operations = [
+        migrations.RunPython(snapshot_existing_workspaces, drop_baseline),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.6 on 2026-10-18 10:40
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0010_planner_history_baseline"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="teamplannerdesk",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["member_ids"], name="planner_desk_members_gin"),
+        ),
+        migrations.AddIndex(
+            model_name="teamplannerdesk",
+            index=models.Index(fields=["curator_id"], name="planner_desk_curator_idx"),
+        ),
+    ]
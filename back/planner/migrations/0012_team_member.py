@@ -0,0 +1,47 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_team_members(apps, schema_editor):
+    TeamPlannerDesk = apps.get_model("planner", "TeamPlannerDesk")
+    TeamMember = apps.get_model("planner", "TeamMember")
+
+    members = []
+    for team_id, member_ids in TeamPlannerDesk.objects.values_list("team_id", "member_ids").iterator():
+        user_ids = set()
+        for member_id in member_ids if isinstance(member_ids, list) else []:
+            try:
+                user_ids.add(int(member_id))
+            except (TypeError, ValueError):
+                continue
+        members.extend(TeamMember(desk_id=team_id, user_id=user_id) for user_id in sorted(user_ids))
+    TeamMember.objects.bulk_create(members, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("planner", "0011_team_desk_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TeamMember",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("user_id", models.BigIntegerField()),
+                ("desk", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="memberships", to="planner.teamplannerdesk", to_field="team_id")),
+            ],
+            options={
+                "db_table": "CRM_TEAM_MEMBER",
+                "indexes": [models.Index(fields=["user_id", "desk"], name="team_member_user_desk_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="teammember",
+            constraint=models.UniqueConstraint(fields=("desk", "user_id"), name="team_member_desk_user_uniq"),
+        ),
+        migrations.RunPython(fill_team_members, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 11:40
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0012_team_member'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plannerparenttask',
+            index=django.contrib.postgres.indexes.GistIndex(models.Func(django.db.models.functions.comparison.Least('start_date', 'end_date'), django.db.models.functions.comparison.Greatest('start_date', 'end_date'), models.Value('[]'), function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField()), name='planner_parent_span_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='plannersubtask',
+            index=django.contrib.postgres.indexes.GistIndex(models.Func(django.db.models.functions.comparison.Least('start_date', 'end_date'), django.db.models.functions.comparison.Greatest('start_date', 'end_date'), models.Value('[]'), function='daterange', output_field=django.contrib.postgres.fields.ranges.DateRangeField()), name='planner_subtask_span_gist'),
+        ),
+    ]
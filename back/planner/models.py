@@ -1,17 +1,180 @@
-from django.db import models
+import copy
+
+from django.conf import settings
+from django.contrib.postgres.fields import DateRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.db import models, transaction
+from django.db.backends.postgresql.psycopg_any import DateRange
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from planner.utils import (
+    as_list,
+    assignee_id_from_item,
+    date_from_item,
+    item_id,
+    item_value,
+    parent_task_id_from_item,
+    team_id_from_item,
+    team_with_desk_fields,
+    to_int,
+)
 
 
 def planner_default_columns():
     return ["Запланировано", "В работе", "На проверке", "Готово"]
 
 
-class PlannerWorkspaceState(models.Model):
+class PlannerVersionConflict(Exception):
+    def __init__(self, current_version):
+        super().__init__(f"Version conflict: current version is {current_version}")
+        self.current_version = current_version
+
+
+class VersionedModelMixin:
+    """Bump ``version`` on every save of an existing row.
+
+    The current value is read under ``select_for_update`` so concurrent
+    writers serialize; setting ``expected_version`` turns the save into a
+    conditional write that raises ``PlannerVersionConflict`` on mismatch.
+    """
+
+    expected_version = None
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            if not self._state.adding and self.pk is not None:
+                current = type(self).objects.select_for_update().values_list("version", flat=True).get(pk=self.pk)
+                if self.expected_version is not None and self.expected_version != current:
+                    raise PlannerVersionConflict(current)
+                self.version = current + 1
+                if kwargs.get("update_fields") is not None:
+                    kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+            super().save(*args, **kwargs)
+        self.expected_version = None
+
+
+class PlannerItemCollectionsMixin:
+    """Expose planner item tables as JSON-like lists on a model instance.
+
+    Reads assemble the list from rows ordered by ``position``; assignments are
+    staged and written to the tables by ``save()``. Every save that changes
+    items or ``logged_fields`` appends a ``PlannerChange`` with the
+    equivalent id-addressed operations.
+
+    Subclasses provide the storage hooks:
+
+    * ``_item_rows(model)`` returns the queryset of this instance's rows;
+    * ``_write_item_rows(model, items, changes=None)`` replaces them with
+      ``items``, appends the operations to ``changes`` and returns the ids
+      of the teams it touched;
+    * ``_field_change_operations(fields)`` returns the operations for the
+      changed ``logged_fields``;
+    * ``change_log_workspace()`` returns the workspace the log belongs to.
+    """
+
+    logged_fields = ()
+    changed_by = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_logged_fields()
+        return instance
+
+    def _get_items(self, model):
+        cache = self.__dict__.setdefault("_planner_items", {})
+        if model not in cache:
+            cache[model] = [] if self.pk is None else list(
+                self._item_rows(model).order_by("position", "id").values_list("payload", flat=True)
+            )
+        return cache[model]
+
+    def limit_items(self, model, **filters):
+        """Read only the rows matching ``filters`` into the collection, for display."""
+        self.__dict__.setdefault("_planner_items", {})[model] = list(
+            self._item_rows(model).filter(**filters).order_by("position", "id").values_list("payload", flat=True)
+        )
+
+    def _set_items(self, model, value):
+        items = as_list(value)
+        self.__dict__.setdefault("_planner_items", {})[model] = items
+        self.__dict__.setdefault("_planner_pending_items", {})[model] = items
+
+    def _flush_items(self):
+        pending = self.__dict__.pop("_planner_pending_items", {})
+        touched = self.__dict__.setdefault("_planner_touched_team_ids", set())
+        changes = self.__dict__.setdefault("_planner_changes", [])
+        for model, items in pending.items():
+            team_ids = self._write_item_rows(model, items, changes)
+            touched |= team_ids
+            self.__dict__.setdefault("_planner_change_team_ids", set()).update(team_ids)
+
+    def record_changes(self, operations, team_ids=()):
+        """Add operations applied outside ``save()`` to the next change log entry."""
+        self.__dict__.setdefault("_planner_changes", []).extend(operations)
+        self.__dict__.setdefault("_planner_change_team_ids", set()).update(team_ids)
+
+    def _remember_logged_fields(self):
+        self._logged_values = {
+            field: copy.deepcopy(self.__dict__[field]) for field in self.logged_fields if field in self.__dict__
+        }
+
+    def _changed_logged_fields(self):
+        loaded = self.__dict__.get("_logged_values")
+        changed = []
+        for field in self.logged_fields:
+            if loaded is None:
+                before = self._meta.get_field(field).get_default()
+            elif field in loaded:
+                before = loaded[field]
+            else:
+                continue
+            if getattr(self, field) != before:
+                changed.append(field)
+        return changed
+
+    def _log_changes(self):
+        changed = self._changed_logged_fields()
+        operations = self._field_change_operations(changed) if changed else []
+        operations += self.__dict__.pop("_planner_changes", [])
+        team_ids = self.__dict__.pop("_planner_change_team_ids", set())
+        team_ids.discard(None)
+        self._remember_logged_fields()
+        if operations:
+            PlannerChange.objects.create(
+                workspace=self.change_log_workspace(),
+                author_id=getattr(self.changed_by, "pk", None),
+                operations=operations,
+                team_ids=sorted(team_ids),
+            )
+
+    def _reset_items(self):
+        self.__dict__.pop("_planner_items", None)
+        self.__dict__.pop("_planner_pending_items", None)
+
+    def pop_touched_team_ids(self):
+        """Return ids of teams whose rows changed in saves since the last call."""
+        return self.__dict__.pop("_planner_touched_team_ids", set())
+
+
+class PlannerWorkspaceState(VersionedModelMixin, PlannerItemCollectionsMixin, models.Model):
+    """Planner state of one event, or the shared workspace when ``event`` is empty."""
+
+    logged_fields = ("enrollment_closed", "participants", "columns")
+
+    event = models.OneToOneField(
+        "users.Event",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="planner_workspace",
+    )
+    archived = models.BooleanField(default=False)
     enrollment_closed = models.BooleanField(default=False)
     participants = models.JSONField(default=list)
-    teams = models.JSONField(default=list)
-    parent_tasks = models.JSONField(default=list)
-    subtasks = models.JSONField(default=list)
     columns = models.JSONField(default=planner_default_columns)
+    version = models.PositiveBigIntegerField(default=1)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -20,20 +183,543 @@ class PlannerWorkspaceState(models.Model):
     def __str__(self):
         return "Состояние планировщика"
 
+    @classmethod
+    def current(cls):
+        state = cls.objects.filter(event__isnull=True).order_by("id").first()
+        if state:
+            return state
+        return cls.objects.create()
+
+    @classmethod
+    def for_event(cls, event_id):
+        state = cls.objects.filter(event_id=event_id).first()
+        if state:
+            return state
+        # New event boards start from the shared board's settings, as migration 0008 did.
+        shared = cls.current()
+        state, _ = cls.objects.get_or_create(
+            event_id=event_id,
+            defaults={"columns": shared.columns, "enrollment_closed": shared.enrollment_closed},
+        )
+        return state
+
+    @classmethod
+    def active(cls):
+        """Shared workspace first, then every event workspace that is not archived."""
+        shared = cls.current()
+        events = cls.objects.filter(event__isnull=False, archived=False).order_by("event_id")
+        return [shared, *events]
+
+    @classmethod
+    def prefetch_items(cls, workspaces, model, **filters):
+        """Load ``model`` rows of several workspaces with a single query."""
+        grouped = {workspace.pk: [] for workspace in workspaces}
+        rows = (
+            model.objects.filter(workspace__in=list(grouped), **filters)
+            .order_by("position", "id")
+            .values_list("workspace_id", "payload")
+        )
+        for workspace_id, payload in rows:
+            grouped[workspace_id].append(payload)
+        for workspace in workspaces:
+            workspace.__dict__.setdefault("_planner_items", {})[model] = grouped[workspace.pk]
+
+    def lock_for_update(self):
+        """Lock the row for the current transaction and reload everything read before the lock."""
+        self.copy_from(type(self).objects.select_for_update().get(pk=self.pk))
+
+    def copy_from(self, other):
+        for field in self._meta.concrete_fields:
+            setattr(self, field.attname, getattr(other, field.attname))
+        self._reset_items()
+        self._remember_logged_fields()
 
-class TeamPlannerDesk(models.Model):
+    def touch(self, step=1):
+        """Bump version and ``updated_at`` after rows were changed from elsewhere."""
+        type(self).objects.filter(pk=self.pk).update(version=models.F("version") + step, updated_at=timezone.now())
+
+    @property
+    def teams(self):
+        return self._get_items(PlannerTeam)
+
+    @teams.setter
+    def teams(self, value):
+        self._set_items(PlannerTeam, value)
+
+    @property
+    def parent_tasks(self):
+        return self._get_items(PlannerParentTask)
+
+    @parent_tasks.setter
+    def parent_tasks(self, value):
+        self._set_items(PlannerParentTask, value)
+
+    @property
+    def subtasks(self):
+        return self._get_items(PlannerSubtask)
+
+    @subtasks.setter
+    def subtasks(self, value):
+        self._set_items(PlannerSubtask, value)
+
+    def _item_rows(self, model):
+        return model.objects.filter(workspace=self)
+
+    def _write_item_rows(self, model, items, changes=None):
+        return model.sync_rows(self, self._item_rows(model).order_by("position", "id"), items, changes=changes)
+
+    def _field_change_operations(self, fields):
+        return [{"op": "replace", "path": f"/{field}", "value": getattr(self, field)} for field in fields]
+
+    def change_log_workspace(self):
+        return self
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            self._flush_items()
+            self._log_changes()
+
+    def refresh_from_db(self, *args, **kwargs):
+        self._reset_items()
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_logged_fields()
+
+
+class TeamPlannerDesk(VersionedModelMixin, PlannerItemCollectionsMixin, models.Model):
     team_id = models.BigIntegerField(unique=True)
     team_name = models.CharField(max_length=255, blank=True)
     curator_id = models.BigIntegerField(null=True, blank=True)
     member_ids = models.JSONField(default=list)
-    parent_tasks = models.JSONField(default=list)
-    subtasks = models.JSONField(default=list)
     columns = models.JSONField(default=planner_default_columns)
+    version = models.PositiveBigIntegerField(default=1)
     updated_at = models.DateTimeField(auto_now=True)
 
+    logged_fields = ("team_name", "curator_id", "member_ids", "columns")
+
     class Meta:
         db_table = "CRM_TEAM_PLANNER_DESK"
         ordering = ("team_id",)
+        indexes = [
+            GinIndex(fields=["member_ids"], name="planner_desk_members_gin"),
+            models.Index(fields=["curator_id"], name="planner_desk_curator_idx"),
+        ]
 
     def __str__(self):
         return f"Доска команды #{self.team_id}"
+
+    @property
+    def parent_tasks(self):
+        return self._get_items(PlannerParentTask)
+
+    @parent_tasks.setter
+    def parent_tasks(self, value):
+        self._set_items(PlannerParentTask, value)
+
+    @property
+    def subtasks(self):
+        return self._get_items(PlannerSubtask)
+
+    @subtasks.setter
+    def subtasks(self, value):
+        self._set_items(PlannerSubtask, value)
+
+    @classmethod
+    def prefetch_items(cls, desks):
+        """Load tasks of many desks with one query per item table."""
+        desks = list(desks)
+        team_ids = [desk.team_id for desk in desks]
+        owners = {}
+        for team_id, workspace_id in (
+            PlannerTeam.objects.filter(team_id__in=team_ids).order_by("-workspace_id").values_list("team_id", "workspace_id")
+        ):
+            owners[team_id] = workspace_id
+        shared_id = None
+        if len(owners) < len(set(team_ids)):
+            shared_id = PlannerWorkspaceState.current().pk
+
+        for model in (PlannerParentTask, PlannerSubtask):
+            grouped = {team_id: [] for team_id in team_ids}
+            rows = (
+                model.objects.filter(team_id__in=team_ids)
+                .order_by("position", "id")
+                .values_list("team_id", "workspace_id", "payload")
+            )
+            for team_id, workspace_id, payload in rows:
+                if workspace_id == owners.get(team_id, shared_id):
+                    grouped[team_id].append(payload)
+            for desk in desks:
+                desk.__dict__.setdefault("_planner_items", {})[model] = grouped[desk.team_id]
+
+    @property
+    def workspace(self):
+        # The desk lives in whichever workspace holds its team row.
+        if "_workspace" not in self.__dict__:
+            team = (
+                PlannerTeam.objects.filter(team_id=self.team_id)
+                .select_related("workspace")
+                .order_by("workspace_id")
+                .first()
+            )
+            self._workspace = team.workspace if team else PlannerWorkspaceState.current()
+        return self._workspace
+
+    def _item_rows(self, model):
+        return model.objects.filter(workspace=self.workspace, team_id=self.team_id)
+
+    def _write_item_rows(self, model, items, changes=None):
+        rows = list(self._item_rows(model).order_by("position", "id"))
+        if rows:
+            start = rows[0].position
+        else:
+            last = model.objects.filter(workspace=self.workspace).aggregate(last=models.Max("position"))["last"]
+            start = 0 if last is None else last + 1
+        return model.sync_rows(self.workspace, rows, items, start=start, team_id=self.team_id, changes=changes)
+
+    def _field_change_operations(self, fields):
+        value = {field: getattr(self, field) for field in self.logged_fields}
+        return [{"op": "replace", "path": f"/desks/{self.team_id}", "value": value}]
+
+    def change_log_workspace(self):
+        return self.workspace
+
+    def _stage_team(self):
+        """Stage the desk metadata onto the team row of the workspace, adding the team if it is missing."""
+        teams = self._get_items(PlannerTeam)
+        team = teams[0] if teams else {"id": self.team_id}
+        fields = {field: getattr(self, field) for field in self.logged_fields}
+        merged = team_with_desk_fields(team, fields, self.workspace.columns)
+        if merged != team or not teams:
+            self._set_items(PlannerTeam, [merged])
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        changed = self._changed_logged_fields()
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if adding or "member_ids" in changed:
+                TeamMember.sync_desks({self.team_id: self.member_ids})
+            if changed and not adding:
+                # Desk edits are merged back so the next workspace sync keeps them.
+                self._stage_team()
+            self._flush_items()
+            if self.pop_touched_team_ids():
+                self.workspace.touch()
+            self.record_changes([], [self.team_id])
+            self._log_changes()
+
+    def refresh_from_db(self, *args, **kwargs):
+        self._reset_items()
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_logged_fields()
+
+
+class TeamMember(models.Model):
+    """One row per desk member, mirroring ``TeamPlannerDesk.member_ids`` for indexed lookups."""
+
+    desk = models.ForeignKey(
+        TeamPlannerDesk, to_field="team_id", on_delete=models.CASCADE, related_name="memberships"
+    )
+    user_id = models.BigIntegerField()
+
+    class Meta:
+        db_table = "CRM_TEAM_MEMBER"
+        constraints = [
+            models.UniqueConstraint(fields=["desk", "user_id"], name="team_member_desk_user_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["user_id", "desk"], name="team_member_user_desk_idx"),
+        ]
+
+    def __str__(self):
+        return f"Участник #{self.user_id} команды #{self.desk_id}"
+
+    @classmethod
+    def sync_desks(cls, members_by_team):
+        """Make membership rows match ``{team_id: member_ids}`` for the given desks."""
+        if not members_by_team:
+            return
+        wanted = set()
+        for team_id, member_ids in members_by_team.items():
+            for member_id in as_list(member_ids):
+                user_id = to_int(member_id)
+                if user_id is not None:
+                    wanted.add((team_id, user_id))
+
+        existing = {}
+        for pk, team_id, user_id in cls.objects.filter(desk_id__in=list(members_by_team)).values_list(
+            "pk", "desk_id", "user_id"
+        ):
+            existing[(team_id, user_id)] = pk
+        stale = [pk for key, pk in existing.items() if key not in wanted]
+        if stale:
+            cls.objects.filter(pk__in=stale).delete()
+        missing = wanted - set(existing)
+        if missing:
+            cls.objects.bulk_create(
+                [cls(desk_id=team_id, user_id=user_id) for team_id, user_id in sorted(missing)],
+                ignore_conflicts=True,
+            )
+
+
+class PlannerItem(models.Model):
+    """Single planner item; ``payload`` keeps the item exactly as the client sent it."""
+
+    key_field = "task_id"
+    collection = None
+
+    position = models.PositiveIntegerField(default=0)
+    payload = models.JSONField(default=dict)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def columns_from_item(cls, item):
+        return {}
+
+    @classmethod
+    def from_item(cls, workspace, item, position=0):
+        return cls(workspace=workspace, position=position, payload=item, **cls.columns_from_item(item))
+
+    def set_payload(self, item):
+        self.payload = item
+        for field, value in self.columns_from_item(item).items():
+            setattr(self, field, value)
+
+    @classmethod
+    def sync_rows(cls, workspace, rows, items, start=0, team_id=None, changes=None):
+        """Diff ``items`` against existing ``rows`` and write only what changed.
+
+        Rows are matched by ``key_field``; unchanged rows are left alone and the
+        rest is written with one delete, one ``bulk_update`` and one
+        ``bulk_create``. Returns the ids of teams whose rows changed; content
+        changes are appended to ``changes`` as operations when it is given.
+        """
+        existing = {}
+        stale = []
+        for row in rows:
+            key = getattr(row, cls.key_field)
+            if key is None or key in existing:
+                stale.append(row)
+            else:
+                existing[key] = row
+
+        to_create = []
+        to_update = []
+        touched = set()
+        for offset, item in enumerate(items):
+            candidate = cls.from_item(workspace, item, start + offset)
+            if team_id is not None:
+                candidate.team_id = team_id
+            key = getattr(candidate, cls.key_field)
+            row = existing.pop(key, None) if key is not None else None
+            if row is None:
+                to_create.append(candidate)
+                touched.add(candidate.team_id)
+                if changes is not None:
+                    changes.append({"op": "add", "path": f"/{cls.collection}/-", "value": candidate.payload})
+                continue
+            if (row.payload, row.position, row.team_id) != (candidate.payload, candidate.position, candidate.team_id):
+                touched.update((row.team_id, candidate.team_id))
+                if changes is not None and row.payload != candidate.payload:
+                    changes.append({"op": "replace", "path": f"/{cls.collection}/{key}", "value": candidate.payload})
+                for field in cls.synced_fields():
+                    setattr(row, field, getattr(candidate, field))
+                to_update.append(row)
+
+        if changes is not None:
+            changes.extend({"op": "remove", "path": f"/{cls.collection}/{key}"} for key in existing)
+        stale.extend(existing.values())
+        touched.update(row.team_id for row in stale)
+        if stale:
+            cls.objects.filter(pk__in=[row.pk for row in stale]).delete()
+        if to_update:
+            cls.objects.bulk_update(to_update, cls.synced_fields())
+        if to_create:
+            cls.objects.bulk_create(to_create)
+        touched.discard(None)
+        return touched
+
+    @classmethod
+    def synced_fields(cls):
+        return ["position", "payload", *cls.columns_from_item({})]
+
+
+class PlannerTeam(PlannerItem):
+    key_field = "team_id"
+    collection = "teams"
+
+    workspace = models.ForeignKey(
+        PlannerWorkspaceState, on_delete=models.CASCADE, related_name="team_items"
+    )
+    team_id = models.BigIntegerField(null=True, blank=True)
+    name = models.CharField(max_length=255, blank=True)
+    curator_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = "CRM_PLANNER_TEAM"
+        indexes = [
+            models.Index(fields=["workspace", "team_id"], name="planner_team_ws_team_idx"),
+            models.Index(fields=["curator_id"], name="planner_team_curator_idx"),
+        ]
+
+    def __str__(self):
+        return f"Команда #{self.team_id}"
+
+    @classmethod
+    def columns_from_item(cls, item):
+        return {
+            "team_id": item_id(item),
+            "name": str(item_value(item, "name", "name", "") or "")[:255],
+            "curator_id": to_int(item_value(item, "curatorId", "curator_id")),
+        }
+
+
+def planner_date_span():
+    """Inclusive ``daterange`` of an item's dates; swapped or missing bounds never raise."""
+    return models.Func(
+        Least("start_date", "end_date"),
+        Greatest("start_date", "end_date"),
+        models.Value("[]"),
+        function="daterange",
+        output_field=DateRangeField(),
+    )
+
+
+class DatedPlannerItem(PlannerItem):
+    """Planner item with ``start_date``/``end_date`` columns and a GiST index on their span."""
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def overlapping(cls, start, end):
+        """Rows whose dates overlap ``[start, end]``; items without any date are left out."""
+        return (
+            cls.objects.annotate(span=planner_date_span())
+            .filter(span__overlap=DateRange(start, end, "[]"))
+            .exclude(start_date__isnull=True, end_date__isnull=True)
+        )
+
+
+class PlannerParentTask(DatedPlannerItem):
+    collection = "parent_tasks"
+
+    workspace = models.ForeignKey(
+        PlannerWorkspaceState, on_delete=models.CASCADE, related_name="parent_task_items"
+    )
+    task_id = models.BigIntegerField(null=True, blank=True)
+    team_id = models.BigIntegerField(null=True, blank=True)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        db_table = "CRM_PLANNER_PARENT_TASK"
+        indexes = [
+            models.Index(fields=["workspace", "team_id"], name="planner_parent_ws_team_idx"),
+            models.Index(fields=["workspace", "task_id"], name="planner_parent_ws_task_idx"),
+            models.Index(fields=["start_date", "end_date"], name="planner_parent_dates_idx"),
+            GistIndex(planner_date_span(), name="planner_parent_span_gist"),
+        ]
+
+    def __str__(self):
+        return f"Задача #{self.task_id}"
+
+    @classmethod
+    def columns_from_item(cls, item):
+        return {
+            "task_id": item_id(item),
+            "team_id": team_id_from_item(item),
+            "start_date": date_from_item(item, "startDate", "start_date"),
+            "end_date": date_from_item(item, "endDate", "end_date"),
+        }
+
+
+class PlannerSubtask(DatedPlannerItem):
+    collection = "subtasks"
+
+    workspace = models.ForeignKey(
+        PlannerWorkspaceState, on_delete=models.CASCADE, related_name="subtask_items"
+    )
+    task_id = models.BigIntegerField(null=True, blank=True)
+    team_id = models.BigIntegerField(null=True, blank=True)
+    parent_task_id = models.BigIntegerField(null=True, blank=True)
+    assignee_id = models.BigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=255, blank=True)
+    in_sprint = models.BooleanField(default=False)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        db_table = "CRM_PLANNER_SUBTASK"
+        indexes = [
+            models.Index(fields=["workspace", "team_id"], name="planner_subtask_ws_team_idx"),
+            models.Index(fields=["workspace", "task_id"], name="planner_subtask_ws_task_idx"),
+            models.Index(fields=["workspace", "assignee_id"], name="planner_sub_ws_assignee_idx"),
+            models.Index(fields=["status"], name="planner_subtask_status_idx"),
+            models.Index(fields=["start_date", "end_date"], name="planner_subtask_dates_idx"),
+            GistIndex(planner_date_span(), name="planner_subtask_span_gist"),
+            models.Index(fields=["end_date"], name="planner_subtask_end_idx"),
+        ]
+
+    def __str__(self):
+        return f"Подзадача #{self.task_id}"
+
+    @classmethod
+    def columns_from_item(cls, item):
+        return {
+            "task_id": item_id(item),
+            "team_id": team_id_from_item(item),
+            "parent_task_id": parent_task_id_from_item(item),
+            "assignee_id": assignee_id_from_item(item),
+            "status": str(item_value(item, "status", "status", "") or "")[:255],
+            "in_sprint": bool(item_value(item, "inSprint", "in_sprint", False)),
+            "start_date": date_from_item(item, "startDate", "start_date"),
+            "end_date": date_from_item(item, "endDate", "end_date"),
+        }
+
+
+class PlannerChange(models.Model):
+    """Append-only log entry; ``id`` is the sequence number clients catch up from."""
+
+    workspace = models.ForeignKey(
+        PlannerWorkspaceState, on_delete=models.CASCADE, related_name="changes"
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    operations = models.JSONField(default=list)
+    team_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "CRM_PLANNER_CHANGE"
+        ordering = ("id",)
+        indexes = [
+            models.Index(fields=["workspace", "id"], name="planner_change_ws_seq_idx"),
+        ]
+
+    def __str__(self):
+        return f"Изменение планировщика #{self.pk}"
+
+
+class PlannerSnapshot(models.Model):
+    """Full workspace state as of change ``change_id``; replay starts from here."""
+
+    workspace = models.ForeignKey(
+        PlannerWorkspaceState, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    change_id = models.BigIntegerField(default=0)
+    state = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "CRM_PLANNER_SNAPSHOT"
+        ordering = ("change_id",)
+        constraints = [
+            models.UniqueConstraint(fields=["workspace", "change_id"], name="planner_snapshot_ws_change_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Снимок планировщика до #{self.change_id}"
@@ -0,0 +1,455 @@
+"""Incremental planner updates expressed as JSON-Patch style operations.
+
+Items are addressed by id rather than by array index, e.g.::
+
+    {"op": "replace", "path": "/subtasks/10/status", "value": "Готово"}
+    {"op": "add", "path": "/subtasks/-", "value": {"id": 11, "teamId": 17}}
+    {"op": "remove", "path": "/parent_tasks/3"}
+    {"op": "replace", "path": "/columns", "value": ["Todo", "Done"]}
+
+Only the addressed rows and the desks of the affected teams are written.
+``bulk_update_subtasks`` merges the same fields into many subtasks at once::
+
+    {"ids": [10, 11], "changes": {"status": "Готово", "inSprint": false}}
+"""
+
+import copy
+
+from django.db import models, transaction
+from django.db.models import Case, CharField, F, Func, JSONField, Value, When
+from django.utils import timezone
+
+from planner.models import PlannerParentTask, PlannerSubtask, PlannerTeam, TeamMember, TeamPlannerDesk
+from planner.utils import assignee_id_from_item, desk_fields_from_team, item_id, to_int
+
+COLLECTIONS = {
+    "teams": PlannerTeam,
+    "parent_tasks": PlannerParentTask,
+    "subtasks": PlannerSubtask,
+}
+WORKSPACE_FIELDS = ("enrollment_closed", "participants", "columns")
+PATH_ALIASES = {
+    "parentTasks": "parent_tasks",
+    "enrollmentClosed": "enrollment_closed",
+}
+SUPPORTED_OPS = ("add", "replace", "remove")
+# Keys that place a subtask on a board cannot be changed in bulk.
+BULK_FIXED_KEYS = ("id", "teamId", "team_id", "parentTaskId", "parent_task_id")
+BULK_MAX_IDS = 500
+
+
+class PlannerOperationError(ValueError):
+    """Raised when an operation is malformed or cannot be applied."""
+
+
+class PlannerOperationForbidden(PlannerOperationError):
+    """Raised when the caller may not change the addressed item."""
+
+
+def _unescape(segment):
+    return segment.replace("~1", "/").replace("~0", "~")
+
+
+def _escape(segment):
+    return str(segment).replace("~", "~0").replace("/", "~1")
+
+
+def format_operation(operation):
+    """Turn a parsed operation back into its JSON-Patch form."""
+    formatted = {"op": operation["op"], "path": "/" + "/".join(_escape(segment) for segment in operation["segments"])}
+    if operation["op"] != "remove":
+        formatted["value"] = operation["value"]
+    return formatted
+
+
+def parse_operations(data):
+    operations = data.get("operations") if isinstance(data, dict) else data
+    if not isinstance(operations, list):
+        raise PlannerOperationError("Expected a list of operations")
+
+    parsed = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise PlannerOperationError(f"Operation #{index} must be an object")
+        op = operation.get("op")
+        path = operation.get("path")
+        if op not in SUPPORTED_OPS:
+            raise PlannerOperationError(f"Operation #{index}: unsupported op {op!r}")
+        if not isinstance(path, str) or not path.startswith("/"):
+            raise PlannerOperationError(f"Operation #{index}: invalid path {path!r}")
+        if op != "remove" and "value" not in operation:
+            raise PlannerOperationError(f"Operation #{index}: value is required")
+
+        segments = [_unescape(segment) for segment in path[1:].split("/")]
+        segments[0] = PATH_ALIASES.get(segments[0], segments[0])
+        if segments[0] not in COLLECTIONS and segments[0] not in WORKSPACE_FIELDS:
+            raise PlannerOperationError(f"Operation #{index}: unknown path {path!r}")
+        if segments[0] in WORKSPACE_FIELDS and len(segments) > 1:
+            raise PlannerOperationError(f"Operation #{index}: unknown path {path!r}")
+        if segments[0] in COLLECTIONS and len(segments) < 2:
+            raise PlannerOperationError(f"Operation #{index}: item id is required in {path!r}")
+
+        parsed.append({"op": op, "segments": segments, "value": operation.get("value")})
+    return parsed
+
+
+def parse_bulk_update(data):
+    if not isinstance(data, dict):
+        raise PlannerOperationError("Expected an object with ids and changes")
+    ids = data.get("ids")
+    changes = data.get("changes")
+    if not isinstance(ids, list) or not ids:
+        raise PlannerOperationError("ids must be a non-empty list")
+    if len(ids) > BULK_MAX_IDS:
+        raise PlannerOperationError(f"At most {BULK_MAX_IDS} subtasks can be updated at once")
+    parsed_ids = [to_int(value) for value in ids]
+    if None in parsed_ids:
+        raise PlannerOperationError("ids must be integers")
+    if not isinstance(changes, dict) or not changes:
+        raise PlannerOperationError("changes must be a non-empty object")
+    fixed = sorted(key for key in changes if key in BULK_FIXED_KEYS)
+    if fixed:
+        raise PlannerOperationError(f"Fields {', '.join(fixed)} cannot be changed in bulk")
+    return list(dict.fromkeys(parsed_ids)), changes
+
+
+def parse_column_change(data):
+    """Return ``(columns, renames, fallback)`` from a column change request."""
+    if not isinstance(data, dict):
+        raise PlannerOperationError("Expected an object with columns")
+    columns = data.get("columns")
+    if (
+        not isinstance(columns, list)
+        or not columns
+        or not all(isinstance(column, str) and column for column in columns)
+        or len(set(columns)) != len(columns)
+    ):
+        raise PlannerOperationError("columns must be a non-empty list of unique names")
+    renames = data.get("renames") or {}
+    if not isinstance(renames, dict) or not all(isinstance(old, str) for old in renames):
+        raise PlannerOperationError("renames must map old column names to new ones")
+    unknown = sorted(str(new) for new in renames.values() if new not in columns)
+    if unknown:
+        raise PlannerOperationError(f"Renamed columns {', '.join(unknown)} are not in columns")
+    fallback = data.get("fallback")
+    if fallback is not None and fallback not in columns:
+        raise PlannerOperationError("fallback must be one of the columns")
+    return columns, renames, fallback
+
+
+def column_mapping(old_columns, columns, renames, fallback=None):
+    """Map every old column whose subtasks change status to its new column.
+
+    Columns missing from ``columns`` that are not renamed are removed; their
+    subtasks go to ``fallback``, the first column by default.
+    """
+    mapping = {}
+    for name in old_columns:
+        target = renames.get(name, name)
+        if target not in columns:
+            target = fallback or columns[0]
+        if target != name:
+            mapping[name] = target
+    return mapping
+
+
+class OperationResult:
+    def __init__(self):
+        self.applied = 0
+        self.team_ids = set()
+        self.workspace_fields = set()
+        self.version = None
+
+    def as_dict(self):
+        return {"applied": self.applied, "team_ids": sorted(self.team_ids), "version": self.version}
+
+
+class WorkspaceOperations:
+    """Apply parsed operations to a workspace inside one transaction.
+
+    ``assignee_id`` restricts subtask operations to items assigned to that
+    user, mirroring what projectants may change through the full PUT.
+    """
+
+    def __init__(self, workspace, assignee_id=None, expected_version=None):
+        self.workspace = workspace
+        self.assignee_id = assignee_id
+        self.expected_version = expected_version
+        self.result = OperationResult()
+
+    def apply(self, operations):
+        with transaction.atomic():
+            self.workspace.expected_version = self.expected_version
+            for operation in operations:
+                self._apply_one(operation)
+                self.result.applied += 1
+                if operation["segments"][0] in COLLECTIONS:
+                    self.workspace.record_changes([format_operation(operation)])
+            self._finish()
+        return self.result
+
+    def update_subtasks(self, ids, changes):
+        """Merge ``changes`` into the listed subtasks and return their new payloads.
+
+        The merge is done in SQL with ``payload || changes``, one UPDATE per
+        distinct change of the indexed columns (usually a single statement).
+        """
+        with transaction.atomic():
+            self.workspace.expected_version = self.expected_version
+            rows = PlannerSubtask.objects.filter(workspace=self.workspace, task_id__in=ids)
+            current = list(rows.order_by("position", "id").values_list("task_id", "team_id", "payload"))
+            missing = set(ids) - {task_id for task_id, _, _ in current}
+            if missing:
+                raise PlannerOperationError(f"subtasks items {sorted(missing)} do not exist")
+
+            items = []
+            changed = []
+            fields = set()
+            for task_id, team_id, payload in current:
+                item = {**payload, **changes}
+                self._check_subtask(PlannerSubtask, payload)
+                self._check_subtask(PlannerSubtask, item)
+                items.append(item)
+                if item == payload:
+                    continue
+                self.result.applied += 1
+                self.result.team_ids.add(team_id)
+                self.workspace.record_changes([{"op": "replace", "path": f"/subtasks/{task_id}", "value": item}])
+                before = PlannerSubtask.columns_from_item(payload)
+                after = PlannerSubtask.columns_from_item(item)
+                fields.update(field for field, value in after.items() if value != before[field])
+                changed.append((task_id, after))
+
+            # Rows that end up with the same indexed columns share one UPDATE;
+            # normally that is every row.
+            groups = {}
+            for task_id, after in changed:
+                groups.setdefault(tuple((field, after[field]) for field in sorted(fields)), []).append(task_id)
+            merged_payload = Func(
+                F("payload"),
+                Value(changes, output_field=JSONField()),
+                template="(%(expressions)s)",
+                arg_joiner=" || ",
+                output_field=JSONField(),
+            )
+            for columns, task_ids in groups.items():
+                rows.filter(task_id__in=task_ids).update(payload=merged_payload, **dict(columns))
+            self.result.team_ids.discard(None)
+            self._finish()
+        return items
+
+    def change_columns(self, columns, renames, fallback=None):
+        """Replace the columns and move subtasks of renamed or removed columns.
+
+        Statuses are rewritten with one UPDATE; teams with columns of their
+        own are left alone.
+        """
+        if self.assignee_id is not None:
+            raise PlannerOperationForbidden("Only curators can change columns")
+        with transaction.atomic():
+            self.workspace.expected_version = self.expected_version
+            mapping = column_mapping(self.workspace.columns, columns, renames, fallback)
+            self._set_columns(columns)
+            if mapping:
+                self._move_statuses(mapping)
+            self._finish()
+        return self.result
+
+    def _set_columns(self, columns):
+        self.workspace.columns = columns
+        self.result.workspace_fields.add("columns")
+        # Teams with columns of their own keep them.
+        TeamPlannerDesk.objects.filter(
+            team_id__in=PlannerTeam.objects.filter(workspace=self.workspace)
+            .exclude(payload__has_key="columns")
+            .values("team_id")
+        ).update(columns=columns, version=F("version") + 1)
+
+    def _move_statuses(self, mapping):
+        own_columns = PlannerTeam.objects.filter(
+            workspace=self.workspace, team_id__isnull=False, payload__has_key="columns"
+        ).values("team_id")
+        rows = PlannerSubtask.objects.filter(workspace=self.workspace, status__in=list(mapping)).exclude(
+            team_id__in=own_columns
+        )
+        ids = list(rows.values_list("pk", flat=True))
+        if not ids:
+            return
+        new_status = Case(
+            *[When(status=old, then=Value(new)) for old, new in mapping.items()],
+            output_field=CharField(),
+        )
+        PlannerSubtask.objects.filter(pk__in=ids).update(
+            status=new_status,
+            payload=Func(
+                F("payload"),
+                Func(Value("status"), new_status, function="jsonb_build_object"),
+                template="(%(expressions)s)",
+                arg_joiner=" || ",
+                output_field=JSONField(),
+            ),
+        )
+        moved = PlannerSubtask.objects.filter(pk__in=ids).order_by("position", "id")
+        for task_id, team_id, payload in moved.values_list("task_id", "team_id", "payload"):
+            self.result.applied += 1
+            if team_id is not None:
+                self.result.team_ids.add(team_id)
+            self.workspace.record_changes([{"op": "replace", "path": f"/subtasks/{task_id}", "value": payload}])
+
+    def _finish(self):
+        self.workspace.record_changes([], self.result.team_ids)
+        self.workspace.save(update_fields=[*sorted(self.result.workspace_fields), "updated_at"])
+        self._touch_desks()
+        self.result.version = self.workspace.version
+
+    def _apply_one(self, operation):
+        op, segments, value = operation["op"], operation["segments"], operation["value"]
+        name = segments[0]
+
+        if name in WORKSPACE_FIELDS:
+            if op == "remove":
+                raise PlannerOperationError(f"{name} cannot be removed")
+            if name == "columns":
+                self._set_columns(value)
+            else:
+                setattr(self.workspace, name, value)
+                self.result.workspace_fields.add(name)
+            return
+
+        model = COLLECTIONS[name]
+        key = segments[1]
+        field_path = segments[2:]
+
+        if key == "-":
+            if op != "add" or field_path:
+                raise PlannerOperationError(f"'-' is only valid when adding a whole {name} item")
+            self._upsert(model, item_id(value), value)
+            return
+
+        key = to_int(key)
+        if key is None:
+            raise PlannerOperationError(f"Invalid {name} id {segments[1]!r}")
+
+        if not field_path:
+            if op == "remove":
+                self._remove(model, key)
+            else:
+                self._upsert(model, key, value)
+            return
+
+        row = self._find(model, key)
+        if row is None:
+            raise PlannerOperationError(f"{name} item {key} does not exist")
+        payload = copy.deepcopy(row.payload) if isinstance(row.payload, dict) else {}
+        set_path(payload, field_path, value, remove=op == "remove")
+        self._save_row(model, row, payload)
+
+    def _find(self, model, key):
+        return (
+            model.objects.filter(workspace=self.workspace, **{model.key_field: key})
+            .order_by("position", "id")
+            .first()
+        )
+
+    def _check_subtask(self, model, item):
+        if model is not PlannerSubtask or self.assignee_id is None:
+            return
+        if assignee_id_from_item(item) != self.assignee_id:
+            raise PlannerOperationForbidden("Only subtasks assigned to you can be changed")
+
+    def _upsert(self, model, key, value):
+        if not isinstance(value, dict):
+            raise PlannerOperationError("Item value must be an object")
+        if key is None:
+            raise PlannerOperationError("Item id is required")
+        item = dict(value)
+        item.setdefault("id", key)
+        if item_id(item) != key:
+            raise PlannerOperationError("Item id does not match the path")
+
+        row = self._find(model, key)
+        if row is None:
+            self._check_subtask(model, item)
+            last = model.objects.filter(workspace=self.workspace).aggregate(last=models.Max("position"))["last"]
+            row = model.from_item(self.workspace, item, 0 if last is None else last + 1)
+            row.save()
+            self._mark(model, row)
+            return
+        self._save_row(model, row, item)
+
+    def _save_row(self, model, row, payload):
+        self._check_subtask(model, row.payload)
+        self._check_subtask(model, payload)
+        previous_team_id = row.team_id
+        row.set_payload(payload)
+        row.save()
+        if previous_team_id != row.team_id:
+            self._mark(model, row, removed_team_id=previous_team_id)
+        else:
+            self._mark(model, row)
+
+    def _remove(self, model, key):
+        rows = list(model.objects.filter(workspace=self.workspace, **{model.key_field: key}))
+        if not rows:
+            raise PlannerOperationError(f"Item {key} does not exist")
+        for row in rows:
+            self._check_subtask(model, row.payload)
+        model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+        for row in rows:
+            self._mark(model, None, removed_team_id=row.team_id)
+
+    def _mark(self, model, row, removed_team_id=None):
+        if removed_team_id is not None:
+            self.result.team_ids.add(removed_team_id)
+            if model is PlannerTeam:
+                TeamPlannerDesk.objects.filter(team_id=removed_team_id).delete()
+        if row is None or row.team_id is None:
+            return
+        self.result.team_ids.add(row.team_id)
+        if model is PlannerTeam:
+            # Desk metadata is derived from the team, so it is written without
+            # going through ``save()`` and its change log.
+            fields = desk_fields_from_team(row.payload, self.workspace.columns)
+            if not TeamPlannerDesk.objects.filter(team_id=row.team_id).update(**fields):
+                TeamPlannerDesk.objects.bulk_create([TeamPlannerDesk(team_id=row.team_id, **fields)])
+            TeamMember.sync_desks({row.team_id: fields["member_ids"]})
+
+    def _touch_desks(self):
+        if self.result.team_ids:
+            TeamPlannerDesk.objects.filter(team_id__in=self.result.team_ids).update(
+                updated_at=timezone.now(), version=F("version") + 1
+            )
+
+
+def set_path(payload, field_path, value, remove=False):
+    target = payload
+    for segment in field_path[:-1]:
+        target = target.get(segment) if isinstance(target, dict) else None
+        if not isinstance(target, dict):
+            raise PlannerOperationError(f"Path segment {segment!r} does not exist")
+    last = field_path[-1]
+    if remove:
+        if last not in target:
+            raise PlannerOperationError(f"Field {last!r} does not exist")
+        del target[last]
+    else:
+        target[last] = value
+
+
+def apply_operations(workspace, data, assignee_id=None, expected_version=None):
+    return WorkspaceOperations(
+        workspace, assignee_id=assignee_id, expected_version=expected_version
+    ).apply(parse_operations(data))
+
+
+def bulk_update_subtasks(workspace, data, assignee_id=None, expected_version=None):
+    """Return the operation result and the updated subtask payloads."""
+    operations = WorkspaceOperations(workspace, assignee_id=assignee_id, expected_version=expected_version)
+    items = operations.update_subtasks(*parse_bulk_update(data))
+    return operations.result, items
+
+
+def change_columns(workspace, data, assignee_id=None, expected_version=None):
+    return WorkspaceOperations(
+        workspace, assignee_id=assignee_id, expected_version=expected_version
+    ).change_columns(*parse_column_change(data))
@@ -1,9 +1,13 @@
 from rest_framework import serializers
 
-from planner.models import PlannerWorkspaceState, TeamPlannerDesk
+from planner.models import PlannerChange, PlannerWorkspaceState, TeamPlannerDesk
 
 
 class PlannerWorkspaceStateSerializer(serializers.ModelSerializer):
+    teams = serializers.JSONField(required=False)
+    parent_tasks = serializers.JSONField(required=False)
+    subtasks = serializers.JSONField(required=False)
+
     class Meta:
         model = PlannerWorkspaceState
         fields = (
@@ -13,10 +17,31 @@ class PlannerWorkspaceStateSerializer(serializers.ModelSerializer):
             "parent_tasks",
             "subtasks",
             "columns",
+            "version",
         )
+        read_only_fields = ("version",)
+
+
+class PlannerWorkspaceAggregateSerializer(PlannerWorkspaceStateSerializer):
+    """Serializes ``PlannerWorkspaceAggregate``, which is not a model instance."""
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
+        return instance
+
+
+class PlannerEventWorkspaceSerializer(PlannerWorkspaceStateSerializer):
+    class Meta(PlannerWorkspaceStateSerializer.Meta):
+        fields = ("event_id", "archived", *PlannerWorkspaceStateSerializer.Meta.fields)
+        read_only_fields = ("event_id", "version")
 
 
 class TeamPlannerDeskSerializer(serializers.ModelSerializer):
+    parent_tasks = serializers.JSONField(required=False)
+    subtasks = serializers.JSONField(required=False)
+
     class Meta:
         model = TeamPlannerDesk
         fields = (
@@ -27,6 +52,24 @@ class TeamPlannerDeskSerializer(serializers.ModelSerializer):
             "parent_tasks",
             "subtasks",
             "columns",
+            "version",
             "updated_at",
         )
-        read_only_fields = ("team_id", "updated_at")
+        read_only_fields = ("team_id", "version", "updated_at")
+
+
+class TeamPlannerDeskSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TeamPlannerDesk
+        fields = ("team_id", "team_name", "curator_id", "member_ids", "columns", "version", "updated_at")
+        read_only_fields = fields
+
+
+class PlannerChangeSerializer(serializers.ModelSerializer):
+    seq = serializers.IntegerField(source="id", read_only=True)
+    event_id = serializers.IntegerField(source="workspace.event_id", read_only=True, allow_null=True)
+
+    class Meta:
+        model = PlannerChange
+        fields = ("seq", "event_id", "author_id", "team_ids", "operations", "created_at")
+        read_only_fields = fields
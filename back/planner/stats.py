@@ -0,0 +1,64 @@
+"""Board statistics computed in the database from the normalized subtask rows.
+
+A subtask counts as done when its status is the last column of its own
+board, as for deadlines: the team desk columns when the team has a desk, the
+workspace columns otherwise. The whole summary takes three grouped queries
+whatever the size of the board.
+"""
+
+from django.db.models import Count, F, Q
+
+from planner.deadlines import done_column
+
+
+def _percent(part, whole):
+    return round(part * 100 / whole, 1) if whole else 0.0
+
+
+def board_stats(subtasks, columns):
+    """Summarize a ``PlannerSubtask`` queryset for a board with ``columns``."""
+    subtasks = subtasks.annotate(done_column=done_column())
+    done = Count("id", filter=Q(status=F("done_column")))
+    in_sprint = Count("id", filter=Q(in_sprint=True))
+
+    by_status = {column: 0 for column in columns}
+    for row in subtasks.values("status").annotate(count=Count("id")).order_by("status"):
+        by_status[row["status"]] = row["count"]
+
+    by_assignee = [
+        {
+            "assignee_id": row["assignee_id"],
+            "total": row["total"],
+            "done": row["done"],
+            "in_sprint": row["in_sprint"],
+        }
+        for row in subtasks.values("assignee_id")
+        .annotate(total=Count("id"), done=done, in_sprint=in_sprint)
+        .order_by("assignee_id")
+    ]
+
+    parent_tasks = [
+        {
+            "parent_task_id": row["parent_task_id"],
+            "total": row["total"],
+            "done": row["done"],
+            "percent_done": _percent(row["done"], row["total"]),
+        }
+        for row in subtasks.filter(parent_task_id__isnull=False)
+        .values("parent_task_id")
+        .annotate(total=Count("id"), done=done)
+        .order_by("parent_task_id")
+    ]
+
+    total = sum(by_status.values())
+    done_total = sum(row["done"] for row in by_assignee)
+    return {
+        "columns": columns,
+        "total": total,
+        "done": done_total,
+        "in_sprint": sum(row["in_sprint"] for row in by_assignee),
+        "percent_done": _percent(done_total, total),
+        "by_status": by_status,
+        "by_assignee": by_assignee,
+        "parent_tasks": parent_tasks,
+    }
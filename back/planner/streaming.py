@@ -0,0 +1,115 @@
+"""Incremental JSON bodies for large planner reads.
+
+Items are read from the item tables with server-side cursors and written out
+one payload at a time, so memory per request does not grow with the board.
+The output has the same shape as the serializers; collections are read one
+after another, so unlike the serialized response a concurrent write may
+show up in one collection and not yet in another.
+
+Under ASGI a sync iterator given to ``StreamingHttpResponse`` is first
+collected into a list, which would undo all of the above, so ASGI responses
+wrap the body in ``aiterate``.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from planner.models import TeamPlannerDesk
+from planner.operations import COLLECTIONS
+
+CHUNK_SIZE = 500
+BUFFER_SIZE = 64 * 1024
+
+_DONE = object()
+
+
+def _dumps(value):
+    return json.dumps(value, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def _buffered(parts):
+    """Join small string parts into chunks of about ``BUFFER_SIZE`` characters."""
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= BUFFER_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _array(values):
+    yield "["
+    for index, value in enumerate(values):
+        yield _dumps(value) if index == 0 else "," + _dumps(value)
+    yield "]"
+
+
+def _payloads(querysets):
+    for queryset in querysets:
+        yield from queryset.order_by("position", "id").values_list("payload", flat=True).iterator(CHUNK_SIZE)
+
+
+def _workspace_parts(fields, workspace, workspaces, assignee_id):
+    for index, field in enumerate(fields):
+        yield ("{" if index == 0 else ",") + _dumps(field) + ":"
+        if field not in COLLECTIONS:
+            yield _dumps(getattr(workspace, field))
+            continue
+        querysets = [COLLECTIONS[field].objects.filter(workspace=item) for item in workspaces]
+        if field == "subtasks" and assignee_id is not None:
+            querysets = [queryset.filter(assignee_id=assignee_id) for queryset in querysets]
+        yield from _array(_payloads(querysets))
+    yield "}"
+
+
+def stream_workspace(fields, workspace, assignee_id=None):
+    """Yield the JSON of ``workspace`` with the given serializer ``fields`` in order.
+
+    ``workspace`` is a ``PlannerWorkspaceState`` or a
+    ``PlannerWorkspaceAggregate``; ``assignee_id`` keeps only that user's
+    subtasks, as the projectant view does.
+    """
+    workspaces = getattr(workspace, "workspaces", [workspace])
+    return _buffered(_workspace_parts(fields, workspace, workspaces, assignee_id))
+
+
+def _desks(queryset, serializer_class, with_items):
+    # Keyset chunks keep each prefetch bounded without holding a cursor open.
+    last_team_id = None
+    while True:
+        chunk = queryset.order_by("team_id")
+        if last_team_id is not None:
+            chunk = chunk.filter(team_id__gt=last_team_id)
+        desks = list(chunk[:CHUNK_SIZE])
+        if not desks:
+            return
+        if with_items:
+            TeamPlannerDesk.prefetch_items(desks)
+        for desk in desks:
+            yield serializer_class(desk).data
+        last_team_id = desks[-1].team_id
+
+
+def stream_desks(queryset, serializer_class, with_items=True):
+    """Yield a JSON array of every desk in ``queryset``, ordered by team id."""
+    return _buffered(_array(_desks(queryset, serializer_class, with_items)))
+
+
+async def aiterate(chunks):
+    """Yield ``chunks`` asynchronously, producing each one in a worker thread.
+
+    Every step runs through the thread-sensitive executor, so the server-side
+    cursor stays on the same database connection between chunks.
+    """
+    chunks = iter(chunks)
+    try:
+        while (chunk := await sync_to_async(next)(chunks, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from planner.models import PlannerTeam, PlannerWorkspaceState, TeamMember, TeamPlannerDesk
+from planner.utils import desk_fields_from_team, to_int
+
+DESK_SYNC_FIELDS = ("team_name", "curator_id", "member_ids", "columns")
+
+
+def sync_team_desks_from_workspace(workspace: PlannerWorkspaceState, touched_team_ids=()):
+    """Bring team desks in line with the workspace teams using bulk writes.
+
+    Desks whose metadata is unchanged are skipped unless their team is in
+    ``touched_team_ids`` (its tasks changed), in which case only
+    ``updated_at`` moves. The whole sync costs a fixed number of queries
+    regardless of how many teams the workspace has.
+    """
+    targets = {}
+    for team in workspace.teams:
+        if not isinstance(team, dict):
+            continue
+        team_id = to_int(team.get("id"))
+        if team_id is None:
+            continue
+        targets[team_id] = desk_fields_from_team(team, workspace.columns)
+
+    touched_team_ids = set(touched_team_ids)
+    now = timezone.now()
+
+    with transaction.atomic(savepoint=False):
+        desks = {desk.team_id: desk for desk in TeamPlannerDesk.objects.filter(team_id__in=targets)}
+        to_create = []
+        to_update = []
+        members = {}
+        for team_id, fields in targets.items():
+            desk = desks.get(team_id)
+            if desk is None:
+                to_create.append(TeamPlannerDesk(team_id=team_id, **fields))
+                members[team_id] = fields["member_ids"]
+                continue
+            if desk.member_ids != fields["member_ids"]:
+                members[team_id] = fields["member_ids"]
+            changed = any(getattr(desk, field) != value for field, value in fields.items())
+            if changed or team_id in touched_team_ids:
+                for field, value in fields.items():
+                    setattr(desk, field, value)
+                desk.updated_at = now
+                desk.version = F("version") + 1
+                to_update.append(desk)
+
+        # Other workspaces own their desks; only orphans of every workspace go.
+        TeamPlannerDesk.objects.exclude(team_id__in=targets).exclude(
+            team_id__in=PlannerTeam.objects.filter(team_id__isnull=False).values("team_id")
+        ).delete()
+        if to_update:
+            TeamPlannerDesk.objects.bulk_update(to_update, [*DESK_SYNC_FIELDS, "updated_at", "version"])
+        if to_create:
+            TeamPlannerDesk.objects.bulk_create(to_create)
+        TeamMember.sync_desks(members)
@@ -1,15 +1,36 @@
+import asyncio
+import io
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase, override_settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-from planner.models import PlannerWorkspaceState, TeamPlannerDesk
+from planner.events import PostgresNotifyTransport, planner_changes
+from planner.history import capture_state, state_at
+from planner.models import PlannerChange, PlannerSnapshot, PlannerSubtask, PlannerTeam, PlannerWorkspaceState, TeamMember, TeamPlannerDesk
+from planner.views import _stream_team_ids
+from users.models import CRMRole, Event, ROLE_CURATOR
 
 
 @override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
 class PlannerDeskViewTests(TestCase):
     def setUp(self):
+        # Rendered bodies are cached by row id and version, which repeat across tests.
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="planner@example.com",
@@ -21,6 +42,32 @@ class PlannerDeskViewTests(TestCase):
     def authenticate(self):
         self.client.force_authenticate(user=self.user)
 
+    def make_curator(self):
+        curator = get_user_model().objects.create_user(
+            email="curator@example.com",
+            username="curator@example.com",
+            password="StrongPass123",
+            is_active=True,
+        )
+        CRMRole.objects.create(
+            user=curator,
+            role_type=ROLE_CURATOR,
+            content_type=ContentType.objects.get_for_model(Event),
+            object_id=0,
+        )
+        return curator
+
+    def create_workspace(self):
+        return PlannerWorkspaceState.objects.create(
+            teams=[{"id": 17, "name": "Team 17", "memberIds": [self.user.id]}, {"id": 18, "name": "Team 18"}],
+            parent_tasks=[{"id": 1, "teamId": 17, "title": "P1"}, {"id": 2, "teamId": 18, "title": "P2"}],
+            subtasks=[
+                {"id": 10, "teamId": 17, "parentTaskId": 1, "assigneeId": self.user.id, "status": "A"},
+                {"id": 11, "teamId": 18, "parentTaskId": 2, "assigneeId": self.user.id + 1, "status": "A"},
+            ],
+            columns=["A", "B"],
+        )
+
     def test_team_desk_get_creates_default_desk(self):
         self.authenticate()
         response = self.client.get(
@@ -28,14 +75,15 @@ class PlannerDeskViewTests(TestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data["team_id"], 17)
-        self.assertEqual(response.data["parent_tasks"], [])
-        self.assertEqual(response.data["subtasks"], [])
-        self.assertEqual(response.data["columns"], ["Запланировано", "В работе", "На проверке", "Готово"])
+        self.assertEqual(response.json()["team_id"], 17)
+        self.assertEqual(response.json()["parent_tasks"], [])
+        self.assertEqual(response.json()["subtasks"], [])
+        self.assertEqual(response.json()["columns"], ["Запланировано", "В работе", "На проверке", "Готово"])
         self.assertTrue(TeamPlannerDesk.objects.filter(team_id=17).exists())
 
     def test_team_desk_put_updates_existing_desk(self):
-        self.authenticate()
+        # Projectants only write their own subtasks; see the teammates test below.
+        self.client.force_authenticate(user=self.make_curator())
         payload = {
             "team_name": "Backend Team",
             "curator_id": 21,
@@ -79,6 +127,53 @@ class PlannerDeskViewTests(TestCase):
         self.assertEqual(desk.subtasks, payload["subtasks"])
         self.assertEqual(desk.columns, payload["columns"])
 
+    def test_event_workspace_starts_with_shared_columns(self):
+        self.create_workspace()
+
+        workspace = PlannerWorkspaceState.for_event(self.make_event().id)
+
+        self.assertEqual(workspace.columns, ["A", "B"])
+
+    def test_desk_write_locks_workspace_before_desk(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+        TeamPlannerDesk.objects.create(team_id=17)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                reverse("planner-team-desk-detail", kwargs={"team_id": 17}), {"team_name": "Новое"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        locks = [query["sql"] for query in queries.captured_queries if "FOR UPDATE" in query["sql"]]
+        self.assertIn("CRM_PLANNER_WORKSPACE_STATE", locks[0])
+        self.assertTrue(any("CRM_TEAM_PLANNER_DESK" in sql for sql in locks[1:]))
+
+    def test_projectant_desk_write_keeps_teammates_subtasks(self):
+        self.authenticate()
+        workspace = self.create_workspace()
+        teammate = {"id": 12, "teamId": 17, "assigneeId": self.user.id + 1, "status": "A"}
+        workspace.subtasks = workspace.subtasks + [teammate]
+        workspace.save()
+        own = {"id": 10, "teamId": 17, "parentTaskId": 1, "assigneeId": self.user.id, "status": "B"}
+
+        response = self.client.patch(
+            reverse("planner-team-desk-detail", kwargs={"team_id": 17}),
+            {"subtasks": [own, {**teammate, "status": "B"}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(PlannerSubtask.objects.filter(team_id=17).values_list("task_id", "assignee_id", "status")),
+            [(10, self.user.id, "B"), (12, self.user.id + 1, "A")],
+        )
+
+        response = self.client.patch(
+            reverse("planner-team-desk-detail", kwargs={"team_id": 17}), {"subtasks": []}, format="json"
+        )
+        self.assertEqual(list(PlannerSubtask.objects.filter(team_id=17).values_list("task_id", flat=True)), [12])
+
     def test_team_desk_list_returns_all_desks(self):
         self.authenticate()
         TeamPlannerDesk.objects.create(team_id=1, team_name="A")
@@ -185,6 +280,21 @@ class PlannerDeskViewTests(TestCase):
         self.assertEqual(len(subtasks), 1)
         self.assertEqual(subtasks[0]["id"], 1)
 
+    def test_projectant_get_users_planner_filters_subtasks_in_database(self):
+        self.authenticate()
+        self.create_workspace()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("planner-state"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data["subtasks"]], [10])
+        subtask_queries = [
+            query["sql"] for query in queries.captured_queries if PlannerSubtask._meta.db_table in query["sql"]
+        ]
+        self.assertEqual(len(subtask_queries), 1)
+        self.assertIn('"assignee_id" =', subtask_queries[0])
+
     def test_projectant_put_users_planner_preserves_foreign_subtasks(self):
         self.authenticate()
         state = PlannerWorkspaceState.objects.create(
@@ -214,3 +324,1132 @@ class PlannerDeskViewTests(TestCase):
         subtasks_by_id = {item["id"]: item for item in state.subtasks}
         self.assertEqual(subtasks_by_id[1]["title"], "Mine new")
         self.assertEqual(subtasks_by_id[2]["title"], "Other keep")
+
+    def test_projectant_put_merges_under_lock_with_single_workspace_write(self):
+        self.authenticate()
+        workspace = self.create_workspace()
+        table = PlannerWorkspaceState._meta.db_table
+        payload = {"subtasks": [{"id": 10, "teamId": 17, "assigneeId": self.user.id, "status": "B"}]}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(reverse("planner-state"), payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements = [query["sql"] for query in queries.captured_queries]
+        updates = [sql for sql in statements if sql.startswith(f'UPDATE "{table}"')]
+        self.assertEqual(len(updates), 1)
+        lock = next(index for index, sql in enumerate(statements) if table in sql and "FOR UPDATE" in sql)
+        subtask_reads = [
+            index for index, sql in enumerate(statements)
+            if sql.startswith("SELECT") and PlannerSubtask._meta.db_table in sql
+        ]
+        self.assertTrue(subtask_reads)
+        self.assertLess(lock, subtask_reads[0])
+
+        workspace.refresh_from_db()
+        self.assertEqual(workspace.version, 2)
+        self.assertEqual([item["id"] for item in workspace.subtasks], [11, 10])
+        self.assertEqual(workspace.subtasks[1]["status"], "B")
+
+    def test_workspace_items_are_stored_as_indexed_rows(self):
+        PlannerWorkspaceState.objects.create(
+            teams=[{"id": 17, "name": "Team 17", "curatorId": 4, "memberIds": [11]}],
+            parent_tasks=[{"id": 1, "teamId": 17, "title": "P1", "startDate": "2026-03-01", "endDate": "2026-03-03"}],
+            subtasks=[
+                {
+                    "id": 10,
+                    "teamId": 17,
+                    "parentTaskId": 1,
+                    "assigneeId": 11,
+                    "startDate": "2026-03-01",
+                    "endDate": "2026-03-02",
+                    "inSprint": True,
+                    "status": "В работе",
+                }
+            ],
+        )
+
+        row = PlannerSubtask.objects.get(task_id=10)
+        self.assertEqual(row.team_id, 17)
+        self.assertEqual(row.parent_task_id, 1)
+        self.assertEqual(row.assignee_id, 11)
+        self.assertEqual(row.status, "В работе")
+        self.assertTrue(row.in_sprint)
+        self.assertEqual(str(row.end_date), "2026-03-02")
+
+    def test_team_desk_get_assembles_tasks_from_workspace_rows(self):
+        self.authenticate()
+        PlannerWorkspaceState.objects.create(
+            teams=[{"id": 17, "name": "Team 17"}],
+            parent_tasks=[{"id": 1, "teamId": 17, "title": "P1"}, {"id": 2, "teamId": 18, "title": "P2"}],
+            subtasks=[{"id": 10, "teamId": 17, "parentTaskId": 1, "title": "S1"}],
+        )
+
+        response = self.client.get(
+            reverse("planner-team-desk-detail", kwargs={"team_id": 17})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["parent_tasks"], [{"id": 1, "teamId": 17, "title": "P1"}])
+        self.assertEqual(response.json()["subtasks"], [{"id": 10, "teamId": 17, "parentTaskId": 1, "title": "S1"}])
+
+    def test_operations_replace_single_subtask_field(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        TeamPlannerDesk.objects.create(team_id=17)
+        TeamPlannerDesk.objects.create(team_id=18)
+        untouched = TeamPlannerDesk.objects.get(team_id=18).updated_at
+
+        response = self.client.patch(
+            reverse("planner-state-operations"),
+            {"operations": [{"op": "replace", "path": "/subtasks/11/status", "value": "B"}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"applied": 1, "team_ids": [18], "version": workspace.version + 1})
+        workspace.refresh_from_db()
+        self.assertEqual([item["status"] for item in workspace.subtasks], ["A", "B"])
+        self.assertEqual(PlannerSubtask.objects.get(task_id=11).status, "B")
+        self.assertGreater(TeamPlannerDesk.objects.get(team_id=18).updated_at, untouched)
+        self.assertEqual(TeamPlannerDesk.objects.get(team_id=18).subtasks[0]["status"], "B")
+
+    def test_operations_add_and_remove_items(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+
+        response = self.client.generic(
+            "PATCH",
+            reverse("planner-state-operations"),
+            json.dumps(
+                [
+                    {"op": "add", "path": "/subtasks/-", "value": {"id": 12, "teamId": 17, "status": "A"}},
+                    {"op": "remove", "path": "/subtasks/10"},
+                    {"op": "replace", "path": "/teams/18", "value": {"name": "Renamed"}},
+                    {"op": "replace", "path": "/columns", "value": ["A", "B", "C"]},
+                ]
+            ),
+            content_type="application/json-patch+json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workspace.refresh_from_db()
+        self.assertEqual([item["id"] for item in workspace.subtasks], [11, 12])
+        self.assertEqual(workspace.teams[1], {"id": 18, "name": "Renamed"})
+        self.assertEqual(workspace.columns, ["A", "B", "C"])
+        self.assertEqual(TeamPlannerDesk.objects.get(team_id=18).team_name, "Renamed")
+
+    def test_operations_projectant_cannot_change_foreign_subtask(self):
+        self.authenticate()
+        workspace = self.create_workspace()
+
+        response = self.client.patch(
+            reverse("planner-state-operations"),
+            {
+                "operations": [
+                    {"op": "replace", "path": "/subtasks/10/status", "value": "B"},
+                    {"op": "replace", "path": "/subtasks/11/status", "value": "B"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        workspace.refresh_from_db()
+        self.assertEqual([item["status"] for item in workspace.subtasks], ["A", "A"])
+
+    def test_operations_reject_invalid_paths(self):
+        self.authenticate()
+        self.create_workspace()
+
+        response = self.client.patch(
+            reverse("planner-state-operations"),
+            {"operations": [{"op": "replace", "path": "/subtasks/99/status", "value": "B"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch(
+            reverse("planner-state-operations"),
+            {"operations": [{"op": "move", "path": "/subtasks/10"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_workspace_put_syncs_many_team_desks_in_bulk(self):
+        self.client.force_authenticate(user=self.make_curator())
+        payload = {
+            "enrollment_closed": True,
+            "participants": [],
+            "teams": [{"id": team_id, "name": f"Team {team_id}", "memberIds": [team_id]} for team_id in range(1, 201)],
+            "parent_tasks": [{"id": team_id, "teamId": team_id, "title": "P"} for team_id in range(1, 201)],
+            "subtasks": [
+                {"id": 1000 + team_id, "teamId": team_id, "parentTaskId": team_id, "status": "A"}
+                for team_id in range(1, 201)
+            ],
+            "columns": ["A", "B"],
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(reverse("planner-state"), payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(len(queries), 30)
+        self.assertEqual(TeamPlannerDesk.objects.count(), 200)
+        self.assertEqual(TeamPlannerDesk.objects.get(team_id=5).member_ids, [5])
+
+        stamps = dict(TeamPlannerDesk.objects.values_list("team_id", "updated_at"))
+        payload["subtasks"][4]["status"] = "B"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(reverse("planner-state"), payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(len(queries), 30)
+        updated = {
+            team_id
+            for team_id, updated_at in TeamPlannerDesk.objects.values_list("team_id", "updated_at")
+            if updated_at != stamps[team_id]
+        }
+        self.assertEqual(updated, {5})
+        self.assertEqual(PlannerSubtask.objects.get(task_id=1005).status, "B")
+
+    def test_workspace_put_bumps_version_and_rejects_stale_if_match(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        payload = {"enrollment_closed": True, "teams": workspace.teams, "columns": ["A", "B"]}
+
+        response = self.client.put(reverse("planner-state"), payload, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 2)
+
+        response = self.client.put(reverse("planner-state"), payload, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["version"], 2)
+
+        response = self.client.put(reverse("planner-state"), {**payload, "version": 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 3)
+
+        response = self.client.put(reverse("planner-state"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 4)
+
+    def test_team_desk_put_conflict_leaves_desk_untouched(self):
+        self.authenticate()
+        desk = TeamPlannerDesk.objects.create(team_id=17, team_name="Old")
+        url = reverse("planner-team-desk-detail", kwargs={"team_id": 17})
+
+        response = self.client.patch(url, {"team_name": "New", "version": 5}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["version"], 1)
+        desk.refresh_from_db()
+        self.assertEqual(desk.team_name, "Old")
+
+        response = self.client.patch(url, {"team_name": "New"}, format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], 2)
+
+    def test_operations_reach_event_team_items(self):
+        self.client.force_authenticate(user=self.make_curator())
+        shared = self.create_workspace()
+        event = self.make_event()
+        event_workspace = PlannerWorkspaceState.for_event(event.id)
+        event_workspace.teams = [{"id": 30, "eventId": event.id}]
+        event_workspace.subtasks = [{"id": 31, "teamId": 30, "status": "A"}]
+        event_workspace.save()
+        version = self.client.get(reverse("planner-state")).json()["version"]
+
+        response = self.client.patch(
+            reverse("planner-state-operations"),
+            {
+                "operations": [
+                    {"op": "replace", "path": "/subtasks/31/status", "value": "B"},
+                    {"op": "add", "path": "/subtasks/-", "value": {"id": 32, "teamId": 30, "status": "A"}},
+                    {"op": "replace", "path": "/subtasks/10/status", "value": "B"},
+                ]
+            },
+            format="json",
+            HTTP_IF_MATCH=f'"{version}"',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["applied"], 3)
+        self.assertEqual(response.data["version"], version + 2)
+        self.assertEqual(
+            list(PlannerSubtask.objects.filter(workspace=event_workspace).values_list("task_id", "status")),
+            [(31, "B"), (32, "A")],
+        )
+        self.assertEqual(PlannerSubtask.objects.get(workspace=shared, task_id=10).status, "B")
+
+    def test_operations_respect_if_match(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        operations = {"operations": [{"op": "replace", "path": "/subtasks/10/status", "value": "B"}]}
+
+        response = self.client.patch(reverse("planner-state-operations"), operations, format="json", HTTP_IF_MATCH='"7"')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(PlannerSubtask.objects.get(task_id=10).status, "A")
+
+        response = self.client.patch(
+            reverse("planner-state-operations"), operations, format="json", HTTP_IF_MATCH=f'"{workspace.version}"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["version"], workspace.version + 1)
+
+    def test_users_planner_get_supports_conditional_requests(self):
+        self.authenticate()
+        self.create_workspace()
+
+        response = self.client.get(reverse("planner-state"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn(f"-u{self.user.id}", etag)
+
+        response = self.client.get(reverse("planner-state"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        curator = self.make_curator()
+        self.client.force_authenticate(user=curator)
+        response = self.client.get(reverse("planner-state"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["subtasks"]), 2)
+
+        self.client.patch(
+            reverse("planner-state-operations"),
+            {"operations": [{"op": "replace", "path": "/subtasks/10/status", "value": "B"}]},
+            format="json",
+        )
+        self.authenticate()
+        response = self.client.get(reverse("planner-state"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_team_desk_endpoints_support_conditional_requests(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+        detail_url = reverse("planner-team-desk-detail", kwargs={"team_id": 17})
+
+        detail_etag = self.client.get(detail_url)["ETag"]
+        list_etag = self.client.get(reverse("planner-team-desk-list"))["ETag"]
+        self.assertEqual(
+            self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        self.assertEqual(
+            self.client.get(reverse("planner-team-desk-list"), HTTP_IF_NONE_MATCH=list_etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+        self.client.patch(
+            reverse("planner-state-operations"),
+            {"operations": [{"op": "replace", "path": "/subtasks/10/status", "value": "B"}]},
+            format="json",
+        )
+
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["subtasks"][0]["status"], "B")
+        response = self.client.get(reverse("planner-team-desk-list"), HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def make_event(self, name="Event"):
+        return Event.objects.create(
+            name=name,
+            stage="draft",
+            start_date=timezone.now().date(),
+            end_date=timezone.now().date(),
+            end_app_date=timezone.now(),
+        )
+
+    def test_compat_put_routes_teams_to_event_workspaces(self):
+        self.client.force_authenticate(user=self.make_curator())
+        event = self.make_event()
+        payload = {
+            "teams": [{"id": 17, "name": "Team 17", "eventId": event.id}, {"id": 18, "name": "Team 18"}],
+            "parent_tasks": [{"id": 1, "teamId": 17}, {"id": 2, "teamId": 18}],
+            "subtasks": [{"id": 10, "teamId": 17, "parentTaskId": 1}],
+            "columns": ["A"],
+        }
+
+        response = self.client.put(reverse("planner-state"), payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event_workspace = PlannerWorkspaceState.objects.get(event=event)
+        self.assertEqual(event_workspace.teams, [payload["teams"][0]])
+        self.assertEqual(event_workspace.subtasks, payload["subtasks"])
+        self.assertEqual(event_workspace.columns, ["A"])
+        self.assertEqual(PlannerWorkspaceState.current().teams, [payload["teams"][1]])
+
+        response = self.client.get(reverse("planner-state"))
+        self.assertEqual([team["id"] for team in response.json()["teams"]], [18, 17])
+        self.assertEqual(len(response.json()["parent_tasks"]), 2)
+
+        response = self.client.get(reverse("planner-event-workspace", kwargs={"event_id": event.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["event_id"], event.id)
+        self.assertEqual([team["id"] for team in response.json()["teams"]], [17])
+        self.assertEqual(self.client.get(f"/api/planner/events/{event.id + 100}/workspace/").status_code, 404)
+
+    def test_event_workspace_writes_leave_other_workspaces_alone(self):
+        self.client.force_authenticate(user=self.make_curator())
+        shared = self.create_workspace()
+        TeamPlannerDesk.objects.create(team_id=17)
+        first, second = self.make_event("First"), self.make_event("Second")
+        url = reverse("planner-event-workspace", kwargs={"event_id": first.id})
+
+        response = self.client.patch(
+            url,
+            {"teams": [{"id": 30, "name": "Team 30", "eventId": first.id}], "subtasks": [{"id": 31, "teamId": 30}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(PlannerWorkspaceState.objects.get(pk=shared.pk).version, shared.version)
+        self.assertFalse(PlannerWorkspaceState.objects.filter(event=second).exists())
+        self.assertEqual(TeamPlannerDesk.objects.get(team_id=30).subtasks, [{"id": 31, "teamId": 30}])
+        self.assertTrue(TeamPlannerDesk.objects.filter(team_id=17).exists())
+
+        response = self.client.patch(
+            reverse("planner-event-workspace-operations", kwargs={"event_id": first.id}),
+            {"operations": [{"op": "replace", "path": "/subtasks/31/status", "value": "B"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(PlannerWorkspaceState.objects.get(pk=shared.pk).version, shared.version)
+
+    def test_archived_event_workspace_drops_out_of_compat_state(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+        event = self.make_event()
+        url = reverse("planner-event-workspace", kwargs={"event_id": event.id})
+        self.client.put(url, {"teams": [{"id": 30, "eventId": event.id}], "subtasks": [{"id": 31, "teamId": 30}]}, format="json")
+
+        response = self.client.patch(url, {"archived": True}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        state = self.client.get(reverse("planner-state")).json()
+        self.assertNotIn(30, [team["id"] for team in state["teams"]])
+        self.assertNotIn(31, [item["id"] for item in state["subtasks"]])
+
+        response = self.client.put(reverse("planner-state"), state, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(PlannerTeam.objects.get(team_id=30).workspace.event_id, event.id)
+        self.assertTrue(TeamPlannerDesk.objects.filter(team_id=30).exists())
+
+    def test_archiving_is_for_organizers_and_hidden_writes_keep_compat_version(self):
+        self.create_workspace()
+        event = self.make_event()
+        url = reverse("planner-event-workspace", kwargs={"event_id": event.id})
+        self.authenticate()
+        self.assertEqual(self.client.patch(url, {"archived": True}, format="json").status_code, 403)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.make_curator())
+        self.client.put(url, {"teams": [{"id": 30, "eventId": event.id}]}, format="json")
+        before = self.client.get(reverse("planner-state")).json()["version"]
+        self.client.patch(url, {"archived": True}, format="json")
+        archived = self.client.get(reverse("planner-state")).json()["version"]
+        self.assertGreater(archived, before)
+
+        self.client.patch(url, {"enrollment_closed": True}, format="json")
+        response = self.client.get(reverse("planner-state"))
+        self.assertEqual(response.json()["version"], archived)
+        self.assertEqual(response["ETag"], f'"{archived}"')
+
+    async def test_change_stream_delivers_only_own_team_events_to_projectant(self):
+        await sync_to_async(TeamPlannerDesk.objects.create)(team_id=17, member_ids=[self.user.id])
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+
+        response = await self.async_client.get(
+            reverse("planner-change-stream"), headers={"Authorization": f"Bearer {token}"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertIn(b"retry:", await anext(stream))
+
+        planner_changes.publish({"type": "desk.changed", "team_ids": [18], "version": 2})
+        planner_changes.publish({"type": "desk.changed", "team_ids": [17], "version": 3})
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        self.assertTrue(chunk.startswith(b"event: desk.changed\n"))
+        self.assertEqual(json.loads(chunk.split(b"data: ")[1])["team_ids"], [17])
+        await response.streaming_content.aclose()
+
+    async def test_streamed_reads_are_async_under_asgi(self):
+        await sync_to_async(self.create_workspace)()
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        regular = await self.async_client.get(reverse("planner-state"), headers=headers)
+        with mock.patch("planner.streaming.BUFFER_SIZE", 1):
+            response = await self.async_client.get(reverse("planner-state"), {"stream": "1"}, headers=headers)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b"".join(chunks)), json.loads(regular.content))
+
+    async def test_change_stream_follows_projectant_team_membership(self):
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+        response = await self.async_client.get(
+            reverse("planner-change-stream"), headers={"Authorization": f"Bearer {token}"}
+        )
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+
+        planner_changes.publish({"type": "desk.changed", "team_ids": [17], "version": 2})
+        planner_changes.publish({"type": "planner.changed", "team_ids": [], "version": 9})
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        self.assertEqual(json.loads(chunk.split(b"data: ")[1])["version"], 9)
+
+        await sync_to_async(TeamPlannerDesk.objects.create)(team_id=17, member_ids=[self.user.id])
+        planner_changes.publish({"type": "desk.changed", "team_ids": [17], "version": 3})
+        chunk = await asyncio.wait_for(anext(stream), 1)
+        self.assertEqual(json.loads(chunk.split(b"data: ")[1])["version"], 3)
+        await response.streaming_content.aclose()
+
+    async def test_change_stream_reads_teams_once_for_workspace_events(self):
+        await sync_to_async(TeamPlannerDesk.objects.create)(team_id=17, member_ids=[self.user.id])
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+
+        with mock.patch("planner.views._stream_team_ids", wraps=_stream_team_ids) as read_teams:
+            response = await self.async_client.get(
+                reverse("planner-change-stream"), headers={"Authorization": f"Bearer {token}"}
+            )
+            stream = aiter(response.streaming_content)
+            await anext(stream)
+            for version in (2, 3, 4):
+                planner_changes.publish({"type": "planner.changed", "team_ids": [17], "version": version})
+                await asyncio.wait_for(anext(stream), 1)
+            await response.streaming_content.aclose()
+
+        self.assertEqual(read_teams.call_count, 1)
+
+    async def test_change_stream_requires_authentication(self):
+        response = await self.async_client.get(reverse("planner-change-stream"))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_planner_writes_publish_change_events_after_commit(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+
+        with mock.patch.object(planner_changes, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    reverse("planner-state-operations"),
+                    {"operations": [{"op": "replace", "path": "/subtasks/10/status", "value": "B"}]},
+                    format="json",
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    reverse("planner-team-desk-detail", kwargs={"team_id": 17}), {"team_name": "X"}, format="json"
+                )
+
+        events = [call.args[0] for call in publish.call_args_list]
+        self.assertEqual([event["type"] for event in events], ["planner.changed", "desk.changed"])
+        self.assertEqual(events[0]["team_ids"], [17])
+        self.assertEqual(events[1]["team_ids"], [17])
+
+    def test_writes_append_replayable_change_log(self):
+        curator = self.make_curator()
+        self.client.force_authenticate(user=curator)
+        workspace = self.create_workspace()
+        created_seq = PlannerChange.objects.latest("id").id
+
+        self.client.patch(
+            reverse("planner-state-operations"),
+            {"operations": [{"op": "replace", "path": "/subtasks/10/status", "value": "B"}]},
+            format="json",
+        )
+        self.client.patch(
+            reverse("planner-state"),
+            {"columns": ["A", "B", "C"], "subtasks": [{"id": 12, "teamId": 18, "status": "A"}]},
+            format="json",
+        )
+        self.client.patch(reverse("planner-team-desk-detail", kwargs={"team_id": 17}), {"team_name": "Renamed"}, format="json")
+
+        changes = list(PlannerChange.objects.filter(workspace=workspace).order_by("id"))
+        self.assertEqual(len(changes), 4)
+        self.assertEqual(changes[1].operations, [{"op": "replace", "path": "/subtasks/10/status", "value": "B"}])
+        self.assertEqual(changes[1].author_id, curator.id)
+        self.assertIn({"op": "replace", "path": "/columns", "value": ["A", "B", "C"]}, changes[2].operations)
+        self.assertIn({"op": "remove", "path": "/subtasks/10"}, changes[2].operations)
+        self.assertEqual(changes[3].team_ids, [17])
+
+        workspace.refresh_from_db()
+        replayed, current = state_at(workspace), capture_state(workspace)
+        # Desks are derived from teams; only explicit desk edits are logged.
+        self.assertEqual(replayed.pop("desks"), {"17": current["desks"]["17"]})
+        current.pop("desks")
+        self.assertEqual(replayed, current)
+        self.assertEqual([item["id"] for item in state_at(workspace, created_seq)["subtasks"]], [10, 11])
+
+        call_command("restore_planner_workspace", workspace.id, created_seq, stdout=io.StringIO())
+
+        workspace.refresh_from_db()
+        self.assertEqual(workspace.columns, ["A", "B"])
+        self.assertEqual([item["status"] for item in workspace.subtasks], ["A", "A"])
+
+    def test_change_list_returns_changes_since_and_gone_after_compaction(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        first_seq = PlannerChange.objects.latest("id").id
+        for status_value in ("B", "C", "D"):
+            self.client.patch(
+                reverse("planner-state-operations"),
+                {"operations": [{"op": "replace", "path": "/subtasks/10/status", "value": status_value}]},
+                format="json",
+            )
+
+        response = self.client.get(reverse("planner-change-list"), {"since": first_seq, "limit": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry["operations"][0]["value"] for entry in response.data["changes"]], ["B", "C"])
+        self.assertTrue(response.data["has_more"])
+        response = self.client.get(reverse("planner-change-list"), {"since": response.data["last_seq"]})
+        self.assertEqual([entry["operations"][0]["value"] for entry in response.data["changes"]], ["D"])
+        self.assertFalse(response.data["has_more"])
+
+        call_command("compact_planner_history", min_changes=1, keep=1, stdout=io.StringIO())
+
+        snapshot = PlannerSnapshot.objects.get(workspace=workspace)
+        self.assertFalse(PlannerChange.objects.filter(workspace=workspace).exists())
+        self.assertEqual(snapshot.state["subtasks"][0]["status"], "D")
+        response = self.client.get(reverse("planner-change-list"), {"since": first_seq})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        response = self.client.get(reverse("planner-change-list"), {"since": snapshot.change_id})
+        self.assertEqual(response.data["changes"], [])
+        workspace.refresh_from_db()
+        self.assertEqual(state_at(workspace), capture_state(workspace))
+
+    def test_change_list_hides_foreign_subtasks_from_projectant(self):
+        self.authenticate()
+        workspace = self.create_workspace()
+        since = PlannerChange.objects.latest("id").id
+        workspace.subtasks = [
+            {"id": 10, "teamId": 17, "assigneeId": self.user.id, "status": "B"},
+            {"id": 11, "teamId": 18, "assigneeId": self.user.id + 1, "status": "B"},
+        ]
+        workspace.save()
+
+        response = self.client.get(reverse("planner-change-list"), {"since": since})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        operations = response.data["changes"][0]["operations"]
+        self.assertEqual([operation["path"] for operation in operations], ["/subtasks/10", "/subtasks/11"])
+        self.assertEqual(operations[1], {"op": "remove", "path": "/subtasks/11"})
+
+    def test_change_list_rejects_malformed_event_id(self):
+        self.authenticate()
+        self.create_workspace()
+
+        response = self.client.get(reverse("planner-change-list"), {"since": 0, "event_id": "abc"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("event_id", response.data)
+
+    def test_team_desk_list_filters_and_summary(self):
+        self.authenticate()
+        event = self.make_event()
+        self.create_workspace()
+        event_workspace = PlannerWorkspaceState.for_event(event.id)
+        event_workspace.teams = [{"id": 30, "eventId": event.id}]
+        event_workspace.save()
+        TeamPlannerDesk.objects.create(team_id=17, curator_id=4, member_ids=[self.user.id, 99])
+        TeamPlannerDesk.objects.create(team_id=18, curator_id=5, member_ids=[99])
+        TeamPlannerDesk.objects.create(team_id=30, curator_id=4, member_ids=[])
+        url = reverse("planner-team-desk-list")
+
+        def team_ids(params):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [desk["team_id"] for desk in response.data]
+
+        self.assertEqual(team_ids({"curator_id": 4}), [17, 30])
+        self.assertEqual(team_ids({"member": self.user.id}), [17])
+        self.assertEqual(team_ids({"member": 99, "curator_id": 5}), [18])
+        self.assertEqual(team_ids({"event": event.id}), [30])
+        self.assertEqual(self.client.get(url, {"member": "x"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(url, {"summary": "1", "page_size": 2})
+        self.assertNotIn("subtasks", response.data["results"][0])
+        self.assertEqual(len(response.data["results"]), 2)
+        response = self.client.get(response.data["next"])
+        self.assertEqual([desk["team_id"] for desk in response.data["results"]], [30])
+
+    def test_filtered_desk_list_etag_changes_when_a_desk_moves_between_curators(self):
+        self.authenticate()
+        TeamPlannerDesk.objects.create(team_id=17, curator_id=4)
+        TeamPlannerDesk.objects.create(team_id=18, curator_id=5)
+        TeamPlannerDesk.objects.create(team_id=19, curator_id=4)
+        url = reverse("planner-team-desk-list")
+        etag = self.client.get(url, {"curator_id": 4})["ETag"]
+
+        TeamPlannerDesk.objects.filter(team_id=17).update(curator_id=5)
+        TeamPlannerDesk.objects.filter(team_id=18).update(curator_id=4)
+        response = self.client.get(url, {"curator_id": 4}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([desk["team_id"] for desk in response.data], [18, 19])
+
+    def test_team_desk_list_loads_tasks_without_per_desk_queries(self):
+        self.authenticate()
+        self.create_workspace()
+        for team_id in (17, 18):
+            TeamPlannerDesk.objects.create(team_id=team_id)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("planner-team-desk-list"))
+        few_desks = len(queries)
+
+        self.assertEqual([desk["subtasks"][0]["id"] for desk in response.data], [10, 11])
+        workspace = PlannerWorkspaceState.current()
+        workspace.teams = workspace.teams + [{"id": team_id} for team_id in range(100, 120)]
+        workspace.save()
+        TeamPlannerDesk.objects.bulk_create(TeamPlannerDesk(team_id=team_id) for team_id in range(100, 120))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("planner-team-desk-list"))
+        self.assertEqual(len(queries), few_desks)
+
+    def test_team_memberships_follow_desk_and_workspace_writes(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+        sync_response = self.client.patch(
+            reverse("planner-state"),
+            {"teams": [{"id": 17, "memberIds": [self.user.id, 99]}, {"id": 18, "memberIds": [99]}]},
+            format="json",
+        )
+        self.assertEqual(sync_response.status_code, status.HTTP_200_OK)
+
+        def memberships():
+            return set(TeamMember.objects.values_list("desk_id", "user_id"))
+
+        self.assertEqual(memberships(), {(17, self.user.id), (17, 99), (18, 99)})
+
+        desk = TeamPlannerDesk.objects.get(team_id=18)
+        desk.member_ids = [self.user.id]
+        desk.save()
+        self.assertEqual(memberships(), {(17, self.user.id), (17, 99), (18, self.user.id)})
+
+        TeamPlannerDesk.objects.filter(team_id=17).delete()
+        self.assertEqual(memberships(), {(18, self.user.id)})
+
+    def test_my_desks_returns_only_own_teams(self):
+        self.authenticate()
+        self.create_workspace()
+        TeamPlannerDesk.objects.create(team_id=17, member_ids=[self.user.id])
+        TeamPlannerDesk.objects.create(team_id=18, member_ids=[99])
+        TeamPlannerDesk.objects.create(team_id=19, curator_id=self.user.id)
+
+        response = self.client.get(reverse("planner-my-desks"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([desk["team_id"] for desk in response.data], [17, 19])
+        self.assertEqual([task["id"] for task in response.data[0]["subtasks"]], [10])
+        self.assertEqual(
+            self.client.get(reverse("planner-my-desks"), HTTP_IF_NONE_MATCH=response["ETag"]).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+    def test_my_desks_etag_changes_when_membership_moves(self):
+        self.authenticate()
+        for team_id, member_ids in ((17, [self.user.id]), (18, [99]), (19, [self.user.id])):
+            TeamPlannerDesk.objects.create(team_id=team_id, member_ids=member_ids)
+        etag = self.client.get(reverse("planner-my-desks"))["ETag"]
+
+        TeamMember.objects.filter(desk_id=17, user_id=self.user.id).update(desk_id=18)
+        response = self.client.get(reverse("planner-my-desks"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([desk["team_id"] for desk in response.data], [18, 19])
+
+    def test_team_desk_edit_is_merged_back_into_workspace(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+        self.client.patch(reverse("planner-state"), {"columns": ["A", "B"]}, format="json")
+        desk_url = reverse("planner-team-desk-detail", kwargs={"team_id": 17})
+        version = PlannerWorkspaceState.current().version
+
+        response = self.client.patch(
+            desk_url,
+            {"team_name": "Renamed", "member_ids": [99], "columns": ["Todo", "Done"]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workspace = PlannerWorkspaceState.current()
+        self.assertGreater(workspace.version, version)
+        self.assertEqual(
+            workspace.teams,
+            [
+                {"id": 17, "name": "Renamed", "memberIds": [99], "columns": ["Todo", "Done"]},
+                {"id": 18, "name": "Team 18"},
+            ],
+        )
+        self.assertEqual([task["id"] for task in workspace.subtasks], [10, 11])
+        change = PlannerChange.objects.order_by("-id").first()
+        self.assertEqual([operation["path"] for operation in change.operations], ["/desks/17", "/teams/17"])
+
+        # A later workspace write no longer reverts the desk.
+        self.client.patch(reverse("planner-state"), {"enrollment_closed": True, "columns": ["X"]}, format="json")
+        desk = self.client.get(desk_url).json()
+        self.assertEqual(
+            (desk["team_name"], desk["member_ids"], desk["columns"]),
+            ("Renamed", [99], ["Todo", "Done"]),
+        )
+        self.assertEqual(TeamPlannerDesk.objects.get(team_id=18).columns, ["X"])
+
+    def test_team_desk_edit_adds_missing_team_to_workspace(self):
+        self.authenticate()
+        self.create_workspace()
+        url = reverse("planner-team-desk-detail", kwargs={"team_id": 40})
+        self.client.get(url)
+
+        self.client.patch(url, {"team_name": "New team"}, format="json")
+
+        self.assertIn({"id": 40, "name": "New team"}, PlannerWorkspaceState.current().teams)
+
+    def test_board_stats_are_aggregated_in_the_database(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        workspace.subtasks = workspace.subtasks + [
+            {"id": 12, "teamId": 17, "parentTaskId": 1, "assigneeId": self.user.id, "status": "B", "inSprint": True},
+            {"id": 13, "teamId": 17, "parentTaskId": 1, "status": "Other"},
+        ]
+        workspace.save()
+        TeamPlannerDesk.objects.create(team_id=17, columns=["A", "B"])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("planner-team-desk-stats", kwargs={"team_id": 17}))
+        self.assertLessEqual(len(queries), 10)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "columns": ["A", "B"],
+                "total": 3,
+                "done": 1,
+                "in_sprint": 1,
+                "percent_done": 33.3,
+                "by_status": {"A": 1, "B": 1, "Other": 1},
+                "by_assignee": [
+                    {"assignee_id": self.user.id, "total": 2, "done": 1, "in_sprint": 1},
+                    {"assignee_id": None, "total": 1, "done": 0, "in_sprint": 0},
+                ],
+                "parent_tasks": [{"parent_task_id": 1, "total": 3, "done": 1, "percent_done": 33.3}],
+            },
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse("planner-team-desk-stats", kwargs={"team_id": 17}), HTTP_IF_NONE_MATCH=response["ETag"]
+            ).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+        response = self.client.get(reverse("planner-state-stats"))
+        self.assertEqual((response.data["total"], response.data["by_status"]), (4, {"A": 2, "B": 1, "Other": 1}))
+        self.assertEqual(
+            [(row["parent_task_id"], row["percent_done"]) for row in response.data["parent_tasks"]],
+            [(1, 33.3), (2, 0.0)],
+        )
+
+    def test_board_stats_count_done_by_each_team_columns(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        workspace.subtasks = [
+            {"id": 10, "teamId": 17, "status": "Готово"},
+            {"id": 11, "teamId": 17, "status": "B"},
+            {"id": 12, "teamId": 18, "status": "B"},
+        ]
+        workspace.save()
+        TeamPlannerDesk.objects.create(team_id=17, columns=["В работе", "Готово"])
+
+        response = self.client.get(reverse("planner-state-stats"))
+
+        self.assertEqual(response.data["done"], 2)
+        self.assertEqual(response.data["by_assignee"], [{"assignee_id": None, "total": 3, "done": 2, "in_sprint": 0}])
+        desk_response = self.client.get(reverse("planner-team-desk-stats", kwargs={"team_id": 17}))
+        self.assertEqual(desk_response.data["done"], 1)
+
+    def test_board_stats_of_projectant_cover_own_subtasks(self):
+        self.authenticate()
+        self.create_workspace()
+
+        response = self.client.get(reverse("planner-state-stats"))
+
+        self.assertEqual(response.data["total"], 1)
+        self.assertEqual([row["assignee_id"] for row in response.data["by_assignee"]], [self.user.id])
+        self.assertEqual(
+            self.client.get(reverse("planner-team-desk-stats", kwargs={"team_id": 99})).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    def test_timeline_returns_tasks_overlapping_window(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        workspace.parent_tasks = [
+            {"id": 1, "teamId": 17, "startDate": "2026-03-01", "endDate": "2026-03-31"},
+            {"id": 2, "teamId": 18, "startDate": "2026-05-01", "endDate": "2026-05-10"},
+        ]
+        workspace.subtasks = [
+            {"id": 10, "teamId": 17, "assigneeId": 5, "startDate": "2026-02-20", "endDate": "2026-03-02"},
+            {"id": 11, "teamId": 17, "assigneeId": 6, "startDate": "2026-03-10"},
+            {"id": 12, "teamId": 18, "assigneeId": 5, "startDate": "2026-04-02", "endDate": "2026-03-25"},
+            {"id": 13, "teamId": 17, "assigneeId": 5},
+            {"id": 14, "teamId": 17, "assigneeId": 5, "startDate": "2026-04-01", "endDate": "2026-04-30"},
+        ]
+        workspace.save()
+        url = reverse("planner-timeline")
+
+        def ids(params):
+            response = self.client.get(url, {"from": "2026-03-02", "to": "2026-03-31", **params})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [task["id"] for task in response.data["parent_tasks"]], [task["id"] for task in response.data["subtasks"]]
+
+        self.assertEqual(ids({}), ([1], [10, 11, 12]))
+        self.assertEqual(ids({"team_id": 17}), ([1], [10, 11]))
+        self.assertEqual(ids({"assignee_id": 5}), ([1], [10, 12]))
+        self.assertEqual(self.client.get(url, {"from": "2026-03-02"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.get(url, {"from": "2026-03-02", "to": "2026-03-01"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_deadlines_list_open_subtasks_by_board_final_column(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        workspace.subtasks = [
+            {"id": 10, "teamId": 17, "status": "A", "endDate": "2026-03-01", "title": "Late"},
+            {"id": 11, "teamId": 17, "status": "B", "endDate": "2026-03-01"},
+            {"id": 12, "teamId": 18, "status": "B", "endDate": "2026-03-01"},
+            {"id": 13, "teamId": 18, "status": "Done", "endDate": "2026-03-12"},
+            {"id": 14, "teamId": 18, "status": "A", "endDate": "2026-03-20"},
+            {"id": 15, "teamId": 18, "status": "A"},
+        ]
+        workspace.save()
+        # Team 18 has its own columns, so "B" is not final there.
+        TeamPlannerDesk.objects.create(team_id=18, columns=["A", "B", "Done"])
+        url = reverse("planner-deadlines")
+
+        with mock.patch("django.utils.timezone.localdate", return_value=timezone.datetime(2026, 3, 10).date()):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([task["id"] for task in response.data["overdue"]], [10, 12])
+            self.assertEqual(response.data["due_soon"], [])
+            response = self.client.get(url, {"days": 14, "team_id": 18})
+            self.assertEqual([task["id"] for task in response.data["overdue"]], [12])
+            self.assertEqual([task["id"] for task in response.data["due_soon"]], [14])
+
+            out = io.StringIO()
+            call_command("planner_deadline_digest", stdout=out)
+        self.assertIn("[просрочено] 2026-03-01 #10 Late", out.getvalue())
+        self.assertIn("Команда #18:", out.getvalue())
+
+    def test_bulk_subtask_update_merges_changes_in_one_statement(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        workspace.subtasks = workspace.subtasks + [{"id": 12, "teamId": 18, "status": "B", "inSprint": True}]
+        workspace.save()
+        TeamPlannerDesk.objects.create(team_id=17)
+        desk_version = TeamPlannerDesk.objects.get(team_id=17).version
+        url = reverse("planner-subtask-bulk")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                url, {"ids": [10, 12], "changes": {"status": "B", "inSprint": False}}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data["items"]], [10, 12])
+        self.assertEqual(response.data["team_ids"], [17, 18])
+        updates = [query for query in queries.captured_queries if query["sql"].startswith('UPDATE "CRM_PLANNER_SUBTASK"')]
+        self.assertEqual(len(updates), 1)
+        rows = {row.task_id: row for row in PlannerSubtask.objects.filter(task_id__in=[10, 11, 12])}
+        self.assertEqual((rows[10].status, rows[10].in_sprint, rows[10].payload["parentTaskId"]), ("B", False, 1))
+        self.assertEqual(rows[11].status, "A")
+        self.assertFalse(rows[12].in_sprint)
+        self.assertGreater(TeamPlannerDesk.objects.get(team_id=17).version, desk_version)
+        self.assertEqual(
+            PlannerChange.objects.order_by("-id").first().operations,
+            [{"op": "replace", "path": f"/subtasks/{item['id']}", "value": item} for item in response.data["items"]],
+        )
+
+        self.assertEqual(
+            self.client.post(url, {"ids": [10, 99], "changes": {"status": "A"}}, format="json").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.client.post(url, {"ids": [10], "changes": {"teamId": 18}}, format="json").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_bulk_subtask_update_reaches_event_team_subtasks(self):
+        self.authenticate()
+        self.create_workspace()
+        event_workspace = PlannerWorkspaceState.for_event(self.make_event().id)
+        event_workspace.teams = [{"id": 30}]
+        event_workspace.subtasks = [
+            {"id": 31, "teamId": 30, "assigneeId": self.user.id, "status": "A"},
+            {"id": 32, "teamId": 30, "assigneeId": self.user.id + 1, "status": "A"},
+        ]
+        event_workspace.save()
+        url = reverse("planner-subtask-bulk")
+
+        response = self.client.post(url, {"ids": [10, 31], "changes": {"status": "B"}}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.data["items"]], [10, 31])
+        self.assertEqual(response.data["team_ids"], [17, 30])
+        self.assertEqual(PlannerSubtask.objects.get(task_id=31).status, "B")
+        response = self.client.post(url, {"ids": [32], "changes": {"status": "B"}}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_subtask_update_is_limited_to_own_subtasks_for_projectant(self):
+        self.authenticate()
+        self.create_workspace()
+        url = reverse("planner-subtask-bulk")
+
+        response = self.client.post(url, {"ids": [10, 11], "changes": {"status": "B"}}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(PlannerSubtask.objects.get(task_id=10).status, "A")
+        response = self.client.post(url, {"ids": [10], "changes": {"status": "B"}}, format="json")
+        self.assertEqual(response.data["items"][0]["status"], "B")
+
+    def test_column_change_rewrites_statuses_across_workspaces(self):
+        self.client.force_authenticate(user=self.make_curator())
+        workspace = self.create_workspace()
+        workspace.teams = workspace.teams + [{"id": 19, "columns": ["A", "Own"]}]
+        workspace.subtasks = workspace.subtasks + [
+            {"id": 12, "teamId": 18, "status": "B"},
+            {"id": 13, "teamId": 19, "status": "A"},
+        ]
+        workspace.save()
+        event_workspace = PlannerWorkspaceState.for_event(self.make_event().id)
+        event_workspace.columns = ["A", "B"]
+        event_workspace.teams = [{"id": 30}]
+        event_workspace.subtasks = [{"id": 31, "teamId": 30, "status": "B"}]
+        event_workspace.save()
+        for team_id in (17, 19, 30):
+            TeamPlannerDesk.objects.create(team_id=team_id, columns=["A", "Own"] if team_id == 19 else ["A", "B"])
+        url = reverse("planner-columns")
+
+        response = self.client.post(
+            url, {"columns": ["Todo", "B", "Done"], "renames": {"A": "Todo"}}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["applied"], response.data["team_ids"]), (2, [17, 18]))
+        statuses = dict(PlannerSubtask.objects.values_list("task_id", "status"))
+        self.assertEqual(statuses, {10: "Todo", 11: "Todo", 12: "B", 13: "A", 31: "B"})
+        self.assertEqual(PlannerSubtask.objects.get(task_id=10).payload["status"], "Todo")
+        desks = dict(TeamPlannerDesk.objects.values_list("team_id", "columns"))
+        self.assertEqual(desks, {17: ["Todo", "B", "Done"], 19: ["A", "Own"], 30: ["Todo", "B", "Done"]})
+
+        # Removing a column moves its subtasks to the fallback.
+        response = self.client.post(
+            reverse("planner-event-columns", kwargs={"event_id": event_workspace.event_id}),
+            {"columns": ["Todo", "Done"], "fallback": "Done"},
+            format="json",
+        )
+        self.assertEqual(response.data["applied"], 1)
+        self.assertEqual(PlannerSubtask.objects.get(task_id=31).status, "Done")
+        self.assertEqual(PlannerSubtask.objects.get(task_id=12).status, "B")
+
+        workspace.refresh_from_db()
+        self.assertEqual(state_at(workspace)["subtasks"], workspace.subtasks)
+        self.assertEqual(
+            self.client.post(url, {"columns": ["X"], "renames": {"B": "Y"}}, format="json").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.post(url, {"columns": ["X"]}, format="json").status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unfiltered_reads_are_served_from_rendered_cache(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+        TeamPlannerDesk.objects.create(team_id=17)
+        urls = (reverse("planner-state"), reverse("planner-team-desk-detail", kwargs={"team_id": 17}))
+        first = [self.client.get(url) for url in urls]
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = [self.client.get(url) for url in urls]
+
+        self.assertEqual([response.content for response in cached], [response.content for response in first])
+        self.assertEqual(cached[0]["Content-Type"], "application/json")
+        self.assertFalse([query for query in queries.captured_queries if "CRM_PLANNER_SUBTASK" in query["sql"]])
+
+        self.client.patch(
+            reverse("planner-state-operations"),
+            {"operations": [{"op": "replace", "path": "/subtasks/10/status", "value": "B"}]},
+            format="json",
+        )
+        self.assertEqual(json.loads(self.client.get(urls[0]).content)["subtasks"][0]["status"], "B")
+        self.assertEqual(json.loads(self.client.get(urls[1]).content)["subtasks"][0]["status"], "B")
+
+    def test_cached_body_version_matches_etag(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+        event_url = reverse("planner-event-workspace", kwargs={"event_id": self.make_event().id})
+        self.client.put(event_url, {"teams": [{"id": 30}]}, format="json")
+        self.client.patch(event_url, {"archived": True}, format="json")
+
+        for _ in range(2):
+            response = self.client.get(reverse("planner-state"))
+            self.assertEqual(response["ETag"], f'"{response.json()["version"]}"')
+            self.client.patch(event_url, {"enrollment_closed": True}, format="json")
+            PlannerWorkspaceState.current().touch()
+
+    def test_streamed_reads_match_regular_responses(self):
+        self.client.force_authenticate(user=self.make_curator())
+        self.create_workspace()
+        event = self.make_event()
+        self.client.put(
+            reverse("planner-event-workspace", kwargs={"event_id": event.id}),
+            {"teams": [{"id": 30, "name": "Тридцать", "eventId": event.id}], "subtasks": [{"id": 31, "teamId": 30}]},
+            format="json",
+        )
+        TeamPlannerDesk.objects.create(team_id=17)
+        urls = [
+            (reverse("planner-state"), {}),
+            (reverse("planner-event-workspace", kwargs={"event_id": event.id}), {}),
+            (reverse("planner-team-desk-list"), {}),
+            (reverse("planner-team-desk-list"), {"summary": "1"}),
+        ]
+
+        with mock.patch("planner.streaming.CHUNK_SIZE", 1):
+            for url, params in urls:
+                regular = self.client.get(url, params).json()
+                response = self.client.get(url, {**params, "stream": "1"})
+                self.assertTrue(response.streaming)
+                streamed = json.loads(b"".join(response.streaming_content))
+                self.assertEqual(streamed, regular)
+
+        self.authenticate()
+        response = self.client.get(reverse("planner-state"), {"stream": "1"})
+        streamed = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(streamed, self.client.get(reverse("planner-state")).json())
+        self.assertEqual([item["id"] for item in streamed["subtasks"]], [10])
+
+
+class PostgresNotifyTransportTests(TransactionTestCase):
+    def test_events_reach_listeners_through_the_database(self):
+        received = []
+        delivered = threading.Event()
+        transport = PostgresNotifyTransport()
+        transport.poll_seconds = 0.1
+        transport.start(lambda event: (received.append(event), delivered.set()))
+        self.addCleanup(transport.stop)
+        self.assertTrue(transport.listening.wait(5))
+
+        transport.send({"type": "desk.changed", "team_ids": [17], "version": 4})
+
+        self.assertTrue(delivered.wait(5))
+        self.assertEqual(received, [{"type": "desk.changed", "team_ids": [17], "version": 4}])
@@ -1,13 +1,74 @@
 from django.urls import path
 
-from planner.views import TeamPlannerDeskDetailView, TeamPlannerDeskListView
+from planner.views import (
+    MyTeamPlannerDeskListView,
+    PlannerChangeListView,
+    PlannerColumnsView,
+    PlannerDeadlinesView,
+    PlannerEventColumnsView,
+    PlannerEventOperationsView,
+    PlannerEventStatsView,
+    PlannerEventSubtaskBulkView,
+    PlannerEventWorkspaceView,
+    PlannerStateOperationsView,
+    PlannerStatsView,
+    PlannerSubtaskBulkView,
+    PlannerTimelineView,
+    TeamPlannerDeskDetailView,
+    TeamPlannerDeskListView,
+    TeamPlannerDeskStatsView,
+    planner_change_stream,
+)
 
 
 urlpatterns = [
+    path(
+        "workspace/operations/",
+        PlannerStateOperationsView.as_view(),
+        name="planner-state-operations",
+    ),
+    path("workspace/stats/", PlannerStatsView.as_view(), name="planner-state-stats"),
+    path("workspace/columns/", PlannerColumnsView.as_view(), name="planner-columns"),
+    path("workspace/subtasks/bulk/", PlannerSubtaskBulkView.as_view(), name="planner-subtask-bulk"),
+    path(
+        "events/<int:event_id>/workspace/",
+        PlannerEventWorkspaceView.as_view(),
+        name="planner-event-workspace",
+    ),
+    path(
+        "events/<int:event_id>/workspace/operations/",
+        PlannerEventOperationsView.as_view(),
+        name="planner-event-workspace-operations",
+    ),
+    path(
+        "events/<int:event_id>/workspace/columns/",
+        PlannerEventColumnsView.as_view(),
+        name="planner-event-columns",
+    ),
+    path(
+        "events/<int:event_id>/workspace/subtasks/bulk/",
+        PlannerEventSubtaskBulkView.as_view(),
+        name="planner-event-subtask-bulk",
+    ),
+    path(
+        "events/<int:event_id>/workspace/stats/",
+        PlannerEventStatsView.as_view(),
+        name="planner-event-workspace-stats",
+    ),
+    path("changes/", PlannerChangeListView.as_view(), name="planner-change-list"),
+    path("deadlines/", PlannerDeadlinesView.as_view(), name="planner-deadlines"),
+    path("stream/", planner_change_stream, name="planner-change-stream"),
+    path("timeline/", PlannerTimelineView.as_view(), name="planner-timeline"),
     path("teams/desks/", TeamPlannerDeskListView.as_view(), name="planner-team-desk-list"),
+    path("teams/my-desks/", MyTeamPlannerDeskListView.as_view(), name="planner-my-desks"),
     path(
         "teams/<int:team_id>/desk/",
         TeamPlannerDeskDetailView.as_view(),
         name="planner-team-desk-detail",
     ),
+    path(
+        "teams/<int:team_id>/desk/stats/",
+        TeamPlannerDeskStatsView.as_view(),
+        name="planner-team-desk-stats",
+    ),
 ]
@@ -0,0 +1,93 @@
+from django.utils.dateparse import parse_date
+
+
+def to_int(value):
+    try:
+        if value is None:
+            return None
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def item_value(item, camel_key, snake_key, default=None):
+    if not isinstance(item, dict):
+        return default
+    return item.get(camel_key, item.get(snake_key, default))
+
+
+def item_id(item):
+    return to_int(item_value(item, "id", "id"))
+
+
+def team_id_from_item(item):
+    return to_int(item_value(item, "teamId", "team_id"))
+
+
+def assignee_id_from_item(item):
+    return to_int(item_value(item, "assigneeId", "assignee_id"))
+
+
+def event_id_from_item(item):
+    return to_int(item_value(item, "eventId", "event_id"))
+
+
+def parent_task_id_from_item(item):
+    return to_int(item_value(item, "parentTaskId", "parent_task_id"))
+
+
+def date_from_item(item, camel_key, snake_key):
+    value = item_value(item, camel_key, snake_key)
+    if not isinstance(value, str):
+        return None
+    try:
+        return parse_date(value[:10])
+    except ValueError:
+        return None
+
+
+def as_list(value):
+    return value if isinstance(value, list) else []
+
+
+TEAM_DESK_KEYS = (
+    ("team_name", "name", "name"),
+    ("curator_id", "curatorId", "curator_id"),
+    ("member_ids", "memberIds", "member_ids"),
+)
+
+
+def desk_fields_from_team(team, columns):
+    """Desk metadata of a team; the team's own ``columns`` win over the workspace ``columns``."""
+    return {
+        "team_name": str(item_value(team, "name", "name", "") or ""),
+        "curator_id": to_int(item_value(team, "curatorId", "curator_id")),
+        "member_ids": as_list(item_value(team, "memberIds", "member_ids", [])),
+        "columns": as_list(item_value(team, "columns", "columns")) or columns,
+    }
+
+
+def team_with_desk_fields(team, fields, columns):
+    """Copy of ``team`` carrying the desk ``fields``, the reverse of ``desk_fields_from_team``.
+
+    Keys keep the style the team already uses; columns equal to the workspace
+    ``columns`` are not stored on the team.
+    """
+    team = dict(team)
+    current = desk_fields_from_team(team, columns)
+    for field, camel_key, snake_key in TEAM_DESK_KEYS:
+        if fields[field] != current[field]:
+            key = snake_key if snake_key in team and camel_key not in team else camel_key
+            team[key] = fields[field]
+    if fields["columns"] == columns:
+        team.pop("columns", None)
+    else:
+        team["columns"] = fields["columns"]
+    return team
+
+
+def merge_assignee_subtasks(current, incoming, assignee_id):
+    """Keep everyone else's subtasks from ``current`` and take the assignee's from ``incoming``."""
+    foreign = [item for item in as_list(current) if assignee_id_from_item(item) != assignee_id]
+    own = [item for item in as_list(incoming) if assignee_id_from_item(item) == assignee_id]
+    return foreign + own
@@ -1,81 +1,239 @@
+import asyncio
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags, quote_etag
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from rest_framework.generics import ListAPIView, RetrieveUpdateAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.generics import ListAPIView, RetrieveUpdateAPIView, get_object_or_404
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from planner.models import PlannerWorkspaceState, TeamPlannerDesk
-from planner.serializers import PlannerWorkspaceStateSerializer, TeamPlannerDeskSerializer
-from users.models import CRMRole, ROLE_ADMIN, ROLE_CURATOR
+from planner.cache import rendered_json, versioned_key
+from planner.deadlines import DUE_SOON_DAYS, deadlines
+from planner.events import DESK_CHANGED, PLANNER_CHANGED, planner_changes, publish_on_commit
+from planner.history import history_floor
+from planner.models import (
+    PlannerChange,
+    PlannerParentTask,
+    PlannerSubtask,
+    PlannerTeam,
+    TeamMember,
+    PlannerVersionConflict,
+    PlannerWorkspaceState,
+    TeamPlannerDesk,
+)
+from planner.operations import (
+    BULK_MAX_IDS,
+    PlannerOperationError,
+    PlannerOperationForbidden,
+    apply_operations,
+    bulk_update_subtasks,
+    change_columns,
+    parse_bulk_update,
+    parse_column_change,
+    parse_operations,
+)
+from planner.serializers import (
+    PlannerChangeSerializer,
+    PlannerEventWorkspaceSerializer,
+    PlannerWorkspaceAggregateSerializer,
+    PlannerWorkspaceStateSerializer,
+    TeamPlannerDeskSerializer,
+    TeamPlannerDeskSummarySerializer,
+)
+from planner.stats import board_stats
+from planner.streaming import aiterate, stream_desks, stream_workspace
+from planner.sync import sync_team_desks_from_workspace
+from planner.utils import assignee_id_from_item, merge_assignee_subtasks, to_int
+from planner.workspaces import PlannerWorkspaceAggregate
+from users.authentication import CookieJWTAuthentication
+from users.models import Event
+from users.permissions import CuratorOrAdminPermission
+from users.roles import is_organizer
 
 TAG_PLANNER = "Planner"
+STREAM_KEEPALIVE_SECONDS = 25
+STREAM_TEAMS_TTL_SECONDS = 30
+CHANGES_PAGE_SIZE = 200
+CHANGES_MAX_PAGE_SIZE = 1000
+DEADLINES_MAX_DAYS = 90
 
 ERROR_RESPONSE_SCHEMA = openapi.Schema(
     type=openapi.TYPE_OBJECT,
     additional_properties=openapi.Schema(type=openapi.TYPE_STRING),
 )
 
+OPERATIONS_REQUEST_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "operations": openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "op": openapi.Schema(type=openapi.TYPE_STRING, enum=["add", "replace", "remove"]),
+                    "path": openapi.Schema(type=openapi.TYPE_STRING, example="/subtasks/10/status"),
+                    "value": openapi.Schema(type=openapi.TYPE_OBJECT),
+                },
+            ),
+        )
+    },
+)
 
-def _to_int(value):
-    try:
-        if value is None:
-            return None
-        return int(value)
-    except (TypeError, ValueError):
-        return None
+OPERATIONS_RESPONSE_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "applied": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "team_ids": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+        "version": openapi.Schema(type=openapi.TYPE_INTEGER),
+    },
+)
 
 
-def _team_id_from_item(item):
-    if not isinstance(item, dict):
-        return None
-    return _to_int(item.get("teamId", item.get("team_id")))
+VERSION_CONFLICT_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "detail": openapi.Schema(type=openapi.TYPE_STRING),
+        "version": openapi.Schema(type=openapi.TYPE_INTEGER),
+    },
+)
 
+IF_MATCH_PARAMETER = openapi.Parameter(
+    "If-Match",
+    openapi.IN_HEADER,
+    description="Версия, на основе которой сделано изменение; при расхождении вернётся 409",
+    type=openapi.TYPE_STRING,
+)
 
-def _assignee_id_from_item(item):
-    if not isinstance(item, dict):
+
+class JSONPatchParser(JSONParser):
+    media_type = "application/json-patch+json"
+
+
+IF_NONE_MATCH_PARAMETER = openapi.Parameter(
+    "If-None-Match",
+    openapi.IN_HEADER,
+    description="ETag из предыдущего ответа; если данные не менялись, вернётся 304 без тела",
+    type=openapi.TYPE_STRING,
+)
+
+
+STREAM_PARAMETER = openapi.Parameter(
+    "stream",
+    openapi.IN_QUERY,
+    description="1 — отдать ответ потоком, не собирая его целиком в памяти",
+    type=openapi.TYPE_BOOLEAN,
+)
+
+
+def _not_modified(request, etag):
+    """Return a bodiless 304 when the client already holds ``etag``."""
+
+    header = request.headers.get("If-None-Match")
+    if not header:
         return None
-    return _to_int(item.get("assigneeId", item.get("assignee_id")))
+    tags = [tag[2:] if tag.startswith("W/") else tag for tag in parse_etags(header)]
+    if etag not in tags and "*" not in tags:
+        return None
+    return _with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
 
 
-def _is_projectant_user(user):
-    if getattr(user, "is_superuser", False):
-        return False
-    roles = set(CRMRole.objects.filter(user=user).values_list("role_type", flat=True))
-    # In this project, non-curator/non-admin users are treated as projectants (students).
-    return ROLE_ADMIN not in roles and ROLE_CURATOR not in roles
+def _with_etag(response, etag):
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
 
 
-def _sync_team_desks_from_workspace(workspace: PlannerWorkspaceState):
-    teams = workspace.teams if isinstance(workspace.teams, list) else []
-    parent_tasks = workspace.parent_tasks if isinstance(workspace.parent_tasks, list) else []
-    subtasks = workspace.subtasks if isinstance(workspace.subtasks, list) else []
+def _rendered_response(request, key, build):
+    """Serve JSON from rendered bytes cached under ``key``; other formats render as usual."""
 
-    teams_by_id = {}
-    for team in teams:
-        if not isinstance(team, dict):
-            continue
-        team_id = _to_int(team.get("id"))
-        if team_id is None:
-            continue
-        teams_by_id[team_id] = team
+    if request.accepted_renderer.format != "json":
+        return Response(build())
+    return HttpResponse(rendered_json(key, build), content_type="application/json")
 
-    target_ids = set(teams_by_id.keys())
 
-    with transaction.atomic():
-        for team_id, team_data in teams_by_id.items():
-            desk, _ = TeamPlannerDesk.objects.get_or_create(team_id=team_id)
-            desk.team_name = str(team_data.get("name", "") or "")
-            desk.curator_id = _to_int(team_data.get("curatorId", team_data.get("curator_id")))
-            member_ids = team_data.get("memberIds", team_data.get("member_ids", []))
-            desk.member_ids = member_ids if isinstance(member_ids, list) else []
-            desk.parent_tasks = [item for item in parent_tasks if _team_id_from_item(item) == team_id]
-            desk.subtasks = [item for item in subtasks if _team_id_from_item(item) == team_id]
-            desk.columns = workspace.columns
-            desk.save()
+def _wants_stream(request):
+    return request.query_params.get("stream", "").lower() in ("1", "true", "yes")
 
-        TeamPlannerDesk.objects.exclude(team_id__in=target_ids).delete()
+
+def _streaming_json(request, body):
+    # ASGI would collect a sync body into a list before sending anything.
+    if isinstance(request._request, ASGIRequest):
+        body = aiterate(body)
+    return StreamingHttpResponse(body, content_type="application/json")
+
+
+def _workspace_etag(workspace, assignee_id=None):
+    # The projectant view is a per-user projection of the same version.
+    if assignee_id is None:
+        return quote_etag(str(workspace.version))
+    return quote_etag(f"{workspace.version}-u{assignee_id}")
+
+
+def _desk_list_etag(queryset):
+    # Hash every (id, version) pair: a desk leaving the set while another joins
+    # it must change the tag even when counts and version sums stay equal.
+    digest = hashlib.sha1()
+    for desk_id, version in queryset.order_by("id").values_list("id", "version").iterator():
+        digest.update(f"{desk_id}.{version},".encode())
+    return quote_etag(digest.hexdigest())
+
+
+def _expected_version(request):
+    """Return the version a write is conditioned on, from If-Match or the body."""
+
+    raw = request.headers.get("If-Match")
+    if raw is None and isinstance(request.data, dict):
+        raw = request.data.get("version")
+    if raw is None:
+        return None
+    raw = str(raw).strip()
+    if raw == "*":
+        return None
+    if raw.startswith("W/"):
+        raw = raw[2:]
+    version = to_int(raw.strip('"').split("-")[0])
+    if version is None:
+        raise ValidationError({"version": "Некорректная версия"})
+    return version
+
+
+def _version_conflict_response(exc):
+    return Response(
+        {"detail": "Данные были изменены другим пользователем", "version": exc.current_version},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+class ConditionalUpdateMixin:
+    """Run updates in one transaction and answer version conflicts with 409."""
+
+    def update(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except PlannerVersionConflict as exc:
+            return _version_conflict_response(exc)
+
+
+def _is_projectant_user(user):
+    # In this project, non-curator/non-admin users are treated as projectants (students).
+    return not is_organizer(user)
 
 
 @method_decorator(
@@ -84,7 +242,8 @@ def _sync_team_desks_from_workspace(workspace: PlannerWorkspaceState):
         tags=[TAG_PLANNER],
         operation_summary="Get workspace planner state",
         operation_description="Get workspace planner state",
-        responses={200: PlannerWorkspaceStateSerializer, 401: ERROR_RESPONSE_SCHEMA},
+        manual_parameters=[IF_NONE_MATCH_PARAMETER, STREAM_PARAMETER],
+        responses={200: PlannerWorkspaceStateSerializer, 304: "Not modified", 401: ERROR_RESPONSE_SCHEMA},
     ),
 )
 @method_decorator(
@@ -94,7 +253,8 @@ def _sync_team_desks_from_workspace(workspace: PlannerWorkspaceState):
         operation_summary="Replace workspace planner state",
         operation_description="Replace workspace planner state",
         request_body=PlannerWorkspaceStateSerializer,
-        responses={200: PlannerWorkspaceStateSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA},
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: PlannerWorkspaceStateSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
     ),
 )
 @method_decorator(
@@ -104,52 +264,735 @@ def _sync_team_desks_from_workspace(workspace: PlannerWorkspaceState):
         operation_summary="Update workspace planner state",
         operation_description="Update workspace planner state",
         request_body=PlannerWorkspaceStateSerializer,
-        responses={200: PlannerWorkspaceStateSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA},
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: PlannerWorkspaceStateSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
     ),
 )
-class PlannerStateCompatView(RetrieveUpdateAPIView):
+class PlannerStateCompatView(ConditionalUpdateMixin, RetrieveUpdateAPIView):
+    """Shared workspace plus every active event workspace, seen as one state."""
+
     permission_classes = (IsAuthenticated,)
-    serializer_class = PlannerWorkspaceStateSerializer
+    serializer_class = PlannerWorkspaceAggregateSerializer
 
     def get_object(self):
-        state = PlannerWorkspaceState.objects.order_by("id").first()
-        if state:
-            return state
-        return PlannerWorkspaceState.objects.create()
+        return PlannerWorkspaceAggregate()
 
     def get(self, request, *args, **kwargs):
         workspace = self.get_object()
-        data = self.get_serializer(workspace).data
-        if _is_projectant_user(request.user):
-            user_id = _to_int(request.user.id)
-            data["subtasks"] = [
-                item
-                for item in data.get("subtasks", [])
-                if _assignee_id_from_item(item) == user_id
-            ]
-        return Response(data)
+        user_id = to_int(request.user.id) if _is_projectant_user(request.user) else None
+        etag = _workspace_etag(workspace, user_id)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        if _wants_stream(request):
+            body = stream_workspace(self.serializer_class.Meta.fields, workspace, user_id)
+            return _with_etag(_streaming_json(request, body), etag)
+        if user_id is not None:
+            workspace.limit_items(PlannerSubtask, assignee_id=user_id)
+            return _with_etag(Response(self.get_serializer(workspace).data), etag)
+        key = versioned_key(
+            self.serializer_class.__name__, workspace.version, *getattr(workspace, "workspaces", [workspace])
+        )
+        return _with_etag(_rendered_response(request, key, lambda: self.get_serializer(workspace).data), etag)
 
     def perform_update(self, serializer):
-        previous_subtasks = (
-            list(serializer.instance.subtasks)
-            if serializer.instance and isinstance(serializer.instance.subtasks, list)
-            else []
+        workspace = serializer.instance
+        workspace.expected_version = _expected_version(self.request)
+        workspace.changed_by = self.request.user
+        extra = {}
+        if "subtasks" in serializer.validated_data and _is_projectant_user(self.request.user):
+            # Merge against rows read under lock so concurrent saves by
+            # students of one team cannot drop each other's subtasks.
+            workspace.lock_for_update()
+            extra["subtasks"] = merge_assignee_subtasks(
+                workspace.subtasks, serializer.validated_data["subtasks"], to_int(self.request.user.id)
+            )
+        workspace = serializer.save(**extra)
+        touched_team_ids = workspace.pop_touched_team_ids()
+        sync_team_desks_from_workspace(workspace, touched_team_ids)
+        publish_on_commit(
+            PLANNER_CHANGED,
+            touched_team_ids,
+            event_id=getattr(workspace, "event_id", None),
+            version=workspace.version,
         )
-        workspace = serializer.save()
 
-        if _is_projectant_user(self.request.user):
-            user_id = _to_int(self.request.user.id)
-            incoming_subtasks = workspace.subtasks if isinstance(workspace.subtasks, list) else []
-            own_subtasks = [
-                item for item in incoming_subtasks if _assignee_id_from_item(item) == user_id
-            ]
-            foreign_subtasks = [
-                item for item in previous_subtasks if _assignee_id_from_item(item) != user_id
-            ]
-            workspace.subtasks = foreign_subtasks + own_subtasks
-            workspace.save(update_fields=["subtasks", "updated_at"])
 
-        _sync_team_desks_from_workspace(workspace)
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Get event planner workspace",
+        operation_description="Get planner workspace of one event",
+        manual_parameters=[IF_NONE_MATCH_PARAMETER, STREAM_PARAMETER],
+        responses={200: PlannerEventWorkspaceSerializer, 304: "Not modified", 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
+    ),
+)
+@method_decorator(
+    name="put",
+    decorator=swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Replace event planner workspace",
+        operation_description="Replace planner workspace of one event",
+        request_body=PlannerEventWorkspaceSerializer,
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: PlannerEventWorkspaceSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
+    ),
+)
+@method_decorator(
+    name="patch",
+    decorator=swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Update event planner workspace",
+        operation_description="Update planner workspace of one event; archived workspaces drop out of /api/users/planner/",
+        request_body=PlannerEventWorkspaceSerializer,
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: PlannerEventWorkspaceSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
+    ),
+)
+class PlannerEventWorkspaceView(PlannerStateCompatView):
+    serializer_class = PlannerEventWorkspaceSerializer
+
+    def get_permissions(self):
+        # Archiving hides an event from everyone's state, so writes are for organizers.
+        if self.request.method in SAFE_METHODS:
+            return super().get_permissions()
+        return [CuratorOrAdminPermission()]
+
+    def get_object(self):
+        event = get_object_or_404(Event, pk=self.kwargs["event_id"])
+        return PlannerWorkspaceState.for_event(event.pk)
+
+    def perform_update(self, serializer):
+        was_archived = serializer.instance.archived
+        super().perform_update(serializer)
+        workspace = serializer.instance
+        if workspace.archived and not was_archived:
+            # The aggregate version no longer counts this workspace; move the
+            # shared one past it so the version of /api/users/planner/ keeps growing.
+            PlannerWorkspaceState.current().touch(step=workspace.version)
+
+    # Redefined so the schema decorators above do not wrap the inherited handlers.
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def put(self, request, *args, **kwargs):
+        return super().put(request, *args, **kwargs)
+
+    def patch(self, request, *args, **kwargs):
+        return super().patch(request, *args, **kwargs)
+
+
+class PlannerStateOperationsView(APIView):
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (JSONParser, JSONPatchParser)
+
+    def apply_operations(self, request, assignee_id):
+        """Apply the operations and return the result with the event id of the workspace."""
+        workspace = PlannerWorkspaceAggregate()
+        workspace.changed_by = request.user
+        workspace.expected_version = _expected_version(request)
+        return workspace.apply_operations(parse_operations(request.data), assignee_id=assignee_id), None
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Apply workspace planner operations",
+        operation_description=(
+            "Apply JSON-Patch style operations addressed by item id, "
+            "e.g. {\"op\": \"replace\", \"path\": \"/subtasks/10/status\", \"value\": \"Готово\"}"
+        ),
+        request_body=OPERATIONS_REQUEST_SCHEMA,
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: OPERATIONS_RESPONSE_SCHEMA, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 403: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
+    )
+    def patch(self, request, **kwargs):
+        assignee_id = to_int(request.user.id) if _is_projectant_user(request.user) else None
+        try:
+            result, event_id = self.apply_operations(request, assignee_id)
+        except PlannerVersionConflict as exc:
+            return _version_conflict_response(exc)
+        except PlannerOperationForbidden as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_403_FORBIDDEN)
+        except PlannerOperationError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        publish_on_commit(PLANNER_CHANGED, result.team_ids, event_id=event_id, version=result.version)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+BULK_SUBTASKS_REQUEST_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=["ids", "changes"],
+    properties={
+        "ids": openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(type=openapi.TYPE_INTEGER),
+            max_items=BULK_MAX_IDS,
+        ),
+        "changes": openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            example={"status": "Готово", "inSprint": False},
+        ),
+    },
+)
+
+BULK_SUBTASKS_RESPONSE_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "items": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        "applied": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "team_ids": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+        "version": openapi.Schema(type=openapi.TYPE_INTEGER),
+    },
+)
+
+
+class PlannerSubtaskBulkView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def update_subtasks(self, request, assignee_id):
+        """Return the result, the updated payloads and the event id of the workspace."""
+        workspace = PlannerWorkspaceAggregate()
+        workspace.changed_by = request.user
+        workspace.expected_version = _expected_version(request)
+        result, items = workspace.update_subtasks(*parse_bulk_update(request.data), assignee_id=assignee_id)
+        return result, items, None
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Update many workspace subtasks",
+        operation_description=(
+            "Merge the same `changes` into every listed subtask in one transaction, e.g. moving cards "
+            "to another column or closing a sprint. Ids, team and parent task cannot be changed. "
+            "Only the updated subtasks are returned."
+        ),
+        request_body=BULK_SUBTASKS_REQUEST_SCHEMA,
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: BULK_SUBTASKS_RESPONSE_SCHEMA, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 403: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
+    )
+    def post(self, request, **kwargs):
+        assignee_id = to_int(request.user.id) if _is_projectant_user(request.user) else None
+        try:
+            result, items, event_id = self.update_subtasks(request, assignee_id)
+        except PlannerVersionConflict as exc:
+            return _version_conflict_response(exc)
+        except PlannerOperationForbidden as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_403_FORBIDDEN)
+        except PlannerOperationError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        publish_on_commit(PLANNER_CHANGED, result.team_ids, event_id=event_id, version=result.version)
+        return Response({"items": items, **result.as_dict()}, status=status.HTTP_200_OK)
+
+
+class PlannerEventSubtaskBulkView(PlannerSubtaskBulkView):
+    def update_subtasks(self, request, assignee_id):
+        event = get_object_or_404(Event, pk=self.kwargs["event_id"])
+        workspace = PlannerWorkspaceState.for_event(event.pk)
+        workspace.changed_by = request.user
+        result, items = bulk_update_subtasks(
+            workspace, request.data, assignee_id=assignee_id, expected_version=_expected_version(request)
+        )
+        return result, items, event.pk
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Update many event subtasks",
+        operation_description="Merge the same `changes` into every listed subtask of one event workspace",
+        request_body=BULK_SUBTASKS_REQUEST_SCHEMA,
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: BULK_SUBTASKS_RESPONSE_SCHEMA, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 403: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
+    )
+    def post(self, request, **kwargs):
+        return super().post(request, **kwargs)
+
+
+COLUMNS_REQUEST_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=["columns"],
+    properties={
+        "columns": openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(type=openapi.TYPE_STRING),
+            example=["Бэклог", "В работе", "Готово"],
+        ),
+        "renames": openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            additional_properties=openapi.Schema(type=openapi.TYPE_STRING),
+            example={"Запланировано": "Бэклог"},
+        ),
+        "fallback": openapi.Schema(type=openapi.TYPE_STRING, example="Бэклог"),
+    },
+)
+
+COLUMNS_RESPONSE_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "columns": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+        "applied": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "team_ids": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+        "version": openapi.Schema(type=openapi.TYPE_INTEGER),
+    },
+)
+
+
+class PlannerColumnsView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def change_columns(self, request, assignee_id):
+        """Apply the change and return the result with the event id of the workspace."""
+        workspace = PlannerWorkspaceAggregate()
+        workspace.changed_by = request.user
+        workspace.expected_version = _expected_version(request)
+        columns, renames, fallback = parse_column_change(request.data)
+        return workspace.change_columns(columns, renames, fallback, assignee_id=assignee_id), None
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Rename, reorder or remove workspace columns",
+        operation_description=(
+            "Set new `columns`; `renames` maps old names to new ones. Subtasks of renamed columns follow them, "
+            "subtasks of removed columns go to `fallback` (the first column by default). Applies to the shared "
+            "and all active event workspaces; teams with columns of their own are not touched. "
+            "`applied` is the number of subtasks that changed status."
+        ),
+        request_body=COLUMNS_REQUEST_SCHEMA,
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: COLUMNS_RESPONSE_SCHEMA, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 403: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
+    )
+    def post(self, request, **kwargs):
+        assignee_id = to_int(request.user.id) if _is_projectant_user(request.user) else None
+        try:
+            result, event_id = self.change_columns(request, assignee_id)
+        except PlannerVersionConflict as exc:
+            return _version_conflict_response(exc)
+        except PlannerOperationForbidden as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_403_FORBIDDEN)
+        except PlannerOperationError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        publish_on_commit(PLANNER_CHANGED, result.team_ids, event_id=event_id, version=result.version)
+        return Response({"columns": request.data["columns"], **result.as_dict()}, status=status.HTTP_200_OK)
+
+
+class PlannerEventColumnsView(PlannerColumnsView):
+    def change_columns(self, request, assignee_id):
+        event = get_object_or_404(Event, pk=self.kwargs["event_id"])
+        workspace = PlannerWorkspaceState.for_event(event.pk)
+        workspace.changed_by = request.user
+        result = change_columns(
+            workspace, request.data, assignee_id=assignee_id, expected_version=_expected_version(request)
+        )
+        return result, event.pk
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Rename, reorder or remove event columns",
+        operation_description="Change the columns of one event workspace and move the affected subtasks",
+        request_body=COLUMNS_REQUEST_SCHEMA,
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: COLUMNS_RESPONSE_SCHEMA, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 403: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
+    )
+    def post(self, request, **kwargs):
+        return super().post(request, **kwargs)
+
+
+CHANGES_RESPONSE_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "changes": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        "last_seq": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "has_more": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+    },
+)
+
+
+def _projectant_operations(operations, user_id, own_subtask_ids):
+    """Hide other people's subtasks the same way the projectant GET does."""
+
+    visible = []
+    for operation in operations:
+        segments = operation.get("path", "").lstrip("/").split("/")
+        if segments[0] != "subtasks" or operation.get("op") == "remove":
+            visible.append(operation)
+            continue
+        if len(segments) > 2:
+            if to_int(segments[1]) in own_subtask_ids:
+                visible.append(operation)
+            continue
+        if assignee_id_from_item(operation.get("value")) == user_id:
+            visible.append(operation)
+        elif segments[1] != "-":
+            # A subtask that moved to someone else disappears for this user.
+            visible.append({"op": "remove", "path": f"/subtasks/{segments[1]}"})
+    return visible
+
+
+class PlannerChangeListView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="List planner changes since a sequence number",
+        operation_description=(
+            "Return logged planner operations with seq greater than `since`. "
+            "Without `event_id` the shared and all active event workspaces are included. "
+            "410 means the requested history was compacted and the full state must be reloaded."
+        ),
+        manual_parameters=[
+            openapi.Parameter("since", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=True),
+            openapi.Parameter("event_id", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: CHANGES_RESPONSE_SCHEMA, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA, 410: ERROR_RESPONSE_SCHEMA},
+    )
+    def get(self, request):
+        since = to_int(request.query_params.get("since"))
+        if since is None or since < 0:
+            raise ValidationError({"since": "Укажите неотрицательный номер изменения"})
+        limit = to_int(request.query_params.get("limit")) or CHANGES_PAGE_SIZE
+        limit = max(1, min(limit, CHANGES_MAX_PAGE_SIZE))
+
+        event_id = _int_query_param(request, "event_id")
+        if event_id is not None:
+            workspaces = [get_object_or_404(PlannerWorkspaceState, event_id=event_id)]
+        else:
+            workspaces = PlannerWorkspaceState.active()
+
+        floor = history_floor(workspaces)
+        if since < floor:
+            return Response(
+                {"detail": "История изменений сжата, загрузите состояние целиком", "floor": floor},
+                status=status.HTTP_410_GONE,
+            )
+
+        changes = list(
+            PlannerChange.objects.filter(workspace__in=workspaces, id__gt=since)
+            .select_related("workspace")
+            .order_by("id")[: limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        data = PlannerChangeSerializer(changes, many=True).data
+
+        if _is_projectant_user(request.user):
+            user_id = to_int(request.user.id)
+            own_subtask_ids = set(
+                PlannerSubtask.objects.filter(workspace__in=workspaces, assignee_id=user_id).values_list(
+                    "task_id", flat=True
+                )
+            )
+            for entry in data:
+                entry["operations"] = _projectant_operations(entry["operations"], user_id, own_subtask_ids)
+            data = [entry for entry in data if entry["operations"]]
+
+        return Response(
+            {"changes": data, "last_seq": changes[-1].id if changes else since, "has_more": has_more},
+            status=status.HTTP_200_OK,
+        )
+
+
+class PlannerEventOperationsView(PlannerStateOperationsView):
+    def apply_operations(self, request, assignee_id):
+        event = get_object_or_404(Event, pk=self.kwargs["event_id"])
+        workspace = PlannerWorkspaceState.for_event(event.pk)
+        workspace.changed_by = request.user
+        result = apply_operations(
+            workspace, request.data, assignee_id=assignee_id, expected_version=_expected_version(request)
+        )
+        return result, event.pk
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Apply event planner operations",
+        operation_description="Apply JSON-Patch style operations to the planner workspace of one event",
+        request_body=OPERATIONS_REQUEST_SCHEMA,
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: OPERATIONS_RESPONSE_SCHEMA, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 403: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
+    )
+    def patch(self, request, **kwargs):
+        return super().patch(request, **kwargs)
+
+
+STATS_RESPONSE_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "columns": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+        "total": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "done": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "in_sprint": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "percent_done": openapi.Schema(type=openapi.TYPE_NUMBER),
+        "by_status": openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            additional_properties=openapi.Schema(type=openapi.TYPE_INTEGER),
+        ),
+        "by_assignee": openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "assignee_id": openapi.Schema(type=openapi.TYPE_INTEGER, x_nullable=True),
+                    "total": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "done": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "in_sprint": openapi.Schema(type=openapi.TYPE_INTEGER),
+                },
+            ),
+        ),
+        "parent_tasks": openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "parent_task_id": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "total": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "done": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "percent_done": openapi.Schema(type=openapi.TYPE_NUMBER),
+                },
+            ),
+        ),
+    },
+)
+
+
+class PlannerStatsView(APIView):
+    """Column counts, workload and progress of a board; projectants get their own subtasks only."""
+
+    permission_classes = (IsAuthenticated,)
+
+    def get_board(self):
+        """Return the versioned owner of the board, its subtask rows and its columns."""
+        workspace = PlannerWorkspaceAggregate()
+        return workspace, PlannerSubtask.objects.filter(workspace__in=workspace.workspaces), workspace.columns
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Get workspace planner statistics",
+        operation_description=(
+            "Subtask counts by status column and by assignee, sprint totals and completion of every parent task "
+            "across the shared and all active event workspaces. Done means the status is the last column "
+            "of the team desk, or of the workspace when the team has no desk."
+        ),
+        manual_parameters=[IF_NONE_MATCH_PARAMETER],
+        responses={200: STATS_RESPONSE_SCHEMA, 304: "Not modified", 401: ERROR_RESPONSE_SCHEMA},
+    )
+    def get(self, request, **kwargs):
+        owner, subtasks, columns = self.get_board()
+        user_id = to_int(request.user.id) if _is_projectant_user(request.user) else None
+        etag = _workspace_etag(owner, user_id)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        if user_id is not None:
+            subtasks = subtasks.filter(assignee_id=user_id)
+        return _with_etag(Response(board_stats(subtasks, columns)), etag)
+
+
+class PlannerEventStatsView(PlannerStatsView):
+    def get_board(self):
+        event = get_object_or_404(Event, pk=self.kwargs["event_id"])
+        workspace = PlannerWorkspaceState.for_event(event.pk)
+        return workspace, PlannerSubtask.objects.filter(workspace=workspace), workspace.columns
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Get event planner statistics",
+        operation_description="Board statistics of the planner workspace of one event",
+        manual_parameters=[IF_NONE_MATCH_PARAMETER],
+        responses={200: STATS_RESPONSE_SCHEMA, 304: "Not modified", 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
+    )
+    def get(self, request, **kwargs):
+        return super().get(request, **kwargs)
+
+
+class TeamPlannerDeskStatsView(PlannerStatsView):
+    def get_board(self):
+        desk = get_object_or_404(TeamPlannerDesk, team_id=self.kwargs["team_id"])
+        subtasks = PlannerSubtask.objects.filter(workspace=desk.workspace, team_id=desk.team_id)
+        return desk, subtasks, desk.columns
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="Get team planner desk statistics",
+        operation_description="Board statistics of one team desk",
+        manual_parameters=[IF_NONE_MATCH_PARAMETER],
+        responses={200: STATS_RESPONSE_SCHEMA, 304: "Not modified", 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
+    )
+    def get(self, request, **kwargs):
+        return super().get(request, **kwargs)
+
+
+class TeamPlannerDeskCursorPagination(CursorPagination):
+    """Cursor pages for the desk list, used only when the client asks for them.
+
+    Without ``cursor`` or ``page_size`` the endpoint keeps returning the plain
+    list older clients expect.
+    """
+
+    ordering = "team_id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = (self.cursor_query_param, self.page_size_query_param)
+        if not any(param in request.query_params for param in params):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+def _int_query_param(request, name):
+    raw = request.query_params.get(name)
+    if raw in (None, ""):
+        return None
+    value = to_int(raw)
+    if value is None:
+        raise ValidationError({name: "Ожидается целое число"})
+    return value
+
+
+def _date_query_param(request, name):
+    raw = request.query_params.get(name)
+    if raw in (None, ""):
+        raise ValidationError({name: "Обязательный параметр"})
+    try:
+        value = parse_date(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValidationError({name: "Ожидается дата в формате ГГГГ-ММ-ДД"})
+    return value
+
+
+TIMELINE_RESPONSE_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "from": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+        "to": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+        "parent_tasks": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        "subtasks": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+    },
+)
+
+
+class PlannerTimelineView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="List planner tasks in a date window",
+        operation_description=(
+            "Parent tasks and subtasks whose start/end dates overlap [from, to], inclusive. "
+            "Tasks without dates are left out; a task with one date covers that day. "
+            "Without `event_id` the shared and all active event workspaces are searched."
+        ),
+        manual_parameters=[
+            openapi.Parameter("from", openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, required=True),
+            openapi.Parameter("to", openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, required=True),
+            openapi.Parameter("event_id", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("team_id", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("assignee_id", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            IF_NONE_MATCH_PARAMETER,
+        ],
+        responses={200: TIMELINE_RESPONSE_SCHEMA, 304: "Not modified", 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
+    )
+    def get(self, request):
+        start = _date_query_param(request, "from")
+        end = _date_query_param(request, "to")
+        if end < start:
+            raise ValidationError({"to": "Конец периода раньше начала"})
+        team_id = _int_query_param(request, "team_id")
+        assignee_id = _int_query_param(request, "assignee_id")
+
+        event_id = _int_query_param(request, "event_id")
+        if event_id is not None:
+            owner = get_object_or_404(PlannerWorkspaceState, event_id=event_id)
+            workspaces = [owner]
+        else:
+            owner = PlannerWorkspaceAggregate()
+            workspaces = owner.workspaces
+
+        user_id = to_int(request.user.id) if _is_projectant_user(request.user) else None
+        etag = _workspace_etag(owner, user_id)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        parent_tasks = PlannerParentTask.overlapping(start, end).filter(workspace__in=workspaces)
+        subtasks = PlannerSubtask.overlapping(start, end).filter(workspace__in=workspaces)
+        if team_id is not None:
+            parent_tasks = parent_tasks.filter(team_id=team_id)
+            subtasks = subtasks.filter(team_id=team_id)
+        if assignee_id is not None:
+            subtasks = subtasks.filter(assignee_id=assignee_id)
+        if user_id is not None:
+            subtasks = subtasks.filter(assignee_id=user_id)
+
+        data = {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "parent_tasks": list(parent_tasks.order_by("position", "id").values_list("payload", flat=True)),
+            "subtasks": list(subtasks.order_by("position", "id").values_list("payload", flat=True)),
+        }
+        return _with_etag(Response(data), etag)
+
+
+DEADLINES_RESPONSE_SCHEMA = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        "today": openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+        "days": openapi.Schema(type=openapi.TYPE_INTEGER),
+        "overdue": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        "due_soon": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+    },
+)
+
+
+class PlannerDeadlinesView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="List overdue and due-soon subtasks",
+        operation_description=(
+            "Open subtasks (status is not the last board column) whose endDate is before today, "
+            "and those due within `days` days. Without `event_id` the shared and all active event workspaces are searched."
+        ),
+        manual_parameters=[
+            openapi.Parameter("days", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, default=DUE_SOON_DAYS),
+            openapi.Parameter("event_id", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("team_id", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("assignee_id", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: DEADLINES_RESPONSE_SCHEMA, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
+    )
+    def get(self, request):
+        days = _int_query_param(request, "days")
+        days = DUE_SOON_DAYS if days is None else max(1, min(days, DEADLINES_MAX_DAYS))
+        event_id = _int_query_param(request, "event_id")
+        if event_id is not None:
+            workspaces = [get_object_or_404(PlannerWorkspaceState, event_id=event_id)]
+        else:
+            workspaces = PlannerWorkspaceState.active()
+
+        filters = {}
+        team_id = _int_query_param(request, "team_id")
+        if team_id is not None:
+            filters["team_id"] = team_id
+        assignee_id = _int_query_param(request, "assignee_id")
+        if assignee_id is not None:
+            filters["assignee_id"] = assignee_id
+        if _is_projectant_user(request.user):
+            filters["assignee_id"] = to_int(request.user.id)
+
+        today = timezone.localdate()
+        overdue, due_soon = deadlines(workspaces, today, days)
+        return Response(
+            {
+                "today": today.isoformat(),
+                "days": days,
+                "overdue": list(overdue.filter(**filters).values_list("payload", flat=True)),
+                "due_soon": list(due_soon.filter(**filters).values_list("payload", flat=True)),
+            }
+        )
 
 
 @method_decorator(
@@ -157,14 +1000,99 @@ class PlannerStateCompatView(RetrieveUpdateAPIView):
     decorator=swagger_auto_schema(
         tags=[TAG_PLANNER],
         operation_summary="List team planner desks",
-        operation_description="List team planner desks",
-        responses={200: TeamPlannerDeskSerializer(many=True), 401: ERROR_RESPONSE_SCHEMA},
+        operation_description=(
+            "List team planner desks; `summary=1` leaves out parent_tasks and subtasks, "
+            "`cursor` or `page_size` return cursor pages instead of the full list, "
+            "`stream=1` returns every matching desk as one streamed array"
+        ),
+        manual_parameters=[
+            IF_NONE_MATCH_PARAMETER,
+            STREAM_PARAMETER,
+            openapi.Parameter("curator_id", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter("member", openapi.IN_QUERY, description="ID участника команды", type=openapi.TYPE_INTEGER),
+            openapi.Parameter("event", openapi.IN_QUERY, description="ID мероприятия", type=openapi.TYPE_INTEGER),
+            openapi.Parameter("summary", openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+        ],
+        responses={200: TeamPlannerDeskSerializer(many=True), 304: "Not modified", 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA},
     ),
 )
 class TeamPlannerDeskListView(ListAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = TeamPlannerDeskSerializer
-    queryset = TeamPlannerDesk.objects.all()
+    pagination_class = TeamPlannerDeskCursorPagination
+
+    def is_summary(self):
+        return self.request.query_params.get("summary", "").lower() in ("1", "true", "yes")
+
+    def get_serializer_class(self):
+        return TeamPlannerDeskSummarySerializer if self.is_summary() else TeamPlannerDeskSerializer
+
+    def get_queryset(self):
+        queryset = TeamPlannerDesk.objects.all()
+        curator_id = _int_query_param(self.request, "curator_id")
+        if curator_id is not None:
+            queryset = queryset.filter(curator_id=curator_id)
+        member = _int_query_param(self.request, "member")
+        if member is not None:
+            # jsonb containment, served by the GIN index on member_ids.
+            queryset = queryset.filter(member_ids__contains=[member])
+        event_id = _int_query_param(self.request, "event")
+        if event_id is not None:
+            queryset = queryset.filter(
+                team_id__in=PlannerTeam.objects.filter(workspace__event_id=event_id).values("team_id")
+            )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = _desk_list_etag(queryset)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        if _wants_stream(request):
+            body = stream_desks(queryset, self.get_serializer_class(), with_items=not self.is_summary())
+            return _with_etag(_streaming_json(request, body), etag)
+
+        page = self.paginate_queryset(queryset)
+        desks = list(queryset.order_by("team_id")) if page is None else page
+        if not self.is_summary():
+            TeamPlannerDesk.prefetch_items(desks)
+        data = self.get_serializer(desks, many=True).data
+        response = Response(data) if page is None else self.get_paginated_response(data)
+        return _with_etag(response, etag)
+
+
+@method_decorator(
+    name="get",
+    decorator=swagger_auto_schema(
+        tags=[TAG_PLANNER],
+        operation_summary="List my team planner desks",
+        operation_description="Desks of teams the current user is a member or curator of",
+        manual_parameters=[IF_NONE_MATCH_PARAMETER],
+        responses={200: TeamPlannerDeskSerializer(many=True), 304: "Not modified", 401: ERROR_RESPONSE_SCHEMA},
+    ),
+)
+class MyTeamPlannerDeskListView(ListAPIView):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = TeamPlannerDeskSerializer
+
+    def get_queryset(self):
+        user_id = to_int(self.request.user.id)
+        return TeamPlannerDesk.objects.filter(
+            Q(team_id__in=TeamMember.objects.filter(user_id=user_id).values("desk_id")) | Q(curator_id=user_id)
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        etag = _desk_list_etag(queryset)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        desks = list(queryset)
+        TeamPlannerDesk.prefetch_items(desks)
+        return _with_etag(Response(self.get_serializer(desks, many=True).data), etag)
 
 
 @method_decorator(
@@ -173,7 +1101,8 @@ class TeamPlannerDeskListView(ListAPIView):
         tags=[TAG_PLANNER],
         operation_summary="Get team planner desk",
         operation_description="Get team planner desk",
-        responses={200: TeamPlannerDeskSerializer, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
+        manual_parameters=[IF_NONE_MATCH_PARAMETER],
+        responses={200: TeamPlannerDeskSerializer, 304: "Not modified", 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
     ),
 )
 @method_decorator(
@@ -183,7 +1112,8 @@ class TeamPlannerDeskListView(ListAPIView):
         operation_summary="Replace team planner desk",
         operation_description="Replace team planner desk",
         request_body=TeamPlannerDeskSerializer,
-        responses={200: TeamPlannerDeskSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: TeamPlannerDeskSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
     ),
 )
 @method_decorator(
@@ -193,15 +1123,116 @@ class TeamPlannerDeskListView(ListAPIView):
         operation_summary="Update team planner desk",
         operation_description="Update team planner desk",
         request_body=TeamPlannerDeskSerializer,
-        responses={200: TeamPlannerDeskSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA},
+        manual_parameters=[IF_MATCH_PARAMETER],
+        responses={200: TeamPlannerDeskSerializer, 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA, 404: ERROR_RESPONSE_SCHEMA, 409: VERSION_CONFLICT_SCHEMA},
     ),
 )
-class TeamPlannerDeskDetailView(RetrieveUpdateAPIView):
+class TeamPlannerDeskDetailView(ConditionalUpdateMixin, RetrieveUpdateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = TeamPlannerDeskSerializer
     lookup_url_kwarg = "team_id"
 
     def get_object(self):
         team_id = self.kwargs.get(self.lookup_url_kwarg)
-        desk, _ = TeamPlannerDesk.objects.get_or_create(team_id=team_id)
-        return desk
+        try:
+            return TeamPlannerDesk.objects.get(team_id=team_id)
+        except TeamPlannerDesk.DoesNotExist:
+            # No workspace holds the team yet, so it would be added to the shared one.
+            desk, _ = TeamPlannerDesk.objects.get_or_create(
+                team_id=team_id, defaults={"columns": PlannerWorkspaceState.current().columns}
+            )
+            return desk
+
+    def retrieve(self, request, *args, **kwargs):
+        desk = self.get_object()
+        etag = quote_etag(str(desk.version))
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        key = versioned_key("desk", desk.version, desk)
+        return _with_etag(_rendered_response(request, key, lambda: self.get_serializer(desk).data), etag)
+
+    def perform_update(self, serializer):
+        desk = serializer.instance
+        desk.expected_version = _expected_version(self.request)
+        desk.changed_by = self.request.user
+        # Workspace writes lock the workspace and then its desks; take the locks
+        # in the same order so the two paths cannot deadlock.
+        desk.workspace.lock_for_update()
+        extra = {}
+        if "subtasks" in serializer.validated_data and _is_projectant_user(self.request.user):
+            # Desk rows are the workspace rows, so apply the same merge as the
+            # workspace PUT: re-read under the lock and keep everyone else's subtasks.
+            desk.refresh_from_db()
+            extra["subtasks"] = merge_assignee_subtasks(
+                desk.subtasks, serializer.validated_data["subtasks"], to_int(self.request.user.id)
+            )
+        desk = serializer.save(**extra)
+        publish_on_commit(DESK_CHANGED, [desk.team_id], event_id=desk.workspace.event_id, version=desk.version)
+
+
+def _stream_user(request):
+    try:
+        result = CookieJWTAuthentication().authenticate(request)
+    except APIException:
+        return None
+    return result[0] if result else None
+
+
+def _stream_team_ids(user):
+    """Teams whose changes a projectant may see, or ``None`` for everything."""
+
+    if not _is_projectant_user(user):
+        return None
+    user_id = to_int(user.id)
+    team_ids = set(TeamMember.objects.filter(user_id=user_id).values_list("desk_id", flat=True))
+    team_ids.update(
+        PlannerSubtask.objects.filter(assignee_id=user_id, team_id__isnull=False).values_list("team_id", flat=True)
+    )
+    return team_ids
+
+
+async def planner_change_stream(request):
+    """Server-sent events with planner changes, served only under ASGI.
+
+    Projectants receive changes of their own teams plus workspace-wide ones
+    (events without team ids); curators and admins receive everything. A
+    projectant's teams are read once per stream and again on desk events,
+    which carry membership changes, or once they are older than
+    ``STREAM_TEAMS_TTL_SECONDS``, so joining or leaving a team reaches open
+    streams.
+    """
+
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Поток изменений доступен только через ASGI"}, status=501)
+    user = await sync_to_async(_stream_user)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({"detail": "Учетные данные не были предоставлены."}, status=401)
+    team_ids = await sync_to_async(_stream_team_ids)(user)
+
+    async def events():
+        nonlocal team_ids
+        read_at = time.monotonic()
+        subscription = planner_changes.subscribe()
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if team_ids is not None and event.get("team_ids"):
+                    if event["type"] == DESK_CHANGED or time.monotonic() - read_at > STREAM_TEAMS_TTL_SECONDS:
+                        team_ids = await sync_to_async(_stream_team_ids)(user)
+                        read_at = time.monotonic()
+                    if team_ids.isdisjoint(event["team_ids"]):
+                        continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            planner_changes.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,261 @@
+"""One planner state assembled from the shared and per-event workspaces.
+
+Every event keeps its teams and tasks in its own ``PlannerWorkspaceState``
+row, so writes to different events never touch the same row. The legacy
+``/api/users/planner/`` endpoint still sees a single state: reads concatenate
+the shared workspace with every event workspace that is not archived, and
+writes route each team to the workspace of its ``eventId`` and each task to
+the workspace of its team. Only workspaces whose slice changed are saved.
+"""
+
+from django.db import transaction
+from django.db.models import Sum
+
+from planner.models import (
+    PlannerParentTask,
+    PlannerSubtask,
+    PlannerTeam,
+    PlannerVersionConflict,
+    PlannerWorkspaceState,
+)
+from planner.operations import OperationResult, PlannerOperationError, WorkspaceOperations
+from planner.utils import event_id_from_item, item_id, team_id_from_item, to_int
+from users.models import Event
+
+COLLECTIONS = {
+    "teams": PlannerTeam,
+    "parent_tasks": PlannerParentTask,
+    "subtasks": PlannerSubtask,
+}
+SHARED_FIELDS = ("enrollment_closed", "participants", "columns")
+
+
+def total_version(workspaces):
+    """Sum of the versions of ``workspaces``; grows with every write to any of them."""
+    return (
+        PlannerWorkspaceState.objects.filter(pk__in=[workspace.pk for workspace in workspaces]).aggregate(
+            total=Sum("version")
+        )["total"]
+        or 0
+    )
+
+
+class PlannerWorkspaceAggregate:
+    expected_version = None
+    changed_by = None
+
+    def __init__(self, workspaces=None):
+        self.workspaces = workspaces or PlannerWorkspaceState.active()
+        self.shared = self.workspaces[0]
+        self._pending = {}
+        self._version = None
+        self._touched_team_ids = set()
+
+    def __getattr__(self, name):
+        if name in SHARED_FIELDS:
+            return getattr(self.shared, name)
+        if name in COLLECTIONS:
+            self._load(COLLECTIONS[name])
+            return [item for workspace in self.workspaces for item in getattr(workspace, name)]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in SHARED_FIELDS or name in COLLECTIONS:
+            self._pending[name] = value
+            if name in SHARED_FIELDS:
+                setattr(self.shared, name, value)
+            return
+        super().__setattr__(name, value)
+
+    @property
+    def version(self):
+        if self._version is None:
+            self._version = total_version(self.workspaces)
+        return self._version
+
+    def lock_for_update(self):
+        locked = PlannerWorkspaceState.objects.select_for_update().in_bulk([workspace.pk for workspace in self.workspaces])
+        for workspace in self.workspaces:
+            workspace.copy_from(locked[workspace.pk])
+
+    def _lock(self):
+        list(
+            PlannerWorkspaceState.objects.select_for_update()
+            .filter(pk__in=[workspace.pk for workspace in self.workspaces])
+            .values_list("pk", flat=True)
+        )
+
+    def limit_items(self, model, **filters):
+        PlannerWorkspaceState.prefetch_items(self.workspaces, model, **filters)
+
+    def pop_touched_team_ids(self):
+        touched, self._touched_team_ids = self._touched_team_ids, set()
+        return touched
+
+    def _load(self, model):
+        if any(model not in workspace.__dict__.get("_planner_items", {}) for workspace in self.workspaces):
+            PlannerWorkspaceState.prefetch_items(self.workspaces, model)
+
+    def save(self, **kwargs):
+        pending, self._pending = self._pending, {}
+        with transaction.atomic(savepoint=False):
+            self._lock()
+            if self.expected_version is not None:
+                current = total_version(self.workspaces)
+                if current != self.expected_version:
+                    raise PlannerVersionConflict(current)
+            self.expected_version = None
+
+            if "teams" in pending:
+                # Moving a team between workspaces moves its tasks as well.
+                for name in COLLECTIONS:
+                    pending.setdefault(name, getattr(self, name))
+                team_workspaces = self._route_teams(pending["teams"])
+            else:
+                self._load(PlannerTeam)
+                team_workspaces = {
+                    item_id(team): workspace for workspace in self.workspaces for team in workspace.teams
+                }
+
+            slices = {workspace.pk: {} for workspace in self.workspaces}
+            for name in COLLECTIONS:
+                if name not in pending:
+                    continue
+                for workspace in self.workspaces:
+                    slices[workspace.pk][name] = []
+                for item in pending[name]:
+                    key = item_id(item) if name == "teams" else team_id_from_item(item)
+                    workspace = team_workspaces.get(key, self.shared)
+                    slices[workspace.pk][name].append(item)
+
+            for workspace in self.workspaces:
+                changed = workspace is self.shared and any(name in pending for name in SHARED_FIELDS)
+                if "columns" in pending and workspace.columns != self.shared.columns:
+                    workspace.columns = self.shared.columns
+                    changed = True
+                for name, items in slices[workspace.pk].items():
+                    self._load(COLLECTIONS[name])
+                    if getattr(workspace, name) != items:
+                        setattr(workspace, name, items)
+                        changed = True
+                if changed:
+                    workspace.changed_by = self.changed_by
+                    workspace.save()
+                    self._touched_team_ids |= workspace.pop_touched_team_ids()
+        self._version = None
+
+    def _begin_write(self):
+        self.lock_for_update()
+        if self.expected_version is not None:
+            current = total_version(self.workspaces)
+            if current != self.expected_version:
+                raise PlannerVersionConflict(current)
+        self.expected_version = None
+
+    def _finish_write(self, result, partials):
+        for partial in partials:
+            result.applied += partial.applied
+            result.team_ids |= partial.team_ids
+        self._version = None
+        result.version = self.version
+        return result
+
+    def _operations(self, workspace, assignee_id):
+        workspace.changed_by = self.changed_by
+        return WorkspaceOperations(workspace, assignee_id=assignee_id)
+
+    def change_columns(self, columns, renames, fallback=None, assignee_id=None):
+        """Change the shared columns in every workspace and move the affected subtasks."""
+        with transaction.atomic():
+            self._begin_write()
+            partials = [
+                self._operations(workspace, assignee_id).change_columns(columns, renames, fallback)
+                for workspace in self.workspaces
+            ]
+        return self._finish_write(OperationResult(), partials)
+
+    def apply_operations(self, operations, assignee_id=None):
+        """Apply parsed operations, each in the workspace that owns the addressed item.
+
+        Column changes go to every workspace and the other shared fields to
+        the shared one. New items follow their team the way ``save()`` routes
+        them; existing items stay in their workspace.
+        """
+        with transaction.atomic():
+            self._begin_write()
+            routed = {workspace.pk: [] for workspace in self.workspaces}
+            for operation in operations:
+                for workspace in self._route_operation(operation):
+                    routed.setdefault(workspace.pk, []).append(operation)
+            partials = [
+                self._operations(workspace, assignee_id).apply(routed[workspace.pk])
+                for workspace in self.workspaces
+                if routed.get(workspace.pk)
+            ]
+        result = self._finish_write(OperationResult(), partials)
+        result.applied = len(operations)
+        return result
+
+    def update_subtasks(self, ids, changes, assignee_id=None):
+        """Bulk-update subtasks of every workspace; return the result and the new payloads."""
+        with transaction.atomic():
+            self._begin_write()
+            owners = self._owners(PlannerSubtask, ids)
+            missing = [task_id for task_id in ids if task_id not in owners]
+            if missing:
+                raise PlannerOperationError(f"subtasks items {sorted(missing)} do not exist")
+            items, partials = [], []
+            for workspace in self.workspaces:
+                workspace_ids = [task_id for task_id in ids if owners[task_id] is workspace]
+                if workspace_ids:
+                    operations = self._operations(workspace, assignee_id)
+                    items += operations.update_subtasks(workspace_ids, changes)
+                    partials.append(operations.result)
+        return self._finish_write(OperationResult(), partials), items
+
+    def _owners(self, model, keys):
+        by_pk = {workspace.pk: workspace for workspace in self.workspaces}
+        rows = (
+            model.objects.filter(workspace__in=self.workspaces, **{f"{model.key_field}__in": keys})
+            .order_by("-workspace_id")
+            .values_list(model.key_field, "workspace_id")
+        )
+        # A key present in several workspaces resolves to the lowest workspace id, as desks do.
+        return {key: by_pk[workspace_id] for key, workspace_id in rows}
+
+    def _route_operation(self, operation):
+        name, segments, value = operation["segments"][0], operation["segments"], operation["value"]
+        if name == "columns":
+            return self.workspaces
+        if name not in COLLECTIONS:
+            return [self.shared]
+        model = COLLECTIONS[name]
+        key = item_id(value) if segments[1] == "-" else to_int(segments[1])
+        owner = self._owners(model, [key]).get(key) if key is not None else None
+        if owner is not None or operation["op"] != "add" or not isinstance(value, dict):
+            return [owner or self.shared]
+        if model is PlannerTeam:
+            return [self._route_teams([value]).get(key, self.shared)]
+        team_id = team_id_from_item(value)
+        return [self._owners(PlannerTeam, [team_id]).get(team_id, self.shared)]
+
+    def _route_teams(self, teams):
+        """Map team ids to workspaces, creating workspaces for new events."""
+        by_event = {workspace.event_id: workspace for workspace in self.workspaces if workspace.event_id}
+        wanted = {event_id_from_item(team) for team in teams} - set(by_event) - {None}
+        if wanted:
+            archived = set(
+                PlannerWorkspaceState.objects.filter(event_id__in=wanted, archived=True).values_list("event_id", flat=True)
+            )
+            # Teams of archived or unknown events stay in the shared workspace.
+            for event_id in Event.objects.filter(pk__in=wanted - archived).values_list("pk", flat=True):
+                workspace = PlannerWorkspaceState.for_event(event_id)
+                by_event[event_id] = workspace
+                self.workspaces.append(workspace)
+
+        routes = {}
+        for team in teams:
+            workspace = by_event.get(event_id_from_item(team))
+            if workspace is not None and item_id(team) is not None:
+                routes[item_id(team)] = workspace
+        return routes
@@ -1,5 +1,7 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .tokens import ClaimsUser, claims_are_current, verified_tokens
 
 class CookieJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
@@ -12,4 +14,15 @@ class CookieJWTAuthentication(JWTAuthentication):
                 return None
             return self.get_user(validated_token), validated_token
 
-        return super().authenticate(request)
\ No newline at end of file
+        return super().authenticate(request)
+
+    def get_validated_token(self, raw_token):
+        validate = super().get_validated_token
+        return verified_tokens.get_or_validate(raw_token, lambda: validate(raw_token))
+
+    def get_user(self, validated_token):
+        if not claims_are_current(validated_token):
+            return super().get_user(validated_token)
+        if not validated_token["is_active"]:
+            raise AuthenticationFailed("Пользователь неактивен", code="user_inactive")
+        return ClaimsUser(validated_token, lambda: super(CookieJWTAuthentication, self).get_user(validated_token))
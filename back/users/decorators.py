@@ -4,7 +4,7 @@ from functools import wraps
 
 from rest_framework.exceptions import NotAuthenticated, PermissionDenied
 
-from .models import CRMRole
+from .roles import has_role
 
 
 def _extract_request(*args):
@@ -49,8 +49,7 @@ def role_required(*role_types: str):
             if not role_types:
                 raise PermissionDenied("No role types provided for role check")
 
-            has_role = CRMRole.objects.filter(user=user, role_type__in=role_types).exists()
-            if not has_role:
+            if not has_role(user, *role_types):
                 raise PermissionDenied("Недостаточно прав для доступа")
 
             return view_func(*args, **kwargs)
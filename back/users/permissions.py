@@ -6,7 +6,8 @@ endpoints can declare the required role or capability via DRF permissions.
 
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
-from .models import CRMRole, ROLE_ADMIN, ROLE_CURATOR, ROLE_PROJECTANT
+from .models import ROLE_ADMIN, ROLE_CURATOR, ROLE_PROJECTANT
+from .roles import has_role
 
 
 class RolePermission(BasePermission):
@@ -27,7 +28,7 @@ class RolePermission(BasePermission):
         if not allowed_roles:
             return False
 
-        return CRMRole.objects.filter(user=user, role_type__in=allowed_roles).exists()
+        return has_role(user, *allowed_roles)
 
 
 class AdminOnlyPermission(RolePermission):
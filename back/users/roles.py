@@ -0,0 +1,80 @@
+"""CRM role lookups shared by permissions, decorators and serializers.
+
+The role set of a user is kept on the user instance for the rest of the
+request and in the default cache between requests. ``CRMRole`` signals drop
+the cached set whenever a role is saved or deleted, so in the steady state an
+authenticated request asks the database for no roles at all. Bulk
+``update()`` calls send no signals and must call ``forget_roles_of`` too.
+
+Dropping the set only reaches other worker processes when the default cache
+is shared between them (see ``CACHES`` in the settings). With the per-process
+``LocMemCache`` they keep the old set until ``ROLE_CACHE_TTL_SECONDS`` pass,
+so the timeout is kept short.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import CRMRole, ROLE_ADMIN, ROLE_CURATOR
+
+ORGANIZER_ROLES = (ROLE_CURATOR, ROLE_ADMIN)
+ROLE_CACHE_TTL_SECONDS = 60
+
+_ROLES_ATTR = "_crm_role_types"
+
+
+def _cache_key(user_id):
+    return f"users:roles:{user_id}"
+
+
+def user_roles(user):
+    """Return the frozenset of CRM role types held by ``user``."""
+
+    if not user or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, _ROLES_ATTR, None)
+    if roles is None:
+        key = _cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = frozenset(CRMRole.objects.filter(user_id=user.pk).values_list("role_type", flat=True))
+            cache.set(key, roles, ROLE_CACHE_TTL_SECONDS)
+        setattr(user, _ROLES_ATTR, roles)
+    return roles
+
+
+def forget_roles_of(user_id):
+    """Drop the cached role set of ``user_id`` now and once the transaction commits.
+
+    The second delete covers a request that read the old roles before the
+    commit and cached them after this change was signalled.
+    """
+
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def role_exists(*role_types):
+    """``Exists`` expression for users holding one of ``role_types``."""
+
+    return Exists(CRMRole.objects.filter(user_id=OuterRef("pk"), role_type__in=role_types))
+
+
+def with_organizer_flag(users):
+    """Annotate a user queryset with ``has_organizer_role`` read by ``UserSerializer``."""
+
+    return users.annotate(has_organizer_role=role_exists(*ORGANIZER_ROLES))
+
+
+def has_role(user, *role_types):
+    """Tell whether ``user`` holds at least one of ``role_types``."""
+
+    return not user_roles(user).isdisjoint(role_types)
+
+
+def is_organizer(user):
+    """Curators, admins and superusers manage the CRM; everyone else is a projectant."""
+
+    return bool(getattr(user, "is_superuser", False)) or has_role(user, *ORGANIZER_ROLES)
@@ -7,7 +7,7 @@ from django.urls import reverse
 from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework import serializers
-from .models import CRMRole, ROLE_PROJECTANT, ROLE_CURATOR, ROLE_ADMIN
+from .roles import ORGANIZER_ROLES, has_role
 from rest_framework.serializers import ModelSerializer, Serializer
 
 from .models import (
@@ -29,14 +29,10 @@ class UserSerializer(ModelSerializer):
         fields = ("id", "email", "username", "first_name", "last_name", "role")
 
     def get_role(self, obj):
-        role_obj = CRMRole.objects.filter(user=obj).first()
-        if not role_obj:
-            return "student"
-        if role_obj.role_type == ROLE_PROJECTANT:
-            return "student"
-        if role_obj.role_type in (ROLE_CURATOR, ROLE_ADMIN):
-            return "organizer"
-        return "student"
+        organizer = getattr(obj, "has_organizer_role", None)
+        if organizer is None:
+            organizer = has_role(obj, *ORGANIZER_ROLES)
+        return "organizer" if organizer else "student"
 
 
 class RegisterUserSerializer(ModelSerializer):
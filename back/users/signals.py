@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from .models import CRMRole, Profile, ROLE_PROJECTANT
+from .roles import forget_roles_of
+from .tokens import mark_claims_stale
 
 
 @receiver(post_save, sender=get_user_model())
@@ -31,3 +33,20 @@ def create_user_profile(sender, instance, created, **kwargs):
             content_type=ContentType.objects.get_for_model(Profile),
             object_id=profile.pk,
         )
+        forget_roles_of(instance.pk)
+
+
+@receiver(post_save, sender=CRMRole)
+@receiver(post_delete, sender=CRMRole)
+def forget_cached_roles(sender, instance, **kwargs):
+    forget_roles_of(instance.user_id)
+    mark_claims_stale(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def mark_user_claims_stale(sender, instance, created=False, update_fields=None, **kwargs):
+    # Logging in only stamps last_login, which no token claim depends on.
+    if created or update_fields == frozenset({"last_login"}):
+        return
+    mark_claims_stale(instance.pk)
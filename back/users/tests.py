@@ -5,13 +5,18 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.exceptions import NotAuthenticated, PermissionDenied
 from rest_framework.test import APIClient, APIRequestFactory
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
 from users.models import (
     Application,
@@ -23,14 +28,19 @@ from users.models import (
     ROLE_CURATOR,
     ROLE_PROJECTANT,
 )
+from users.authentication import CookieJWTAuthentication
 from users.decorators import role_required
+from users.permissions import CuratorOrAdminPermission
+from users.roles import is_organizer, user_roles
 from users.serializers import (
     EmailConfirmationSerializer,
     LoginUserSerializer,
     PasswordResetConfirmSerializer,
     PasswordResetRequestSerializer,
     RegisterUserSerializer,
+    UserSerializer,
 )
+from users.tokens import ClaimsRefreshToken, ClaimsUser, VerifiedTokenCache, verified_tokens
 
 
 @override_settings(
@@ -319,6 +329,33 @@ class ViewTests(TestCase):
         direction = Direction.objects.get(pk=response.data["id"])
         self.assertEqual(direction.event, self.event)
 
+    def test_user_list_roles_take_one_query(self):
+        self.authenticate(self.superuser)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries.captured_queries), 1)
+        roles = {row["email"]: row["role"] for row in response.data}
+        self.assertEqual(roles[self.curator.email], "organizer")
+        self.assertEqual(roles[self.projectant.email], "student")
+
+    def test_user_list_filters_by_role_and_pages_on_request(self):
+        self.authenticate(self.projectant)
+
+        organizers = self.client.get(reverse("user-list"), {"role": "organizer"})
+        self.assertEqual([row["id"] for row in organizers.data], [self.curator.id])
+        curators = self.client.get(reverse("user-list"), {"role": ROLE_CURATOR})
+        self.assertEqual([row["id"] for row in curators.data], [self.curator.id])
+        self.assertEqual(self.client.get(reverse("user-list"), {"role": "boss"}).status_code, 400)
+
+        first = self.client.get(reverse("user-list"), {"role": "student", "page_size": 1})
+        self.assertEqual([row["id"] for row in first.data["results"]], [self.projectant.id])
+        second = self.client.get(first.data["next"])
+        self.assertEqual([row["id"] for row in second.data["results"]], [self.superuser.id])
+        self.assertIsNone(second.data["next"])
+
     def test_application_creation_validations(self):
         self.authenticate(self.projectant)
         direction = Direction.objects.create(
@@ -434,3 +471,199 @@ class RoleDecoratorTests(TestCase):
 
         with self.assertRaises(NotAuthenticated):
             self.decorated_view(request)
+
+    def test_role_checks_share_one_query_per_request(self):
+        cache.clear()
+        request = self.factory.get("/")
+        request.user = self.user_model.objects.get(pk=self.admin_user.pk)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(CuratorOrAdminPermission().has_permission(request, None))
+            self.assertEqual(self.decorated_view(request), "ok")
+            self.assertEqual(UserSerializer(request.user).data["role"], "organizer")
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user_model = get_user_model()
+        self.user = self.user_model.objects.create_user(
+            email="cached@example.com",
+            username="cached@example.com",
+            password="StrongPass123",
+            is_active=True,
+        )
+        self.role_kwargs = {"content_type": ContentType.objects.get_for_model(Event), "object_id": 0}
+
+    def fresh_roles(self):
+        return user_roles(self.user_model.objects.get(pk=self.user.pk))
+
+    def test_roles_are_cached_between_requests(self):
+        self.assertEqual(self.fresh_roles(), {ROLE_PROJECTANT})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user_roles(self.user_model(pk=self.user.pk)), {ROLE_PROJECTANT})
+
+    def test_new_role_is_visible_to_next_request(self):
+        self.assertEqual(self.fresh_roles(), {ROLE_PROJECTANT})
+
+        CRMRole.objects.create(user=self.user, role_type=ROLE_CURATOR, **self.role_kwargs)
+
+        self.assertEqual(self.fresh_roles(), {ROLE_PROJECTANT, ROLE_CURATOR})
+
+    def test_changed_and_deleted_roles_are_visible_to_next_request(self):
+        role = CRMRole.objects.create(user=self.user, role_type=ROLE_CURATOR, **self.role_kwargs)
+        self.assertEqual(self.fresh_roles(), {ROLE_PROJECTANT, ROLE_CURATOR})
+
+        role.role_type = ROLE_ADMIN
+        role.save()
+        self.assertEqual(self.fresh_roles(), {ROLE_PROJECTANT, ROLE_ADMIN})
+
+        role.delete()
+        self.assertEqual(self.fresh_roles(), {ROLE_PROJECTANT})
+
+    def test_deleted_user_roles_are_forgotten(self):
+        self.assertEqual(self.fresh_roles(), {ROLE_PROJECTANT})
+        user_id = self.user.pk
+
+        self.user.delete()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user_roles(self.user_model(pk=user_id)), frozenset())
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], JWT_CLAIMS_USER=True)
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.factory = APIRequestFactory()
+        self.password = "StrongPass123"
+        self.user = get_user_model().objects.create_user(
+            email="claims@example.com",
+            username="claims@example.com",
+            password=self.password,
+            is_active=True,
+        )
+        self.role_kwargs = {"content_type": ContentType.objects.get_for_model(Event), "object_id": 0}
+
+    def access_token(self):
+        return str(ClaimsRefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self, token):
+        request = self.factory.get("/")
+        request.COOKIES["access_token"] = token
+        return CookieJWTAuthentication().authenticate(request)[0]
+
+    def test_read_needs_no_user_or_role_query(self):
+        self.client.cookies["access_token"] = self.access_token()
+        cache.delete(f"users:roles:{self.user.pk}")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("event-list-create"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tables = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn('"auth_user"', tables)
+        self.assertNotIn('"CRM_ROLE"', tables)
+
+    def test_user_row_is_loaded_on_first_use(self):
+        user = self.authenticate(self.access_token())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertFalse(is_organizer(user))
+        self.assertIsInstance(user, ClaimsUser)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+        with self.assertNumQueries(1):
+            self.assertEqual(Profile.objects.get(user=user).pk, self.user.crm_profile.pk)
+
+    def test_token_issued_before_role_change_falls_back_to_database(self):
+        token = self.access_token()
+        CRMRole.objects.create(user=self.user, role_type=ROLE_CURATOR, **self.role_kwargs)
+
+        user = self.authenticate(token)
+
+        self.assertIsInstance(user, get_user_model())
+        self.assertTrue(is_organizer(user))
+
+    def test_lost_claims_generation_falls_back_to_database(self):
+        token = self.access_token()
+        cache.clear()
+
+        user = self.authenticate(token)
+
+        self.assertIsInstance(user, get_user_model())
+
+    def test_tokens_of_one_generation_stay_current_together(self):
+        first, second = self.access_token(), self.access_token()
+
+        self.assertIsInstance(self.authenticate(first), ClaimsUser)
+        self.assertIsInstance(self.authenticate(second), ClaimsUser)
+
+    def test_token_issued_before_deactivation_is_rejected(self):
+        token = self.access_token()
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_refresh_issues_current_claims(self):
+        self.client.post(reverse("user-login"), {"email": self.user.email, "password": self.password}, format="json")
+        CRMRole.objects.create(user=self.user, role_type=ROLE_CURATOR, **self.role_kwargs)
+
+        response = self.client.post(
+            reverse("token-refresh"), HTTP_X_CSRFTOKEN=self.client.cookies["csrftoken"].value
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        claims = AccessToken(response.data["access"])
+        self.assertEqual(claims["roles"], sorted([ROLE_PROJECTANT, ROLE_CURATOR]))
+        self.assertTrue(claims["is_active"])
+
+
+class VerifiedTokenCacheTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="lru@example.com", username="lru@example.com", password="StrongPass123", is_active=True
+        )
+        self.factory = APIRequestFactory()
+
+    def test_cookie_token_is_verified_once(self):
+        verified_tokens.clear()
+        token = str(ClaimsRefreshToken.for_user(self.user).access_token)
+        request = self.factory.get("/")
+        request.COOKIES["access_token"] = token
+
+        original = JWTAuthentication.get_validated_token
+        with patch.object(JWTAuthentication, "get_validated_token", autospec=True, side_effect=original) as validate:
+            first = CookieJWTAuthentication().authenticate(request)[1]
+            second = CookieJWTAuthentication().authenticate(request)[1]
+
+        self.assertEqual(validate.call_count, 1)
+        self.assertIs(first, second)
+        self.assertEqual(verified_tokens.stats()["hit_rate"], 0.5)
+
+    def test_expired_entries_are_validated_again(self):
+        tokens = VerifiedTokenCache(max_size=4)
+        validate = lambda: {"exp": 0}
+
+        tokens.get_or_validate("expired", validate)
+        tokens.get_or_validate("expired", validate)
+
+        self.assertEqual(tokens.stats()["misses"], 2)
+        self.assertEqual(tokens.stats()["hits"], 0)
+
+    def test_least_recently_used_token_is_evicted(self):
+        tokens = VerifiedTokenCache(max_size=2)
+        fresh = {"exp": timezone.now().timestamp() + 60}
+
+        for raw in ("a", "b", "a", "c", "a", "b"):
+            tokens.get_or_validate(raw, lambda: fresh)
+
+        self.assertEqual(
+            tokens.stats(),
+            {"size": 2, "max_size": 2, "hits": 2, "misses": 4, "evictions": 2, "hit_rate": 0.333},
+        )
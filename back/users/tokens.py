@@ -0,0 +1,209 @@
+"""JWT claims that let authentication skip the ``auth_user`` lookup.
+
+Access tokens carry the user's ``is_superuser``, ``is_active`` and CRM role
+set. While those claims are current, requests get a ``ClaimsUser``: the id,
+flags and roles come from the token and the database row is loaded only when
+a view touches any other attribute.
+
+Tokens also carry the user's claims generation, a random stamp kept in the
+default cache. Claims are trusted only while the cache still holds the same
+generation: a role or user row change deletes it, and so does eviction, so a
+missing entry always means the regular database lookup. Refreshing starts a
+new generation and re-reads the user, so the next access token carries the
+new claims. The cache must be shared by all workers, which is why
+``JWT_CLAIMS_USER`` is off by default with ``LocMemCache``.
+
+Verified access tokens are also kept in a small per-process LRU until they
+expire, so a client repeating the same cookie skips decoding and the
+signature check.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .roles import _ROLES_ATTR, user_roles
+
+ROLES_CLAIM = "roles"
+GENERATION_CLAIM = "claims_gen"
+CLAIMS = ("is_superuser", "is_active", ROLES_CLAIM, GENERATION_CLAIM)
+
+
+def _generation_key(user_id):
+    return f"users:claims:{user_id}"
+
+
+def claims_generation(user_id):
+    """Return the current claims generation of ``user_id``, starting one if needed.
+
+    Take it before reading the claims: a change committed in between ends the
+    generation instead of being missed. The entry is kept for another access
+    token lifetime, which covers every token issued under it so far.
+    """
+
+    key = _generation_key(user_id)
+    timeout = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.add(key, uuid.uuid4().hex, timeout)
+    cache.touch(key, timeout)
+    return cache.get(key)
+
+
+def mark_claims_stale(user_id):
+    """End the claims generation of ``user_id`` now and once the transaction commits.
+
+    The second delete covers a token issued with the old claims before the
+    commit.
+    """
+
+    key = _generation_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def claims_are_current(token):
+    if not settings.JWT_CLAIMS_USER or any(claim not in token for claim in CLAIMS):
+        return False
+    generation = token[GENERATION_CLAIM]
+    return generation is not None and cache.get(_generation_key(token[api_settings.USER_ID_CLAIM])) == generation
+
+
+def set_user_claims(token, user, generation):
+    token[GENERATION_CLAIM] = generation
+    token["is_superuser"] = user.is_superuser
+    token["is_active"] = user.is_active
+    token[ROLES_CLAIM] = sorted(user_roles(user))
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        generation = claims_generation(user.pk)
+        set_user_claims(token, get_user_model().objects.get(pk=user.pk), generation)
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh tokens with claims re-read from the database."""
+
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user_id = refresh.get(api_settings.USER_ID_CLAIM)
+        generation = claims_generation(user_id)
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            raise InvalidToken("Пользователь не найден или неактивен")
+        set_user_claims(refresh, user, generation)
+        return super().validate({**attrs, "refresh": str(refresh)})
+
+
+class ClaimsUser(SimpleLazyObject):
+    """A user backed by token claims that loads the database row on demand."""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token, load):
+        super().__init__(load)
+        self.__dict__["_claims"] = {
+            "id": token[api_settings.USER_ID_CLAIM],
+            "is_superuser": token["is_superuser"],
+            "is_active": token["is_active"],
+        }
+        self.__dict__[_ROLES_ATTR] = frozenset(token[ROLES_CLAIM])
+
+    def _claim(name):
+        return property(lambda self: self.__dict__["_claims"][name])
+
+    id = pk = _claim("id")
+    is_superuser = _claim("is_superuser")
+    is_active = _claim("is_active")
+    del _claim
+
+    def __setattr__(self, name, value):
+        if name == _ROLES_ATTR:
+            self.__dict__[name] = value
+        else:
+            super().__setattr__(name, value)
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f"<ClaimsUser {self.id}>"
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of validated tokens keyed by the hash of the raw token."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _key(raw_token):
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        return hashlib.sha256(raw_token).digest()
+
+    def get_or_validate(self, raw_token, validate):
+        """Return the cached token for ``raw_token`` or the result of ``validate()``."""
+
+        if self.max_size <= 0:
+            return validate()
+        key = self._key(raw_token)
+        now = time.time()
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[1] > now:
+                self._tokens.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._tokens[key]
+            self.misses += 1
+
+        token = validate()
+        with self._lock:
+            self._tokens[key] = (token, token["exp"])
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+                self.evictions += 1
+        return token
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._tokens),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+verified_tokens = VerifiedTokenCache(settings.JWT_VERIFIED_CACHE_SIZE)
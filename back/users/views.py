@@ -15,6 +15,8 @@ from rest_framework.generics import (
     RetrieveUpdateAPIView,
     RetrieveUpdateDestroyAPIView,
 )
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -43,12 +45,15 @@ from users.serializers import (
     SpecializationSerializer,
     StatusSerializer,
 )
+from users.roles import role_exists, with_organizer_flag
+from users.tokens import ClaimsRefreshToken, ClaimsTokenRefreshSerializer
 from users.models import (
     Application,
     Direction,
     Event,
     Profile,
     Project,
+    ROLE_CHOICES,
     Specialization,
     Status,
 )
@@ -117,19 +122,65 @@ class UserRegistrationView(CreateAPIView):
     permission_classes = (AllowAny,)
     serializer_class = RegisterUserSerializer
 
+USER_ROLE_FILTERS = {
+    "organizer": ("has_organizer_role", True),
+    "student": ("has_organizer_role", False),
+}
+
+
+class UserCursorPagination(CursorPagination):
+    """Cursor pages for the user list, used only when the client asks for them.
+
+    Without ``cursor`` or ``page_size`` the endpoint keeps returning the plain
+    list older clients expect.
+    """
+
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = (self.cursor_query_param, self.page_size_query_param)
+        if not any(param in request.query_params for param in params):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
 @method_decorator(
     name="get",
     decorator=swagger_auto_schema(
         tags=[TAG_USERS],
         operation_summary="List users",
-        operation_description="List users",
-        responses={200: UserSerializer(many=True), 401: ERROR_RESPONSE_SCHEMA},
+        operation_description="List users. Pass cursor or page_size to get cursor pages instead of the full list.",
+        manual_parameters=[
+            openapi.Parameter(
+                "role",
+                openapi.IN_QUERY,
+                description="student, organizer или тип CRM роли (admin, curator, projectant)",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter("page_size", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: UserSerializer(many=True), 400: ERROR_RESPONSE_SCHEMA, 401: ERROR_RESPONSE_SCHEMA},
     ),
 )
 class UserListView(ListAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = UserSerializer
-    queryset = get_user_model().objects.all()
+    pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        queryset = with_organizer_flag(get_user_model().objects.order_by("id"))
+        role = self.request.query_params.get("role")
+        if not role:
+            return queryset
+        if role in USER_ROLE_FILTERS:
+            field, value = USER_ROLE_FILTERS[role]
+            return queryset.filter(**{field: value})
+        if role in dict(ROLE_CHOICES):
+            return queryset.filter(role_exists(role))
+        raise ValidationError({"role": "Неизвестная роль"})
 
 def _set_auth_cookies(response, access_token: str, refresh_token: RefreshToken | None = None):
     response.set_cookie(
@@ -176,7 +227,7 @@ class LoginView(APIView):
 
         if serializer.is_valid():
             user = serializer.validated_data
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             access_token = str(refresh.access_token)
 
             response = Response({"user": UserSerializer(user).data}, status=status.HTTP_200_OK)
@@ -214,6 +265,7 @@ class LogoutView(APIView):
 
 class CookieTokenRefreshView(TokenRefreshView):
     permission_classes = (AllowAny,)
+    serializer_class = ClaimsTokenRefreshSerializer
 
     @swagger_auto_schema(
         tags=[TAG_AUTH],